@@ -3,15 +3,18 @@ import re
 import sys
 # import logging
 
-from ICUConstant import REGEX_FOLDER, MAPPING_FOLDER, DICT_FOLDER, F_LETTER_SOUND_EN, F_LETTER_SOUND_VN, F_SYMBOL, F_POPULAR
-from ICUReadFile import ICUReadFile
-from ICUMapping import ICUMapping
+from ICUConstant import REGEX_FOLDER, DICT_FOLDER, F_LETTER_SOUND_EN, F_LETTER_SOUND_VN, F_SYMBOL, F_POPULAR
+from ICURuleSet import RuleSet
+from ICUSpans import SpanText
+from ICUSpelling import get_speller
 from ICUDictionary import ICUDictionary
 from ICUNumberConverting import ConvertingNumber
 
 # Thiết lập logging
 # logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
+_DIGIT_RX = re.compile(r'\d')
+
 class Address:
     POLITICAL_DIVISION = 0
     STREET = 1
@@ -23,8 +26,10 @@ class Address:
     F_OFFICE = "Office.txt"
     F_CODENUMBER = "Codenumber.txt"
 
-    def __init__(self):
-        self.patterns = {}
+    def __init__(self, single_pass: bool = False):
+        # single_pass: gộp mọi rule thành một regex, quét một lần (RuleSet.scan)
+        self.single_pass = single_pass
+        self.rules = RuleSet()
         self.popular = ICUDictionary()
         # Load popular.txt một lần trong __init__
         # logging.debug(f"Loading popular dictionary from {os.path.join(DICT_FOLDER, F_POPULAR)}")
@@ -36,34 +41,28 @@ class Address:
         self._load_patterns(Address.STREET, Address.F_STREET)
         self._load_patterns(Address.OFFICE, Address.F_OFFICE)
         self._load_patterns(Address.CODENUMBER, Address.F_CODENUMBER)
+        # Hàm thay thế của từng category, tạo một lần
+        self._replacers = {category: self._make_replacer(category) for category in self.rules.categories()}
 
     def _load_patterns(self, category: int, filename: str):
-        path = os.path.join(REGEX_FOLDER, filename)
-        reader = ICUReadFile(path)
-        if not reader.read_file():
-            print(f"[E] Error reading pattern file: {filename}", file=sys.stderr)
-            return
-        self.patterns.setdefault(category, [])
-        pos = 0
-        while pos < reader.get_file_length():
-            reader.next_line(pos)
-            line = reader.get_content_uchar()[reader.get_line_start():reader.get_line_end()].strip()
-            if line:
-                self.patterns[category].append(line)
-            pos = reader.get_line_end()
+        self.rules.load(category, os.path.join(REGEX_FOLDER, filename))
 
     def normalize_text(self, text: str) -> str:
-        result = text
-        for category, regex_list in self.patterns.items():
-            for pattern in regex_list:
-                prog = re.compile(pattern)
-                def _repl(m: re.Match) -> str:
-                    full = m.group(0)
-                    if category == Address.CODENUMBER and not re.search(r'\d', full):
-                        return full
-                    return " " + self._string_for_replace(category, m) + " "
-                result = prog.sub(_repl, result)
-        return result
+        return self.normalize_spans(SpanText(text)).text()
+
+    def normalize_spans(self, spans: SpanText) -> SpanText:
+        """normalize_text on the unresolved spans of a line; replacements become resolved spans."""
+        if self.single_pass:
+            return self.rules.scan_spans(spans, self._replacers, self.rules.categories())
+        return self.rules.apply_spans(spans, self._replacers, self.rules.categories())
+
+    def _make_replacer(self, category: int):
+        def _repl(m: re.Match) -> str:
+            full = m.group(0)
+            if category == Address.CODENUMBER and not _DIGIT_RX.search(full):
+                return full
+            return " " + self._string_for_replace(category, m) + " "
+        return _repl
 
     def _string_for_replace(self, category: int, match: re.Match) -> str:
         if category == Address.POLITICAL_DIVISION:
@@ -102,8 +101,7 @@ class Address:
         main = full[len(prefix):]
         parts = []
         conv = ConvertingNumber()
-        letter_sound = ICUMapping()
-        letter_sound.load_mapping_file(os.path.join(MAPPING_FOLDER, F_LETTER_SOUND_VN))
+        letter_sound = get_speller(F_LETTER_SOUND_VN)
         continuous = False
         number = ""
         for c in main:
@@ -135,7 +133,7 @@ class Address:
                     parts.append(conv.convert_number(number) + " ")
                     number = ""
                     continuous = False
-                parts.append(letter_sound.mapping_of(c) + " ")
+                parts.append(letter_sound.word_of(c) + " ")
         if continuous and number:
             parts.append(conv.convert_number(number))
         return prefix + " " + "".join(parts)
@@ -146,8 +144,7 @@ class Address:
         main = full[len(prefix):]
         parts = []
         conv = ConvertingNumber()
-        letter_sound = ICUMapping()
-        letter_sound.load_mapping_file(os.path.join(MAPPING_FOLDER, F_LETTER_SOUND_VN))
+        letter_sound = get_speller(F_LETTER_SOUND_VN)
         continuous = False
         number = ""
         for c in main:
@@ -179,7 +176,7 @@ class Address:
                     parts.append(conv.convert_number(number) + " ")
                     number = ""
                     continuous = False
-                parts.append(letter_sound.mapping_of(c) + " ")
+                parts.append(letter_sound.word_of(c) + " ")
         if continuous and number:
             parts.append(conv.convert_number(number))
         return prefix + " " + "".join(parts)
@@ -187,11 +184,8 @@ class Address:
     def _regex_codenumber(self, match: re.Match) -> str:
         full = match.group(0)
         conv = ConvertingNumber()
-        letter_vn = ICUMapping()
-        letter_vn.load_mapping_file(os.path.join(MAPPING_FOLDER, F_LETTER_SOUND_VN))
-        letter_vn.load_mapping_file(os.path.join(MAPPING_FOLDER, F_SYMBOL))
-        letter_en = ICUMapping()
-        letter_en.load_mapping_file(os.path.join(MAPPING_FOLDER, F_LETTER_SOUND_EN))
+        letter_vn = get_speller(F_LETTER_SOUND_VN, F_SYMBOL)
+        letter_en = get_speller(F_LETTER_SOUND_EN)
 
         # 1) Xử lý trường hợp chữ + số có dấu "-" hoặc không
         pm = re.match(r'^([A-Za-z]+)-?(\d+)$', full)
@@ -203,8 +197,8 @@ class Address:
                 if prefix.isupper():
                     result = ''
                     for c in prefix:
-                        if letter_vn.has_mapping_of(c.lower()):
-                            result += letter_en.mapping_of(c.lower()) + ' '
+                        if letter_vn.has_word(c.lower()):
+                            result += letter_en.word_of(c.lower()) + ' '
                         else:
                             result += c + ' '
                 else:
@@ -223,15 +217,11 @@ class Address:
         if pm2:
             prefix, numpart, suffix = pm2.groups()
             parts = []
-            # Đọc prefix
-            for c in prefix:
-                parts.append(letter_en.mapping_of(c.lower()))
-            # Đọc từng chữ số của numpart
+            # Đọc prefix, từng chữ số của numpart, rồi suffix
+            parts.append(letter_en.spell(prefix.lower()))
             for d in numpart:
                 parts.append(conv.convert_number(d))
-            # Đọc suffix
-            for c in suffix:
-                parts.append(letter_vn.mapping_of(c.lower()))
+            parts.append(letter_vn.spell(suffix.lower()))
             return ' '.join(parts)
 
         # 3) Các trường hợp còn lại
@@ -253,8 +243,7 @@ class Address:
                     if self.popular.has_word(pop):
                         result += pop + ' '
                     else:
-                        for ch in pop:
-                            result += letter_en.mapping_of(ch) + ' '
+                        result += letter_en.spell_each(pop)
                     pop = ''
             elif c == '/':
                 if continuous_digits:
@@ -266,11 +255,10 @@ class Address:
                     if self.popular.has_word(pop):
                         result += pop + ' '
                     else:
-                        for ch in pop:
-                            result += letter_en.mapping_of(ch) + ' '
+                        result += letter_en.spell_each(pop)
                     pop = ''
                 result += 'xuyệt '
-            elif letter_vn.has_mapping_of(c.lower()):
+            elif letter_vn.has_word(c.lower()):
                 if continuous_digits:
                     result += conv.convert_number(number) + ' '
                     number = ''
@@ -290,8 +278,7 @@ class Address:
                     if self.popular.has_word(pop):
                         result += pop + ' '
                     else:
-                        for ch in pop: #
-                            result += letter_vn.mapping_of(ch) + ' '
+                        result += letter_vn.spell_each(pop)
                     pop = ''
                 result += 'chấm '
             elif c == '-':
@@ -304,9 +291,8 @@ class Address:
                     if self.popular.has_word(pop):
                         result += pop + ' '
                     else:
-                        for ch in pop:
-                            # Đọc phiên âm EN sau "-"
-                            result += letter_en.mapping_of(ch) + ' '
+                        # Đọc phiên âm EN sau "-"
+                        result += letter_en.spell_each(pop)
                     pop = ''
                 result += ' '
             else:
@@ -319,17 +305,15 @@ class Address:
                     if self.popular.has_word(pop):
                         result += pop + ' '
                     else:   
-                        for ch in pop:
-                            result += letter_vn.mapping_of(ch) + ' '
+                        result += letter_vn.spell_each(pop)
                     pop = ''
-                result += letter_vn.mapping_of(c) + ' '
+                result += letter_vn.word_of(c) + ' '
 
         # Flush cuối
         if continuous_digits and number:
             result += conv.convert_number(number) + ' '
         if continuous_pop and pop:
-            for ch in pop:
-                result += letter_vn.mapping_of(ch) + ' '
+            result += letter_vn.spell_each(pop)
         return result.strip()
     
 # Tiếng việt mới đọc "/" thành "xuyệt" và đọc tên kí tự
\ No newline at end of file
@@ -0,0 +1,260 @@
+import argparse
+import json
+import os
+import queue
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import tempfile
+import threading
+from concurrent.futures import Future
+from typing import Iterable, Iterator, List, Optional
+
+# Mặc định mỗi user một socket riêng, có thể đổi bằng biến môi trường VITEXT_SOCKET
+DEFAULT_SOCKET = os.environ.get(
+    "VITEXT_SOCKET",
+    os.path.join(tempfile.gettempdir(), f"vitext-{os.getuid() if hasattr(os, 'getuid') else 0}.sock"),
+)
+
+# Số dòng gửi trong một message của client
+CLIENT_CHUNK_LINES = 1000
+
+# Kích thước tối đa của một message (bytes)
+MAX_MESSAGE_BYTES = 64 << 20
+
+# recv_message trả về giá trị này khi client đóng kết nối (JSON null vẫn là một request)
+_CLOSED = object()
+
+_HEADER = struct.Struct("!I")
+
+OPTION_NAMES = ("punc", "unknown", "lower", "rule")
+
+# Protocol: mỗi message = 4 byte độ dài (big-endian) + JSON UTF-8
+#   request : {"op": "normalize", "lines": [...], "punc": bool, ...}, {"op": "ping"} hoặc {"op": "stats"}
+#   response: {"results": [...]} / {"ok": true} / {"cache": {...}, "disk_cache": {...}} hoặc {"error": "..."}
+
+def send_message(sock: socket.socket, payload: dict) -> None:
+    data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError("connection closed by peer")
+        buf += chunk
+    return bytes(buf)
+
+def recv_message(sock: socket.socket, closed=None) -> Optional[dict]:
+    """Read one message; `closed` if the peer closed the connection cleanly."""
+    first = sock.recv(_HEADER.size)
+    if not first:
+        return closed
+    (length,) = _HEADER.unpack(first + _recv_exactly(sock, _HEADER.size - len(first)))
+    if length > MAX_MESSAGE_BYTES:
+        raise ValueError(f"message too large: {length} bytes")
+    return json.loads(_recv_exactly(sock, length).decode('utf-8'))
+
+
+class _DaemonHandler(socketserver.BaseRequestHandler):
+    def handle(self) -> None:
+        while True:
+            try:
+                request = recv_message(self.request, _CLOSED)
+            except (ConnectionError, ValueError) as e:
+                print(f"[E] Bad message from client: {e}", file=sys.stderr)
+                return
+            if request is _CLOSED:
+                return
+            send_message(self.request, self.server.dispatch(request))
+
+
+class NormalizeDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Unix-socket daemon holding one warm Normalizer:
+    - every client gets its own thread, normalization itself is serialized by a lock
+    - with `main_thread`, normalization runs instead on the thread calling
+      run_jobs() (the main thread under serve()): only there can line_budget
+      interrupt a long regex with SIGALRM (see ICUBudget.LineBudget)
+    - dispatch: answers "ping", "stats" and "normalize" requests (see the protocol above)
+    """
+    daemon_threads = True
+
+    def __init__(self, path: str, config: Optional[dict] = None, main_thread: bool = False):
+        from Normalizer import Normalizer
+
+        self.normalizer = Normalizer(**(config or {})).preload()
+        self.lock = threading.Lock()
+        # Việc của các thread client, chạy lần lượt trong run_jobs
+        self.jobs: Optional[queue.Queue] = queue.Queue() if main_thread else None
+        _remove_stale_socket(path)
+        super().__init__(path, _DaemonHandler)
+
+    def run_jobs(self) -> None:
+        """Run the work of the client threads on this thread, until stop_jobs()."""
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            work, future = job
+            try:
+                future.set_result(work())
+            except Exception as e:
+                future.set_exception(e)
+
+    def stop_jobs(self) -> None:
+        self.jobs.put(None)
+
+    def _run(self, work):
+        if self.jobs is None:
+            with self.lock:
+                return work()
+        future = Future()
+        self.jobs.put((work, future))
+        return future.result()
+
+    def dispatch(self, request: dict) -> dict:
+        if not isinstance(request, dict):
+            return {"error": "request must be a JSON object"}
+        op = request.get("op")
+        if op == "ping":
+            return {"ok": True, "pid": os.getpid()}
+        if op == "stats":
+            return self._run(lambda: {"cache": self.normalizer.cache_stats(),
+                                      "disk_cache": self.normalizer.disk_cache_stats(),
+                                      "pipeline": self.normalizer.stats()})
+        if op != "normalize":
+            return {"error": f"unknown op {op!r}"}
+        lines = request.get("lines")
+        if not isinstance(lines, list) or not all(isinstance(l, str) for l in lines):
+            return {"error": "'lines' must be a list of strings"}
+        options = [bool(request.get(name, False)) for name in OPTION_NAMES]
+
+        def normalize():
+            results = self.normalizer.normalize_many(lines, *options)
+            self.normalizer.flush()
+            return {"results": results}
+
+        try:
+            return self._run(normalize)
+        except Exception as e:
+            return {"error": f"normalization failed: {e}"}
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+def _remove_stale_socket(path: str) -> None:
+    """Remove a socket file left behind by a dead daemon; refuse if one is alive."""
+    if not os.path.exists(path):
+        return
+    try:
+        DaemonClient(path).close()
+    except OSError:
+        os.unlink(path)
+        return
+    raise OSError(f"a daemon is already listening on {path}")
+
+
+class DaemonClient:
+    """
+    Thin client for NormalizeDaemon; connecting raises OSError when no daemon is running.
+    Importing this class does not load any normalization resource.
+    """
+
+    def __init__(self, path: str = DEFAULT_SOCKET, timeout: Optional[float] = None):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(path)
+        except OSError:
+            self.sock.close()
+            raise
+
+    def _call(self, request: dict) -> dict:
+        send_message(self.sock, request)
+        response = recv_message(self.sock)
+        if response is None:
+            raise ConnectionError("daemon closed the connection")
+        if "error" in response:
+            raise RuntimeError(f"daemon error: {response['error']}")
+        return response
+
+    def ping(self) -> bool:
+        return bool(self._call({"op": "ping"}).get("ok"))
+
+    def stats(self) -> dict:
+        return self._call({"op": "stats"})
+
+    def normalize_many(self, lines: List[str], punc: bool = False, unknown: bool = False,
+                       lower: bool = False, rule: bool = False) -> List[str]:
+        request = {"op": "normalize", "lines": lines,
+                   "punc": punc, "unknown": unknown, "lower": lower, "rule": rule}
+        return self._call(request)["results"]
+
+    def iter_normalize(self, lines: Iterable[str], punc: bool = False, unknown: bool = False,
+                       lower: bool = False, rule: bool = False,
+                       chunk_lines: int = CLIENT_CHUNK_LINES) -> Iterator[str]:
+        """Stream `lines` to the daemon `chunk_lines` at a time; results keep the input order."""
+        chunk = []
+        for line in lines:
+            chunk.append(line)
+            if len(chunk) >= chunk_lines:
+                yield from self.normalize_many(chunk, punc, unknown, lower, rule)
+                chunk = []
+        if chunk:
+            yield from self.normalize_many(chunk, punc, unknown, lower, rule)
+
+    def close(self) -> None:
+        self.sock.close()
+
+
+def connect(path: str = DEFAULT_SOCKET) -> Optional[DaemonClient]:
+    """Return a client connected to a live daemon, or None when none is running."""
+    try:
+        client = DaemonClient(path, timeout=1.0)
+        client.ping()
+        client.sock.settimeout(None)
+        return client
+    except (OSError, RuntimeError):
+        return None
+
+def _exit_on_sigterm(signum, frame) -> None:
+    raise SystemExit(0)
+
+def serve(path: str = DEFAULT_SOCKET, config: Optional[dict] = None) -> None:
+    # SIGTERM → SystemExit để `with` đóng server và xoá file socket
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
+    with NormalizeDaemon(path, config, main_thread=True) as daemon:
+        print(f"[INFO] Normalization daemon listening on {path}", file=sys.stderr)
+        # Socket phục vụ ở thread phụ, normalize ở main thread để SIGALRM của line_budget dùng được
+        thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+        thread.start()
+        try:
+            daemon.run_jobs()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            daemon.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description="Unix-socket normalization daemon")
+    parser.add_argument('-socket', default=DEFAULT_SOCKET, help="socket path (default: %(default)s)")
+    parser.add_argument('-cache', type=int, default=0,
+                        help="result cache entries, 0 = disabled (default: %(default)s)")
+    parser.add_argument('-disk-cache', default=None, help="SQLite result cache file")
+    parser.add_argument('-line-budget', type=float, default=0,
+                        help="milliseconds of regex rules per line before a cheaper fallback, 0 = unlimited")
+    args = parser.parse_args()
+    serve(args.socket, {"cache_entries": args.cache, "disk_cache": args.disk_cache,
+                        "line_budget": args.line_budget / 1000})
+
+if __name__ == "__main__":
+    main()
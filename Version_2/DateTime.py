@@ -4,6 +4,8 @@ from typing import Dict, List
 from enum import IntEnum
 from ICUHelper import is_number_literal, read_number
 from ICUConstant import REGEX_FOLDER
+from ICURuleSet import RuleSet
+from ICUSpans import SpanText
 
 class DateTimeCategory(IntEnum):
     TIME = 0
@@ -25,8 +27,21 @@ class ConvertingNumber:
         return roman
 
 class DateTime:
-    def __init__(self, regex_folder: str = REGEX_FOLDER):
+    # Define order of categories to ensure correct pattern matching
+    CATEGORY_ORDER = (
+        DateTimeCategory.DATE_FROM_TO_1,
+        DateTimeCategory.DATE_FROM_TO_2,
+        DateTimeCategory.DATE_1,
+        DateTimeCategory.DATE_2,
+        DateTimeCategory.DATE_3,
+        DateTimeCategory.MONTH,
+        DateTimeCategory.TIME
+    )
+
+    def __init__(self, regex_folder: str = REGEX_FOLDER, single_pass: bool = False):
         self.REGEX_FOLDER = regex_folder
+        # Merge all patterns into one regex and scan once (RuleSet.scan)
+        self.single_pass = single_pass
         
         # File mappings
         self.pattern_files = {
@@ -39,12 +54,15 @@ class DateTime:
             DateTimeCategory.DATE_2: "Date_2.txt"
         }
         
-        # Store patterns for each category
-        self.patterns: Dict[int, List[str]] = {}
+        # Compiled rules for each category (case-insensitive)
+        self.rules = RuleSet(re.IGNORECASE)
         
         # Load all patterns
         self._load_all_patterns()
         
+        # One replacement function per category, built once
+        self._replacers = {category: self._make_replacer(category) for category in self.pattern_files}
+        
         # Number converter
         self.converter = ConvertingNumber()
     
@@ -57,70 +75,38 @@ class DateTime:
             self.load_patterns(category, filename)
     
     def load_patterns(self, category: int, filename: str):
-        """Load regex patterns from file"""
+        """Load and compile regex patterns from file"""
         filepath = os.path.join(self.REGEX_FOLDER, filename)
         
-        if category not in self.patterns:
-            self.patterns[category] = []
+        # Check if file exists
+        if not os.path.exists(filepath):
+            print(f"[E] Pattern file not found: {filepath}")
+            return
+        
+        # Skip empty lines and comments
+        self.rules.load(category, filepath, skip_comments=True)
         
-        try:
-            # Check if file exists
-            if not os.path.exists(filepath):
-                print(f"[E] Pattern file not found: {filepath}")
-                return
-            
-            with open(filepath, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#'):  # Skip empty lines and comments
-                        self.patterns[category].append(line)
-            
-            # print(f"[INFO] Loaded {len(self.patterns[category])} patterns from {filename}")
-            
-        except FileNotFoundError:
-            print(f"[E] Error reading pattern file: {filename}")
-        except Exception as e:
-            print(f"[E] Error reading pattern file {filename}: {str(e)}")
+        # print(f"[INFO] Loaded {len(self.rules.rules(category))} patterns from {filename}")
     
     def normalize_text(self, input_text: str) -> str:
         """Normalize text using loaded patterns"""
         if not input_text:
             return ""
-        
-        result = ""
-        pre_result = input_text
-        
-        # Define order of categories to ensure correct pattern matching
-        category_order = [
-            DateTimeCategory.DATE_FROM_TO_1,
-            DateTimeCategory.DATE_FROM_TO_2,
-            DateTimeCategory.DATE_1,
-            DateTimeCategory.DATE_2,
-            DateTimeCategory.DATE_3,
-            DateTimeCategory.MONTH,
-            DateTimeCategory.TIME
-        ]
-        
-        for category in category_order:
-            if category not in self.patterns or not self.patterns[category]:
-                continue
-                
-            for pattern in self.patterns[category]:
-                try:
-                    compiled_pattern = re.compile(pattern, re.IGNORECASE)
-                    
-                    def replace_func(match):
-                        return " " + self.string_for_replace(category, match) + " "
-                    
-                    result = compiled_pattern.sub(replace_func, pre_result)
-                    pre_result = result
-                    result = ""
-                    
-                except re.error as e:
-                    print(f"[E] Error in regex pattern: {pattern}, Error: {e}")
-                    continue
-        
-        return pre_result.strip()
+        return self.normalize_spans(SpanText(input_text)).text()
+
+    def normalize_spans(self, spans: SpanText) -> SpanText:
+        """normalize_text on the unresolved spans of a line; replacements become resolved spans."""
+        if self.single_pass:
+            self.rules.scan_spans(spans, self._replacers, DateTime.CATEGORY_ORDER)
+        else:
+            self.rules.apply_spans(spans, self._replacers, DateTime.CATEGORY_ORDER)
+        spans.strip()
+        return spans
+    
+    def _make_replacer(self, category: int):
+        def replace_func(match):
+            return " " + self.string_for_replace(category, match) + " "
+        return replace_func
     
     def string_for_replace(self, category: int, match: re.Match) -> str:
         """Router function to call appropriate regex handler"""
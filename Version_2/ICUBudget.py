@@ -0,0 +1,66 @@
+import signal
+import threading
+import time
+from typing import Optional
+
+
+class BudgetExceeded(Exception):
+    """Raised inside a LineBudget block when its time budget runs out."""
+
+
+_state = threading.local()
+
+# Chỉ main thread nhận được signal; SIGALRM không có trên Windows
+_HAS_TIMER = hasattr(signal, "setitimer") and hasattr(signal, "SIGALRM")
+
+
+def check_budget() -> None:
+    """Raise BudgetExceeded if the LineBudget active in this thread has run out (cheap when none is)."""
+    deadline = getattr(_state, "deadline", None)
+    if deadline is not None and time.perf_counter() > deadline:
+        raise BudgetExceeded()
+
+
+class LineBudget:
+    """
+    Time budget for one block of work, used as a context manager:
+    - in the main thread (Unix) a SIGALRM timer interrupts even a single
+      long-running regex: the re engine checks signals while it backtracks
+    - in any thread, check_budget() called between steps (RuleSet.apply) stops
+      the work at the next rule boundary
+    Either way the block raises BudgetExceeded. seconds = None or <= 0 disables it.
+    """
+
+    def __init__(self, seconds: Optional[float]):
+        self.seconds = seconds if seconds and seconds > 0 else None
+        self._timer = False
+        self._previous_handler = None
+        self._outer = None
+
+    def _on_alarm(self, signum, frame) -> None:
+        # Bỏ qua nếu block đã kết thúc nhưng tín hiệu đến trễ
+        if self._timer:
+            raise BudgetExceeded()
+
+    def __enter__(self) -> "LineBudget":
+        if self.seconds is None:
+            return self
+        self._outer = getattr(_state, "deadline", None)
+        deadline = time.perf_counter() + self.seconds
+        _state.deadline = deadline if self._outer is None else min(deadline, self._outer)
+        if (_HAS_TIMER and self._outer is None
+                and threading.current_thread() is threading.main_thread()):
+            self._previous_handler = signal.signal(signal.SIGALRM, self._on_alarm)
+            self._timer = True
+            signal.setitimer(signal.ITIMER_REAL, self.seconds)
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        if self.seconds is None:
+            return False
+        if self._timer:
+            self._timer = False
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self._previous_handler)
+        _state.deadline = self._outer
+        return False
@@ -0,0 +1,204 @@
+import hashlib
+import os
+import sqlite3
+import sys
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+from ICUConstant import DEFAULT_CACHE_BYTES
+
+# Tăng khi code của pipeline đổi kết quả, để cache trên đĩa không trả kết quả cũ
+DISK_CACHE_VERSION = 3
+
+
+def _entry_size(key, value: str) -> int:
+    """Approximate memory held by one entry (key strings + value string)."""
+    size = sys.getsizeof(value)
+    if isinstance(key, tuple):
+        size += sum(sys.getsizeof(k) for k in key)
+    else:
+        size += sys.getsizeof(key)
+    return size
+
+
+class LRUCache:
+    """
+    Bounded least-recently-used cache of strings:
+    - get: value for `key` or None, marks the entry as recently used
+    - put: insert / replace, evicting the oldest entries beyond `max_entries` or `max_bytes`
+    - stats: hit / miss / eviction counters and the current size
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def get(self, key: Hashable) -> Optional[str]:
+        entry = self.data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.data.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: Hashable, value: str) -> None:
+        size = _entry_size(key, value)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        old = self.data.pop(key, None)
+        if old is not None:
+            self.bytes -= old[1]
+        self.data[key] = (value, size)
+        self.bytes += size
+        while len(self.data) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, evicted_size) = self.data.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self.data.clear()
+        self.bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.data),
+            "bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class DiskCache:
+    """
+    Persistent content-addressed cache of normalized lines (stdlib sqlite3):
+    - the key is a hash of (DISK_CACHE_VERSION, resource fingerprint, options,
+      input), so editing a mapping, dictionary or RegexRule file or bumping the
+      version makes every older entry unreachable; those rows are pruned the
+      first time a new fingerprint opens the file
+    - WAL journal: many worker processes can read while one writes
+    - writes are grouped into transactions of `batch_size` rows (flushed by close())
+    - a connection is opened lazily per process, so the object survives fork()
+    - on an SQLite error (unreadable / locked / corrupt file) the error is
+      printed once and the cache is disabled: lookups miss, writes are dropped
+    """
+
+    def __init__(self, path: str, fingerprint: str, batch_size: int = 256):
+        self.path = path
+        # Version nằm trong fingerprint lưu ở mỗi dòng → đổi version thì các dòng cũ bị xoá
+        self.fingerprint = f"{DISK_CACHE_VERSION}:{fingerprint}"
+        self.batch_size = batch_size
+        self.pending = []
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.disabled = False
+        self._conn = None
+        self._pid = None
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """Connection of this process, None once the cache is disabled."""
+        if self.disabled:
+            return None
+        if self._conn is None or self._pid != os.getpid():
+            # Kết nối SQLite không dùng lại được sau fork → mở kết nối mới cho mỗi process
+            self._conn = None
+            self.pending = []
+            conn = None
+            try:
+                conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute("CREATE TABLE IF NOT EXISTS results ("
+                             "key BLOB PRIMARY KEY, fingerprint TEXT NOT NULL, value TEXT NOT NULL)")
+                conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+                row = conn.execute("SELECT value FROM meta WHERE name = 'fingerprint'").fetchone()
+                if row is None or row[0] != self.fingerprint:
+                    with conn:
+                        conn.execute("DELETE FROM results WHERE fingerprint != ?", (self.fingerprint,))
+                        conn.execute("INSERT OR REPLACE INTO meta VALUES ('fingerprint', ?)", (self.fingerprint,))
+            except sqlite3.Error as e:
+                if conn is not None:
+                    conn.close()
+                self._disable(e)
+                return None
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def _disable(self, error: sqlite3.Error) -> None:
+        # Chỉ báo lỗi một lần, sau đó cache coi như tắt
+        print(f"[E] Disk cache {self.path} disabled: {error}", file=sys.stderr)
+        self.disabled = True
+        self.pending = []
+
+    def make_key(self, text: str, options: tuple) -> bytes:
+        h = hashlib.sha256()
+        h.update(self.fingerprint.encode('utf-8'))
+        h.update(repr(options).encode('utf-8'))
+        h.update(b"\0")
+        h.update(text.encode('utf-8'))
+        return h.digest()
+
+    def get(self, key: bytes) -> Optional[str]:
+        conn = self._connection()
+        row = None
+        if conn is not None:
+            try:
+                row = conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error as e:
+                self._disable(e)
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, key: bytes, value: str) -> None:
+        if self._connection() is None:
+            return
+        self.pending.append((key, self.fingerprint, value))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.pending or self._conn is None or self._pid != os.getpid():
+            return
+        try:
+            with self._conn:
+                self._conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?)", self.pending)
+            self.writes += len(self.pending)
+        except sqlite3.Error as e:
+            self._disable(e)
+        self.pending = []
+
+    def close(self) -> None:
+        self.flush()
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "pending": len(self.pending),
+            "disabled": self.disabled,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -39,6 +39,15 @@ F_ACRONYMS  = "Acronyms_shorten.txt"
 F_TEENCODE  = "Teencode.txt"
 F_POPULAR   = "Popular.txt"
 
+# Snapshot các tài nguyên đã parse (mapping, dictionary, regex rule)
+SNAPSHOT_FILE = "data/resources.snapshot"
+
+# Bản nhị phân (mmap) của các dictionary / mapping, xem ICUMappedTable
+MAPPED_FOLDER = "data/Mapped"
+
+# Ngân sách bộ nhớ mặc định cho cache kết quả (bytes)
+DEFAULT_CACHE_BYTES = 64 << 20
+
 # Tên file input/output mặc định
 F_INPUT  = "input.txt"
 F_OUTPUT = "output.txt"
@@ -1,9 +1,11 @@
 import sys
+from ICUSnapshot import get_snapshot
+from ICUMappedTable import load_table, mapped_tables_enabled, save_table
 
 class ICUDictionary:
     """
     Python port of the C++ ICUDictionary:
-    - load_dict_file: đọc từng dòng từ file, thêm vào tập `words`
+    - load_dict_file: đọc từng dòng từ file, thêm vào tập `words` (set, hoặc MappedWords dùng chung qua mmap)
     - has_word: kiểm tra tồn tại, ưu tiên nguyên bản sau đó lower-case
     - clear_dict: xoá sạch tập từ
     - unit_test: in ra toàn bộ từ trong dict
@@ -16,7 +18,37 @@ class ICUDictionary:
 # ICUDictionary.py
 
     def load_dict_file(self, filepath: str) -> bool:
+        """
+        Đọc file dictionary, mỗi dòng một từ, thêm vào self.words.
+        Với VITEXT_MAPPED_TABLES=1, dictionary đầu tiên được đọc thẳng từ bản
+        nhị phân mmap (ICUMappedTable.MappedWords), dùng chung giữa các process.
+        """
         self.dict_name = filepath
+        mapped = mapped_tables_enabled() and not self.words
+        if mapped:
+            table = load_table([filepath], "dict", words=True)
+            if table is not None:
+                self.words = table
+                return True
+        parsed = self._parse_dict_file(filepath)
+        if parsed is None:
+            return False
+        if mapped:
+            table = save_table([filepath], "dict", parsed)
+            if table is not None:
+                self.words = table
+                return True
+        self._writable_words().update(parsed)
+        return True
+
+    @staticmethod
+    def _parse_dict_file(filepath: str):
+        """Tập từ của file (lấy từ / lưu vào resource snapshot), None nếu lỗi I/O."""
+        snapshot = get_snapshot()
+        if snapshot is not None:
+            cached = snapshot.lookup(filepath, "dict")
+            if cached is not None:
+                return cached
         try:
             # Đọc file nhị phân
             with open(filepath, 'rb') as f:
@@ -29,14 +61,23 @@ class ICUDictionary:
                 text = raw.decode('utf-8', errors='replace')
         except Exception as e:
             print(f"[E] Cannot load file {filepath} for dictionary: {e}", file=sys.stderr)
-            return False
+            return None
 
         # Now split lines on any newline and add
+        parsed = set()
         for line in text.splitlines():
             w = line.strip()
             if w:
-                self.words.add(w)
-        return True
+                parsed.add(w)
+        if snapshot is not None:
+            snapshot.store(filepath, "dict", parsed)
+        return parsed
+
+    def _writable_words(self) -> set:
+        # Bảng mmap chỉ đọc → chép sang set riêng của process trước khi sửa
+        if not isinstance(self.words, set):
+            self.words = set(self.words)
+        return self.words
 
     def has_word(self, input_word: str) -> bool:
         """
@@ -54,7 +95,7 @@ class ICUDictionary:
 
     def clear_dict(self) -> None:
         """Xoá hết từ trong dictionary."""
-        self.words.clear()
+        self.words = set()
 
     def unit_test(self) -> None:
         """In ra toàn bộ từ đã load (theo thứ tự chữ cái)."""
@@ -0,0 +1,143 @@
+import os
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ICUDictionary import ICUDictionary
+from ICUMapping import ICUMapping
+from ICUMappedTable import MappedFile, load_table, mapped_tables_enabled, save_table
+
+# (action, replacement) của một token; replacement là None với KEEP
+Entry = Tuple[int, Optional[str]]
+
+
+class Lexicon:
+    """
+    The word lists of the token loop merged into one table, in precedence
+    order: Popular (KEEP), Acronyms (ACRONYM), Teencode (TEENCODE), Symbol
+    (SYMBOL). lookup(token) gives the (action, replacement) of the first
+    source that knows the token, exactly as has_word / has_mapping_of +
+    mapping_of of each source would, or None:
+    - entries: every key and its lower / upper / capitalized / title-case
+      forms, resolved through the sources at build time (one probe)
+    - folded: lower-cased key → entry for other spellings, as the sources'
+      lower-case fallback; the Teencode rule (an all-upper-case token only
+      matches exactly) is kept as a second entry for upper-case tokens
+    - conflicts: (key, source used, sources shadowed) for keys (compared in
+      lower case) found in more than one source
+    When the sources are themselves mmap tables (VITEXT_MAPPED_TABLES=1),
+    `entries` and `folded` are built once into mmap tables too (see
+    ICUMappedTable), rebuilt when a source file changes.
+    """
+
+    KEEP = 0
+    ACRONYM = 1
+    TEENCODE = 2
+    SYMBOL = 3
+
+    def __init__(self, popular: ICUDictionary, mappings: Sequence[Tuple[int, ICUMapping]]):
+        self.entries: Dict[str, Entry] = {}
+        self.folded: Dict[str, Tuple[Optional[Entry], Optional[Entry]]] = {}
+        self.conflicts: List[Tuple[str, str, List[str]]] = []
+        sources = self._mapped_sources(popular, mappings)
+        if sources is None or not self._load(sources):
+            self._build(popular, mappings)
+            if sources is not None:
+                self._save(sources)
+
+    @staticmethod
+    def _mapped_sources(popular: ICUDictionary, mappings) -> Optional[List[str]]:
+        """Source files of the sources, if every one is a single mmap-backed file."""
+        tables = [popular.words] + [mapping.mapping for _, mapping in mappings]
+        if not mapped_tables_enabled() or not all(isinstance(table, MappedFile) for table in tables):
+            return None
+        return [table.sources[0] for table in tables]
+
+    def _load(self, sources: List[str]) -> bool:
+        entries = load_table(sources, "lexicon", decode=_decode_entry)
+        folded = load_table(sources, "lexicon-folded", decode=_decode_folded)
+        if entries is None or folded is None:
+            return False
+        self.entries, self.folded = entries, folded
+        self.conflicts = [(key, used, shadowed) for key, used, shadowed in entries.meta]
+        return True
+
+    def _save(self, sources: List[str]) -> None:
+        entries = save_table(sources, "lexicon", {key: _encode_entry(entry) for key, entry in self.entries.items()},
+                             meta=self.conflicts, decode=_decode_entry)
+        folded = save_table(sources, "lexicon-folded",
+                            {key: _encode_entry(pair[0]) + "\0" + _encode_entry(pair[1])
+                             for key, pair in self.folded.items()}, decode=_decode_folded)
+        if entries is not None and folded is not None:
+            self.entries, self.folded = entries, folded
+
+    @staticmethod
+    def _resolve(token: Optional[str], folded: str, upper_case: bool, words, mappings) -> Optional[Entry]:
+        """
+        Entry of `token` (lower-cased: `folded`; None stands for a token that
+        is no source's key), with the lookup rules of ICUDictionary.has_word
+        and ICUMapping.has_mapping_of / mapping_of.
+        """
+        if token in words or folded in words:
+            return (Lexicon.KEEP, None)
+        for action, mapping in mappings:
+            table = mapping.mapping
+            if token in table:
+                return (action, table[token])
+            if folded in table and not (mapping.exact_upper_case and upper_case):
+                return (action, table[folded])
+        return None
+
+    def _build(self, popular: ICUDictionary, mappings) -> None:
+        sources = [(os.path.basename(popular.dict_name), popular.words)]
+        sources += [(os.path.basename(mapping.mapping_name), mapping.mapping) for _, mapping in mappings]
+        folded_keys = [(name, {key.lower() for key in keys}) for name, keys in sources]
+        counts = Counter(folded for _, keys in folded_keys for folded in keys)
+        self.conflicts = [(folded, names[0], names[1:])
+                          for folded in sorted(key for key, count in counts.items() if count > 1)
+                          for names in [[name for name, keys in folded_keys if folded in keys]]]
+
+        words = popular.words
+        entries = self.entries
+        for _, keys in sources:
+            for key in keys:
+                for variant in {key, key.lower(), key.upper(), key.capitalize(), key.title()}:
+                    if variant not in entries:
+                        entry = self._resolve(variant, variant.lower(), variant.upper() == variant, words, mappings)
+                        if entry is not None:
+                            entries[variant] = entry
+
+        # Token không phải key của nguồn nào: chỉ còn lookup lower-case của từng nguồn,
+        # kết quả chỉ phụ thuộc vào token có viết hoa toàn bộ hay không
+        for folded in counts:
+            self.folded[folded] = (self._resolve(None, folded, False, words, mappings),
+                                   self._resolve(None, folded, True, words, mappings))
+
+    def lookup(self, token: str) -> Optional[Entry]:
+        """(action, replacement) of a stripped, non-empty token, None if no source has it."""
+        entry = self.entries.get(token)
+        if entry is not None:
+            return entry
+        folded = self.folded.get(token.lower())
+        if folded is None:
+            return None
+        return folded[token.upper() == token]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+# Entry trong bảng mmap: "" (None), hoặc action + replacement ("0" với KEEP)
+def _encode_entry(entry: Optional[Entry]) -> str:
+    return "" if entry is None else str(entry[0]) + (entry[1] or "")
+
+
+def _decode_entry(text: str) -> Optional[Entry]:
+    if not text:
+        return None
+    action = int(text[0])
+    return (action, None) if action == Lexicon.KEEP else (action, text[1:])
+
+
+def _decode_folded(text: str) -> Tuple[Optional[Entry], Optional[Entry]]:
+    lower, upper = text.split("\0")
+    return _decode_entry(lower), _decode_entry(upper)
@@ -0,0 +1,241 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from collections.abc import Mapping, Set
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+from ICUConstant import MAPPED_FOLDER
+from ICUSnapshot import file_digest
+
+# Tăng khi định dạng file hoặc cách parse / build của các bảng thay đổi
+MAPPED_VERSION = 1
+
+MAGIC = b"VTMT"
+# magic, version, số key, số slot, có value hay không, độ dài phần JSON
+_HEADER = struct.Struct("<4sIIIII")
+
+
+def mapped_tables_enabled() -> bool:
+    """True when the word lists are to be read from memory-mapped tables (VITEXT_MAPPED_TABLES=1)."""
+    return os.environ.get("VITEXT_MAPPED_TABLES") == "1"
+
+
+def _encode(text: str) -> bytes:
+    return text.encode("utf-8", "surrogatepass")
+
+
+def _source_stamps(sources: Sequence[str]) -> List[list]:
+    stamps = []
+    for path in sources:
+        st = os.stat(path)
+        stamps.append([os.path.normpath(path), st.st_size, st.st_mtime_ns, file_digest(path)])
+    return stamps
+
+
+def _fresh(stamps: List[list], sources: Sequence[str]) -> bool:
+    """True if every source file is unchanged since the table was built (size + mtime, then content hash)."""
+    if [stamp[0] for stamp in stamps] != [os.path.normpath(path) for path in sources]:
+        return False
+    for path, size, mtime_ns, digest in stamps:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        if st.st_size != size:
+            return False
+        if st.st_mtime_ns != mtime_ns and file_digest(path) != digest:
+            return False
+    return True
+
+
+class MappedFile:
+    """
+    Read-only str → str table in a memory-mapped file, queried in place
+    (nothing is loaded), so every process that opens the file shares its pages:
+    - header: magic, version, counts, then JSON with the source files
+      (path, size, mtime, SHA-1) and free `meta`
+    - slots: open-addressing hash table (CRC-32 of the UTF-8 key, linear
+      probing, at most half full) of key index + 1, 0 for an empty slot
+    - key / value offsets, then the key blob and the value blob, in the
+      iteration order of the dict / set the file was written from
+    `decode` turns the stored value into what a lookup returns.
+    """
+
+    def __init__(self, path: str, decode: Optional[Callable[[str], object]] = None):
+        self.path = path
+        self.decode = decode
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, slot_count, has_values, info_size = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != MAPPED_VERSION:
+            raise ValueError(f"{path} is not a version {MAPPED_VERSION} mapped table")
+        info = json.loads(self._mm[_HEADER.size:_HEADER.size + info_size].decode("utf-8"))
+        if info["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path} was written on a {info['byteorder']}-endian machine")
+        self.stamps: List[list] = info["sources"]
+        self.sources = [stamp[0] for stamp in self.stamps]
+        self.meta = info["meta"]
+        self.count = count
+        self.has_values = bool(has_values)
+
+        # Các mảng uint32 nằm ngay trong vùng mmap (căn lề 4 byte), không copy
+        view = memoryview(self._mm)
+        offset = _align(_HEADER.size + info_size)
+        self._mask = slot_count - 1
+        self._slots = view[offset:offset + 4 * slot_count].cast("I")
+        offset += 4 * slot_count
+        self._key_offsets = view[offset:offset + 4 * (count + 1)].cast("I")
+        offset += 4 * (count + 1)
+        self._value_offsets = view[offset:offset + 4 * (count + 1)].cast("I")
+        offset += 4 * (count + 1)
+        self._keys = offset
+        self._values = offset + self._key_offsets[count]
+
+    def _index(self, key) -> int:
+        """Index of `key` in the file, -1 if absent."""
+        if not isinstance(key, str):
+            return -1
+        data = _encode(key)
+        mask = self._mask
+        slots = self._slots
+        offsets = self._key_offsets
+        mm = self._mm
+        base = self._keys
+        slot = zlib.crc32(data) & mask
+        while True:
+            index = slots[slot]
+            if not index:
+                return -1
+            index -= 1
+            if mm[base + offsets[index]:base + offsets[index + 1]] == data:
+                return index
+            slot = (slot + 1) & mask
+
+    def _key(self, index: int) -> str:
+        base = self._keys
+        return self._mm[base + self._key_offsets[index]:base + self._key_offsets[index + 1]].decode("utf-8", "surrogatepass")
+
+    def _value(self, index: int):
+        base = self._values
+        value = self._mm[base + self._value_offsets[index]:base + self._value_offsets[index + 1]].decode("utf-8", "surrogatepass")
+        return value if self.decode is None else self.decode(value)
+
+    def __contains__(self, key) -> bool:
+        return self._index(key) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(self.count):
+            yield self._key(index)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.path!r}, {self.count} keys)"
+
+
+class MappedTable(MappedFile, Mapping):
+    """Read-only dict over a MappedFile, same lookups / iteration as the dict it was written from."""
+
+    def __getitem__(self, key: str):
+        index = self._index(key)
+        if index < 0:
+            raise KeyError(key)
+        return self._value(index)
+
+    def get(self, key, default=None):
+        index = self._index(key)
+        return default if index < 0 else self._value(index)
+
+
+class MappedWords(MappedFile, Set):
+    """Read-only set of words over a MappedFile written without values."""
+
+
+def _align(offset: int) -> int:
+    return (offset + 3) & ~3
+
+
+def table_path(sources: Sequence[str], kind: str) -> str:
+    """File of the `kind` table built from `sources`, in MAPPED_FOLDER."""
+    names = "\n".join(os.path.normpath(path) for path in sources)
+    tag = hashlib.sha1(f"{kind}\n{names}".encode("utf-8")).hexdigest()[:12]
+    return os.path.join(MAPPED_FOLDER, f"{kind}-{os.path.basename(sources[0])}-{tag}.bin")
+
+
+def load_table(sources: Sequence[str], kind: str, words: bool = False,
+               decode: Optional[Callable[[str], object]] = None) -> Optional[MappedFile]:
+    """
+    Mapped `kind` table of `sources`, or None if it was never written, is
+    unreadable or older than one of the sources.
+    """
+    path = table_path(sources, kind)
+    try:
+        table = (MappedWords if words else MappedTable)(path, decode)
+    except (OSError, ValueError, KeyError, struct.error):
+        return None
+    if table.has_values == words or not _fresh(table.stamps, sources):
+        return None
+    return table
+
+
+def save_table(sources: Sequence[str], kind: str, items: Union[Dict[str, str], Iterable[str]],
+               meta=None, decode: Optional[Callable[[str], object]] = None) -> Optional[MappedFile]:
+    """
+    Write `items` (a dict, or a set of words) as the `kind` table of
+    `sources` and map it; None if MAPPED_FOLDER is not writable.
+    """
+    words = not isinstance(items, dict)
+    keys = list(items)
+    values = [""] * len(keys) if words else [items[key] for key in keys]
+
+    slot_count = 8
+    while slot_count < 2 * len(keys):
+        slot_count *= 2
+    mask = slot_count - 1
+    slots = array("I", bytes(4 * slot_count))
+    key_offsets = array("I", [0])
+    value_offsets = array("I", [0])
+    key_blob = bytearray()
+    value_blob = bytearray()
+    for index, (key, value) in enumerate(zip(keys, values)):
+        data = _encode(key)
+        slot = zlib.crc32(data) & mask
+        while slots[slot]:
+            slot = (slot + 1) & mask
+        slots[slot] = index + 1
+        key_blob += data
+        value_blob += _encode(value)
+        key_offsets.append(len(key_blob))
+        value_offsets.append(len(value_blob))
+
+    try:
+        info = json.dumps({"byteorder": sys.byteorder, "sources": _source_stamps(sources), "meta": meta},
+                          ensure_ascii=False).encode("utf-8")
+    except OSError:
+        return None
+    header = _HEADER.pack(MAGIC, MAPPED_VERSION, len(keys), slot_count, 0 if words else 1, len(info)) + info
+    path = table_path(sources, kind)
+    # Ghi ra file tạm riêng của process rồi rename → process khác vẫn giữ bản map cũ
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(MAPPED_FOLDER, exist_ok=True)
+        with open(tmp, "wb") as f:
+            f.write(header + bytes(_align(len(header)) - len(header)))
+            f.write(slots.tobytes())
+            f.write(key_offsets.tobytes())
+            f.write(value_offsets.tobytes())
+            f.write(key_blob)
+            f.write(value_blob)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"[E] Cannot write mapped table {path}: {e}", file=sys.stderr)
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        return None
+    return (MappedWords if words else MappedTable)(path, decode)
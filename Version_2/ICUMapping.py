@@ -1,10 +1,12 @@
 import sys
 import os
+from ICUSnapshot import get_snapshot
+from ICUMappedTable import load_table, mapped_tables_enabled, save_table
 
 class ICUMapping:
     """
     Python port of the C++ ICUMapping:
-    - load_mapping_file: đọc từng dòng có dạng "key#value" và lưu vào dict `mapping`
+    - load_mapping_file: đọc từng dòng có dạng "key#value" và lưu vào `mapping` (dict, hoặc MappedTable dùng chung qua mmap)
     - mapping_of: trả về value tương ứng hoặc chuỗi rỗng nếu không tìm thấy
     - has_mapping_of: kiểm tra key tồn tại (bao gồm kiểm thử với lower-case và special-case Teencode)
     - clear_mapping: xoá hết mapping
@@ -14,14 +16,46 @@ class ICUMapping:
     def __init__(self):
         self.mapping = {}
         self.mapping_name = ""
+        # Teencode.txt: từ viết hoa toàn bộ chỉ khớp nguyên bản (không thử lower-case)
+        self.exact_upper_case = False
 
     def load_mapping_file(self, filepath: str) -> bool:
         """
         Đọc file mapping, mỗi dòng "unit#pronoun", thêm vào self.mapping.
         Trả về True nếu load thành công, False nếu lỗi I/O.
+        Kết quả parse được lấy từ / lưu vào resource snapshot (xem ICUSnapshot).
+        Với VITEXT_MAPPED_TABLES=1, file đầu tiên được đọc thẳng từ bản nhị phân
+        mmap (ICUMappedTable.MappedTable), dùng chung giữa các process.
         """
         self.mapping_name = filepath
+        self.exact_upper_case = os.path.basename(filepath) == "Teencode.txt"
+        mapped = mapped_tables_enabled() and not self.mapping
+        if mapped:
+            table = load_table([filepath], "mapping")
+            if table is not None:
+                self.mapping = table
+                return True
+        parsed = self._parse_mapping_file(filepath)
+        if parsed is None:
+            return False
+        if mapped:
+            table = save_table([filepath], "mapping", parsed)
+            if table is not None:
+                self.mapping = table
+                return True
+        self._writable_mapping().update(parsed)
+        return True
+
+    @staticmethod
+    def _parse_mapping_file(filepath: str):
+        """Dict key → value của file (lấy từ / lưu vào resource snapshot), None nếu lỗi I/O."""
+        snapshot = get_snapshot()
+        if snapshot is not None:
+            cached = snapshot.lookup(filepath, "mapping")
+            if cached is not None:
+                return cached
         try:
+            parsed = {}
             with open(filepath, 'r', encoding='utf-8') as f:
                 for line in f:
                     line = line.strip()
@@ -31,11 +65,19 @@ class ICUMapping:
                     unit = unit.strip()
                     pronoun = pronoun.strip()
                     if unit:
-                        self.mapping[unit] = pronoun
-            return True
+                        parsed[unit] = pronoun
         except Exception as e:
             print(f"[E] Cannot load file {filepath} for mapping: {e}", file=sys.stderr)
-            return False
+            return None
+        if snapshot is not None:
+            snapshot.store(filepath, "mapping", parsed)
+        return parsed
+
+    def _writable_mapping(self) -> dict:
+        # Bảng mmap chỉ đọc → chép sang dict riêng của process trước khi sửa
+        if not isinstance(self.mapping, dict):
+            self.mapping = dict(self.mapping)
+        return self.mapping
 
     def mapping_of(self, unit: str) -> str:
         """
@@ -54,7 +96,7 @@ class ICUMapping:
             return self.mapping[u]
 
         # special-case Teencode: nếu file là Teencode.txt và unit toàn hoa, skip
-        if os.path.basename(self.mapping_name) == "Teencode.txt" and u.upper() == u:
+        if self.exact_upper_case and u.upper() == u:
             return ""
 
         # thử lower-case
@@ -76,7 +118,7 @@ class ICUMapping:
         if w in self.mapping:
             return True
 
-        if os.path.basename(self.mapping_name) == "Teencode.txt" and w.upper() == w:
+        if self.exact_upper_case and w.upper() == w:
             return False
 
         if w.lower() in self.mapping:
@@ -86,7 +128,7 @@ class ICUMapping:
 
     def clear_mapping(self) -> None:
         """Xoá hết các mapping đã load."""
-        self.mapping.clear()
+        self.mapping = {}
 
     def unit_test(self) -> None:
         """In ra toàn bộ cặp key→value đã load, theo thứ tự key."""
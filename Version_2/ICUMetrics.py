@@ -0,0 +1,79 @@
+from bisect import bisect_left
+from typing import Dict
+
+# Mặc định đo mọi dòng; N > 1 chỉ đo một dòng trong N
+DEFAULT_SAMPLE_EVERY = 1
+
+# Cận trên (micro giây) của các ô histogram độ trễ; ô cuối nhận mọi giá trị lớn hơn
+HISTOGRAM_BOUNDS_US = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 100000)
+
+
+class StageStats:
+    """Counters of one pipeline stage over the sampled lines."""
+
+    __slots__ = ("calls", "seconds", "max_seconds", "histogram", "bytes_in", "bytes_out")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS_US) + 1)
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def record(self, seconds: float, text_in: str, text_out: str) -> None:
+        self.calls += 1
+        self.seconds += seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+        self.histogram[bisect_left(HISTOGRAM_BOUNDS_US, seconds * 1e6)] += 1
+        self.bytes_in += len(text_in.encode("utf-8"))
+        self.bytes_out += len(text_out.encode("utf-8"))
+
+    def to_dict(self) -> Dict[str, object]:
+        labels = [f"<={bound}us" for bound in HISTOGRAM_BOUNDS_US] + [f">{HISTOGRAM_BOUNDS_US[-1]}us"]
+        return {
+            "calls": self.calls,
+            "seconds": self.seconds,
+            "mean_us": self.seconds / self.calls * 1e6 if self.calls else 0.0,
+            "max_us": self.max_seconds * 1e6,
+            "histogram": dict(zip(labels, self.histogram)),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+        }
+
+
+class PipelineMetrics:
+    """
+    Per-stage instrumentation of Normalizer, always on:
+    - sample: whether the next line is measured (one line in `sample_every`)
+    - record: time and input / output size of one stage call of a measured line
+    - stats: counters of every stage (StageStats.to_dict) in pipeline order
+    Lines that are not sampled only cost a counter increment.
+    """
+
+    STAGES = ("cleanup", "special_case", "date_time", "math", "address", "symbols", "tokens")
+
+    def __init__(self, sample_every: int = DEFAULT_SAMPLE_EVERY):
+        self.sample_every = max(1, sample_every)
+        self.lines = 0
+        self.sampled = 0
+        self.stages: Dict[str, StageStats] = {stage: StageStats() for stage in PipelineMetrics.STAGES}
+
+    def sample(self) -> bool:
+        self.lines += 1
+        if self.lines % self.sample_every:
+            return False
+        self.sampled += 1
+        return True
+
+    def record(self, stage: str, seconds: float, text_in: str, text_out: str) -> None:
+        self.stages[stage].record(seconds, text_in, text_out)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "lines": self.lines,
+            "sampled": self.sampled,
+            "sample_every": self.sample_every,
+            "stages": {stage: stats.to_dict() for stage, stats in self.stages.items()},
+        }
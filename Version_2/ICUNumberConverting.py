@@ -1,5 +1,19 @@
 import re
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy là tùy chọn: convert_many gọi convert_number từng số
+    np = None
+
+# Số kết quả convert_number được nhớ (dùng chung giữa mọi instance)
+NUMBER_MEMO_ENTRIES = 1 << 16
+
+# Số dài hơn thì đọc từng chữ số
+MAX_GROUPED_DIGITS = 15
+
+# Bảng số La Mã bao phủ 1..ROMAN_MAX; lớn hơn là "MMMM..." + phần dưới 1000
+ROMAN_MAX = 3999
 
 class ConvertingNumber:
     def __init__(self):
@@ -160,7 +174,77 @@ class ConvertingNumber:
             return num
     
     def convert_number(self, num: str) -> str:
-        """Main function to convert number to Vietnamese words"""
+        """
+        Main function to convert number to Vietnamese words: same output as
+        convert_number_reference, read group by group from the 0-999 tables
+        """
+        words = _NUMBER_MEMO.get(num)
+        if words is not None:
+            return words
+        if not (num.isascii() and num.isdigit()):
+            # Chuỗi rỗng, chữ số ngoài ASCII (², ٣, ...): bộ đọc gốc
+            return self.convert_number_reference(num)
+
+        digits = num.lstrip("0")
+        if not digits:
+            words = "không" if num == "0" else ""
+        elif len(digits) > MAX_GROUPED_DIGITS:
+            words = " ".join(map(_DIGIT_WORDS.__getitem__, digits))
+        else:
+            words = self._read_integer(int(digits))
+        if len(_NUMBER_MEMO) < NUMBER_MEMO_ENTRIES and len(num) <= MAX_GROUPED_DIGITS:
+            _NUMBER_MEMO[num] = words
+        return words
+
+    @staticmethod
+    def _read_integer(value: int) -> str:
+        """Words of 0 < value < 10^15 (no leading zeros)"""
+        if value < 1000:
+            return _LEAD_GROUP[value]
+        # Chia thành các khối 9 chữ số (đơn vị tỷ), rồi nhóm 3 chữ số trong mỗi khối
+        chunks = []
+        while value:
+            value, chunk = divmod(value, 1_000_000_000)
+            chunks.append(chunk)
+        parts = []
+        lead = True
+        for billions in range(len(chunks) - 1, -1, -1):
+            millions, rest = divmod(chunks[billions], 1_000_000)
+            thousands, units = divmod(rest, 1000)
+            words = []
+            for group, unit in ((millions, " triệu"), (thousands, " nghìn"), (units, "")):
+                if group:
+                    # Nhóm đầu tiên của số không đọc "không trăm"
+                    words.append((_LEAD_GROUP if lead else _INNER_GROUP)[group] + unit)
+                    lead = False
+            if words:
+                parts.append(" ".join(words) + " tỷ" * billions)
+        result = ", ".join(parts)
+        if len(result) < 60:
+            result = result.replace("tỷ,", "tỷ")
+        return result
+
+    def convert_many(self, values: Iterable[int]) -> List[str]:
+        """
+        [convert_number(str(v)) for v in values], for a list or a NumPy array
+        of integers. With NumPy, the 3-digit groups of the whole array are
+        split and looked up at once; values outside 0..10^15 and non-integer
+        arrays go through convert_number.
+        """
+        if np is None:
+            return [self.convert_number(str(value)) for value in values]
+        array = np.asarray(values).ravel()
+        if array.dtype.kind not in "iu":
+            return [self.convert_number(str(value)) for value in array.tolist()]
+        grouped = (array >= 0) & (array < 10 ** MAX_GROUPED_DIGITS)
+        words = np.empty(len(array), dtype=object)
+        words[grouped] = _read_integers(array[grouped].astype(np.int64))
+        for index in np.flatnonzero(~grouped):
+            words[index] = self.convert_number(str(array[index].item()))
+        return words.tolist()
+
+    def convert_number_reference(self, num: str) -> str:
+        """Original string-slicing engine, kept as the reference convert_number must match"""
         if not num:
             return ""
         
@@ -177,7 +261,7 @@ class ConvertingNumber:
         if len(result) > 15:
             long_result = ""
             for char in result:
-                long_result += " " + self.convert_number(char)
+                long_result += " " + self.convert_number_reference(char)
             return long_result.strip()
         
         if not result:
@@ -196,6 +280,12 @@ class ConvertingNumber:
     
     def decimal_to_roman(self, number: int) -> str:
         """Convert decimal number to Roman numerals"""
+        if 0 < number <= ROMAN_MAX and isinstance(number, int):
+            return _roman_tables()[0][number]
+        return self.decimal_to_roman_reference(number)
+
+    def decimal_to_roman_reference(self, number: int) -> str:
+        """Original subtract-and-append decimal_to_roman, also used above ROMAN_MAX"""
         if number <= 0:
             return ""
         
@@ -212,8 +302,30 @@ class ConvertingNumber:
         
         return result
     
+    def read_roman(self, roman: str) -> Optional[Tuple[int, str]]:
+        """(value, spoken form) of a valid Roman numeral in any case, None if it is not one"""
+        readings = _roman_tables()[1]
+        upper = roman.upper()
+        reading = readings.get(upper)
+        if reading is not None or not upper.startswith("MMMM"):
+            return reading
+        # Trên 3999: chỉ có thể là M lặp lại rồi một số La Mã dưới 1000
+        rest = upper.lstrip("M")
+        below = readings.get(rest) if rest else (0, "")
+        if below is None:
+            return None
+        value = (len(upper) - len(rest)) * 1000 + below[0]
+        return value, self.convert_number(str(value))
+
     def roman_to_decimal(self, roman: str) -> str:
         """Convert Roman numerals to decimal string"""
+        if not roman:
+            return roman
+        reading = self.read_roman(roman)
+        return str(reading[0]) if reading else roman
+
+    def roman_to_decimal_reference(self, roman: str) -> str:
+        """Original check-by-rebuilding roman_to_decimal, kept as the reference read_roman must match"""
         if not roman:
             return roman
         
@@ -244,7 +356,7 @@ class ConvertingNumber:
                 total += values[i]
         
         # Verify if the conversion is correct by converting back
-        if roman_upper == self.decimal_to_roman(total):
+        if roman_upper == self.decimal_to_roman_reference(total):
             return str(total)
         else:
             return roman  # Return original if conversion doesn't match
@@ -283,4 +395,78 @@ class ConvertingNumber:
         for roman, expected in roman_tests:
             result = self.roman_to_decimal(roman)
             status = "✓" if result == expected else "✗"
-            print(f"{status} {roman} -> {result} (expected: {expected})")
\ No newline at end of file
+            print(f"{status} {roman} -> {result} (expected: {expected})")
+
+
+def _group_tables():
+    """Words of every 3-digit group, from the reference engine: (leading group, inner group)"""
+    reference = ConvertingNumber()
+    lead = tuple(reference.convert_number_lt_thousand(str(n)) for n in range(1000))
+    inner = tuple(reference.convert_number_lt_thousand(f"{n:03d}") for n in range(1000))
+    return lead, inner
+
+_LEAD_GROUP, _INNER_GROUP = _group_tables()
+_DIGIT_WORDS = {str(d): word for d, word in enumerate(ConvertingNumber().CHU_SO)}
+_NUMBER_MEMO: Dict[str, str] = {}
+
+
+_BATCH_TABLES = None
+
+def _batch_tables():
+    """
+    NumPy tables of _read_integers, for each group position k (units,
+    thousands, millions of the low 9-digit chunk, then units, thousands of
+    the tỷ chunk): words of the group as the first group of the number,
+    words of any other group (with a leading space), and their lengths.
+    """
+    global _BATCH_TABLES
+    if _BATCH_TABLES is None:
+        tables = []
+        for unit in ("", " nghìn", " triệu", "", " nghìn"):
+            lead = [words + unit for words in _LEAD_GROUP]
+            inner = [f" {words}{unit}" if group else "" for group, words in enumerate(_INNER_GROUP)]
+            lead[0] = _LEAD_GROUP[0]
+            tables.append((np.array(lead, dtype=object), np.array(inner, dtype=object),
+                           np.array([len(words) for words in lead]), np.array([len(words) for words in inner])))
+        _BATCH_TABLES = tables
+    return _BATCH_TABLES
+
+def _read_integers(values: "np.ndarray") -> "np.ndarray":
+    """Words of every value of an int64 array of 0 <= values < 10^15, as an object array"""
+    tables = _batch_tables()
+    # Vị trí của nhóm đầu tiên (khác 0) của mỗi số
+    top = sum((values >= 1000 ** k).astype(np.int8) for k in range(1, 5))
+    pieces = []
+    length = np.zeros(len(values), dtype=np.int64)
+    for k, (lead, inner, lead_length, inner_length) in enumerate(tables):
+        group = values // 1000 ** k % 1000
+        is_top = top == k
+        pieces.append(np.where(is_top, lead[group], inner[group]))
+        length += np.where(is_top, lead_length[group], inner_length[group])
+    # Khối tỷ: "tỷ," chỉ giữ dấu phẩy khi cả câu dài từ 60 ký tự
+    billions = values >= 1_000_000_000
+    comma = billions & (values % 1_000_000_000 != 0) & (length + len(" tỷ,") >= 60)
+    ty = np.where(comma, " tỷ,", np.where(billions, " tỷ", ""))
+    return pieces[4] + pieces[3] + ty + pieces[2] + pieces[1] + pieces[0]
+
+_ROMAN_TABLES: Optional[Tuple[Tuple[str, ...], Dict[str, Tuple[int, str]]]] = None
+
+def _roman_tables() -> Tuple[Tuple[str, ...], Dict[str, Tuple[int, str]]]:
+    """
+    (numeral of each value 0..ROMAN_MAX, numeral → (value, spoken form)),
+    built on first use and shared by every instance
+    """
+    global _ROMAN_TABLES
+    if _ROMAN_TABLES is None:
+        # Mỗi hàng (nghìn, trăm, chục, đơn vị) viết độc lập
+        places = (("", "M", "MM", "MMM"),
+                  ("", "C", "CC", "CCC", "CD", "D", "DC", "DCC", "DCCC", "CM"),
+                  ("", "X", "XX", "XXX", "XL", "L", "LX", "LXX", "LXXX", "XC"),
+                  ("", "I", "II", "III", "IV", "V", "VI", "VII", "VIII", "IX"))
+        numerals = tuple(places[0][n // 1000] + places[1][n // 100 % 10]
+                         + places[2][n // 10 % 10] + places[3][n % 10]
+                         for n in range(ROMAN_MAX + 1))
+        reader = ConvertingNumber()
+        readings = {numeral: (n, reader.convert_number(str(n))) for n, numeral in enumerate(numerals) if n}
+        _ROMAN_TABLES = (numerals, readings)
+    return _ROMAN_TABLES
@@ -0,0 +1,129 @@
+import re
+from typing import List, Optional, Tuple
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+# Số trigger tối đa giữ lại cho mỗi rule (chọn các trigger chọn lọc nhất)
+MAX_TRIGGERS = 2
+
+# Trigger có điểm thấp hơn (khoảng trắng, lớp ký tự rộng) tốn công kiểm tra hơn là lợi
+MIN_TRIGGER_SCORE = 5
+
+# Lớp ký tự rộng hơn ngưỡng này coi như khớp gần mọi dòng → không dùng làm trigger
+MAX_CLASS_CHARS = 64
+
+_IGNORECASE = sre_constants.SRE_FLAG_IGNORECASE
+_DIGIT = (sre_constants.CATEGORY_DIGIT, getattr(sre_constants, "CATEGORY_UNI_DIGIT", None))
+
+# Một "atom" bắt buộc: (regex source, điểm chọn lọc); điểm càng cao càng hiếm gặp
+Atom = Tuple[str, int]
+
+
+def _flagged(source: str, ignorecase: bool) -> str:
+    return f"(?i:{source})" if ignorecase else source
+
+
+def _class_atom(items, ignorecase: bool) -> Optional[Atom]:
+    """Atom of a character class, or None when it is negated or too wide to help."""
+    parts = []
+    size = 0
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            parts.append(re.escape(chr(av)))
+            size += 1
+        elif op is sre_constants.RANGE:
+            parts.append(f"{re.escape(chr(av[0]))}-{re.escape(chr(av[1]))}")
+            size += av[1] - av[0] + 1
+        elif op is sre_constants.CATEGORY and av in _DIGIT:
+            parts.append(r"\d")
+            size += 10
+        else:
+            # NEGATE, \w, \s, ... → khớp quá nhiều
+            return None
+    if size > MAX_CLASS_CHARS:
+        return None
+    if parts == [r"\d"]:
+        # Phần lớn các dòng không có chữ số → trigger tốt nhất
+        return r"\d", 30
+    return _flagged("[" + "".join(parts) + "]", ignorecase), (6 if size <= 16 else 3)
+
+
+def _literal_atom(chars: List[int], ignorecase: bool) -> Atom:
+    text = "".join(map(chr, chars))
+    if text.isspace():
+        # Khoảng trắng có trong gần như mọi dòng
+        return _flagged(re.escape(text), ignorecase), 1
+    return _flagged(re.escape(text), ignorecase), (10 + len(text) if len(text) > 1 else 5)
+
+
+def _required_atoms(subpattern, flags: int) -> List[Atom]:
+    """Atoms that every match of `subpattern` must contain (each one independently)."""
+    atoms: List[Atom] = []
+    run: List[int] = []
+    ignorecase = bool(flags & _IGNORECASE)
+
+    def end_run():
+        if run:
+            atoms.append(_literal_atom(run, ignorecase))
+            run.clear()
+
+    for op, av in subpattern:
+        if op is sre_constants.LITERAL:
+            run.append(av)
+            continue
+        end_run()
+        if op is sre_constants.IN:
+            atom = _class_atom(av, ignorecase)
+            if atom:
+                atoms.append(atom)
+        elif op is sre_constants.SUBPATTERN:
+            _, add_flags, del_flags, sub = av
+            atoms.extend(_required_atoms(sub, (flags | add_flags) & ~del_flags))
+        elif op is getattr(sre_constants, "ATOMIC_GROUP", None):
+            atoms.extend(_required_atoms(av, flags))
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT,
+                    getattr(sre_constants, "POSSESSIVE_REPEAT", None)):
+            low, _, sub = av
+            if low >= 1:
+                atoms.extend(_required_atoms(sub, flags))
+        elif op is sre_constants.BRANCH:
+            atom = _branch_atom(av[1], flags)
+            if atom:
+                atoms.append(atom)
+        # AT, ASSERT, ASSERT_NOT, ANY, NOT_LITERAL, GROUPREF, ... không bắt buộc ký tự cụ thể nào
+    end_run()
+    return atoms
+
+
+def _branch_atom(alternatives, flags: int) -> Optional[Atom]:
+    """One atom per alternative, or-ed together; None if some alternative has none."""
+    best = []
+    for alternative in alternatives:
+        atoms = _required_atoms(alternative, flags)
+        if not atoms:
+            return None
+        best.append(max(atoms, key=lambda atom: atom[1]))
+    sources = list(dict.fromkeys(source for source, _ in best))
+    if len(sources) == 1:
+        return best[0]
+    return "|".join(sources), min(score for _, score in best) - 1
+
+
+def trigger_sources(pattern: str, flags: int = 0, limit: int = MAX_TRIGGERS) -> List[str]:
+    """
+    Regex sources that must each find a match in a text for `pattern` to match it,
+    most selective first, e.g. "(?i)(phòng|lớp) [0-9]+" → ["(?i:phòng)|(?i:lớp)", "(?i:[0-9])"].
+    An empty list means no cheap precondition was found.
+    """
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except re.error:
+        return []
+    atoms = _required_atoms(parsed, parsed.state.flags)
+    atoms.sort(key=lambda atom: -atom[1])
+    return list(dict.fromkeys(source for source, score in atoms if score >= MIN_TRIGGER_SCORE))[:limit]
@@ -0,0 +1,210 @@
+import cProfile
+import io
+import os
+import pstats
+import signal
+import sys
+import time
+import types
+from collections import Counter
+
+from ICUConstant import REGEX_FOLDER
+
+# Khoảng thời gian CPU giữa hai lần lấy mẫu stack (giây)
+SAMPLE_INTERVAL = 0.001
+
+# Số hàm in ra trong mỗi bảng của file thống kê
+PROFILE_TOP = 100
+
+# Các method của regex được gọi qua tên của rule
+_REGEX_METHODS = ("sub", "subn", "search", "match", "fullmatch", "finditer", "findall")
+
+
+def _renamed(function: types.FunctionType, name: str, filename: str, line: int) -> types.FunctionType:
+    """Copy of `function` that profilers report as `name` at filename:line."""
+    code = function.__code__.replace(co_name=name, co_filename=filename, co_firstlineno=max(1, line))
+    if hasattr(code, "co_qualname"):  # Python 3.11+
+        code = code.replace(co_qualname=name)
+    return types.FunctionType(code, function.__globals__, name, function.__defaults__, function.__closure__)
+
+
+def _forward(method):
+    def call(*args, **kwargs):
+        return method(*args, **kwargs)
+    return call
+
+
+class LabelledRegex:
+    """
+    Stand-in for the compiled regex of a rule: the matching methods run inside a
+    function named after the rule (e.g. "Address.Codenumber" at Codenumber.txt:1),
+    so cProfile and the stack samples charge the regex time to the rule instead
+    of to a generic re.sub. Everything else is read from the wrapped regex.
+    """
+
+    def __init__(self, regex, name: str, filename: str, line: int):
+        self.regex = regex
+        for method in _REGEX_METHODS:
+            setattr(self, method, _renamed(_forward(getattr(regex, method)), name, filename, line))
+
+    def __getattr__(self, attr):
+        return getattr(self.regex, attr)
+
+
+def module_rules(module):
+    """Rules of a rule module: module.rules, or module.steps (Math.STEPS) for Math."""
+    steps = getattr(module, "steps", None)
+    return iter(steps if steps is not None else module.rules)
+
+
+def label_rules(module) -> None:
+    """Wrap the rule regexes of a rule module (see module_rules) in LabelledRegex."""
+    owner = type(module).__name__
+    for rule in module_rules(module):
+        if isinstance(rule.regex, LabelledRegex):
+            continue
+        if isinstance(rule.category, str):
+            # Bảng regex viết trong code (Math.STEPS): tên bước
+            name, filename = f"{owner}.{rule.category}", rule.source
+        else:
+            name = f"{owner}.{os.path.splitext(rule.source)[0]}"
+            filename = os.path.join(REGEX_FOLDER, rule.source)
+        rule.regex = LabelledRegex(rule.regex, name, filename, rule.line)
+
+
+class TimedRegex:
+    """
+    Stand-in for the compiled regex of a rule that accumulates wall time:
+    - seconds: time inside sub / subn / search / match, callbacks included
+    - callback_seconds: part of it spent in the replacement callbacks
+    - calls: number of those calls (one per span searched)
+    Everything else is read from the wrapped regex.
+    """
+
+    def __init__(self, regex):
+        self.regex = regex
+        self.seconds = 0.0
+        self.callback_seconds = 0.0
+        self.calls = 0
+
+    def _timed_callback(self, replace):
+        if not callable(replace):
+            return replace
+
+        def call(m):
+            start = time.perf_counter()
+            try:
+                return replace(m)
+            finally:
+                self.callback_seconds += time.perf_counter() - start
+        return call
+
+    def _timed(self, method, *args, **kwargs):
+        self.calls += 1
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+    def sub(self, replace, string, count=0):
+        return self._timed(self.regex.sub, self._timed_callback(replace), string, count)
+
+    def subn(self, replace, string, count=0):
+        return self._timed(self.regex.subn, self._timed_callback(replace), string, count)
+
+    def search(self, *args, **kwargs):
+        return self._timed(self.regex.search, *args, **kwargs)
+
+    def match(self, *args, **kwargs):
+        return self._timed(self.regex.match, *args, **kwargs)
+
+    def __getattr__(self, attr):
+        return getattr(self.regex, attr)
+
+
+def time_rules(module) -> None:
+    """Wrap the rule regexes of a rule module in TimedRegex (see module_rules)."""
+    for rule in module_rules(module):
+        if not isinstance(rule.regex, TimedRegex):
+            rule.regex = TimedRegex(rule.regex)
+
+
+class StackSampler:
+    """
+    Samples the Python stack of the main thread every SAMPLE_INTERVAL seconds of
+    CPU time (SIGPROF) and counts identical stacks, in the collapsed format of
+    flame graph tools: "Main.py:main;Normalizer.py:Normalizer.normalize;... <count>".
+    Not available on platforms without setitimer (Windows).
+    """
+
+    AVAILABLE = hasattr(signal, "setitimer") and hasattr(signal, "SIGPROF")
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._previous_handler = None
+
+    def _on_signal(self, signum, frame) -> None:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{os.path.basename(code.co_filename)}:{getattr(code, 'co_qualname', code.co_name)}")
+            frame = frame.f_back
+        self.stacks[";".join(reversed(names)).replace(" ", "_")] += 1
+
+    def __enter__(self) -> "StackSampler":
+        if self.AVAILABLE:
+            self._previous_handler = signal.signal(signal.SIGPROF, self._on_signal)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        if self.AVAILABLE:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, self._previous_handler)
+        return False
+
+    def write(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+
+class Profiler:
+    """
+    cProfile + StackSampler around a block of work, used as a context manager.
+    On exit writes, for a path prefix P:
+    - P.prof: raw cProfile data (pstats, snakeviz, ...)
+    - P.txt: functions sorted by own time and by cumulative time
+    - P.collapsed: sampled stacks for flame graph tools (flamegraph.pl, speedscope)
+    """
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.profile = cProfile.Profile()
+        self.sampler = StackSampler()
+
+    def __enter__(self) -> "Profiler":
+        self.sampler.__enter__()
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self.profile.disable()
+        self.sampler.__exit__(*exc)
+        self.write()
+        return False
+
+    def write(self) -> None:
+        self.profile.dump_stats(self.prefix + ".prof")
+        out = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=out)
+        for key in ("tottime", "cumulative"):
+            stats.sort_stats(key).print_stats(PROFILE_TOP)
+        with open(self.prefix + ".txt", "w", encoding="utf-8") as f:
+            f.write(out.getvalue())
+        if StackSampler.AVAILABLE:
+            self.sampler.write(self.prefix + ".collapsed")
+        else:
+            print("[INFO] Stack sampling needs SIGPROF, no collapsed-stack file written", file=sys.stderr)
@@ -1,4 +1,6 @@
 import sys
+from typing import List, Optional, Tuple
+from ICUSnapshot import get_snapshot
 
 class ICUReadFile:
     """
@@ -76,3 +78,31 @@ class ICUReadFile:
 
     def get_file_length(self) -> int:
         return self.file_len
+
+
+def read_rule_entries(path: str) -> Optional[List[Tuple[int, str]]]:
+    """
+    Read a RegexRule file into (line number, stripped line) pairs, skipping empty
+    lines and using the same line splitting as ICUReadFile.next_line. Line numbers
+    start at 1. Returns None if the file cannot be read. Results are cached in the
+    resource snapshot.
+    """
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        cached = snapshot.lookup(path, "rule_entries")
+        if cached is not None:
+            return [tuple(entry) for entry in cached]
+    reader = ICUReadFile(path)
+    if not reader.read_file():
+        return None
+    entries = []
+    pos = 0
+    while pos < reader.get_file_length():
+        reader.next_line(pos)
+        line = reader.get_content_uchar()[reader.get_line_start():reader.get_line_end()].strip()
+        if line:
+            entries.append((reader.line_num + 1, line))
+        pos = reader.get_line_end()
+    if snapshot is not None:
+        snapshot.store(path, "rule_entries", entries)
+    return entries
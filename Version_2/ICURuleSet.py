@@ -0,0 +1,413 @@
+import os
+import re
+import sys
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from ICUBudget import check_budget
+from ICUPrefilter import trigger_sources
+from ICUReadFile import read_rule_entries
+from ICUSpans import SpanText, spans_of, split_matches
+
+# Dòng có dạng r'...' / r"..." (viết theo cú pháp Python) → lấy phần bên trong
+_PY_RAW_STRING = re.compile(r"""^[rR](['"])(.*)\1$""")
+
+# Cờ toàn cục đặt ở đầu pattern, vd. "(?i)"
+_LEADING_FLAGS = re.compile(r"^\(\?([aiLmsux]+)\)")
+
+
+def scope_pattern(pattern: str, offset: int, prefix: str) -> str:
+    """
+    Rewrite `pattern` so it can sit inside a larger alternation:
+    - leading global flags "(?i)" become a scoped group "(?i:...)"
+    - numeric backreferences \\N are shifted by `offset` groups
+    - named groups / (?P=name) references get `prefix` so names stay unique
+    Raises ValueError when a global flag appears after the start.
+    """
+    flags = ""
+    lead = _LEADING_FLAGS.match(pattern)
+    if lead:
+        flags = lead.group(1)
+        pattern = pattern[lead.end():]
+    out = []
+    i, n = 0, len(pattern)
+    in_class = False
+    while i < n:
+        c = pattern[i]
+        if c == '\\' and i + 1 < n:
+            j = i + 1
+            octal = pattern[j:j + 3]
+            if (not in_class and pattern[j] in "123456789"
+                    and not (len(octal) == 3 and all(d in "01234567" for d in octal))):
+                k = j + 2 if j + 1 < n and pattern[j + 1].isdigit() else j + 1
+                # \N → tham chiếu tới group đã dời chỗ; (?:...) để không dính với chữ số phía sau
+                out.append(f"(?:\\{int(pattern[j:k]) + offset})")
+                i = k
+                continue
+            out.append(pattern[i:i + 2])
+            i += 2
+            continue
+        if in_class:
+            if c == ']':
+                in_class = False
+            out.append(c)
+            i += 1
+            continue
+        if c == '[':
+            # "]" ngay sau "[" hoặc "[^" là ký tự thường
+            j = i + 1
+            if j < n and pattern[j] == '^':
+                j += 1
+            if j < n and pattern[j] == ']':
+                j += 1
+            out.append(pattern[i:j])
+            in_class = True
+            i = j
+            continue
+        if pattern.startswith("(?P<", i):
+            out.append("(?P<" + prefix)
+            i += 4
+            continue
+        if pattern.startswith("(?P=", i):
+            out.append("(?P=" + prefix)
+            i += 4
+            continue
+        if _LEADING_FLAGS.match(pattern, i):
+            raise ValueError(f"global flags in the middle of {pattern!r}")
+        out.append(c)
+        i += 1
+    body = "".join(out)
+    return f"(?{flags}:{body})" if flags else body
+
+
+class Rule:
+    """One compiled line of a RegexRule file with where it came from."""
+
+    __slots__ = ("category", "pattern", "flags", "regex", "source", "line", "index",
+                 "triggers", "runs", "skips", "matches")
+
+    def __init__(self, category: int, pattern: str, flags: int, regex: "re.Pattern",
+                 source: str, line: int, index: int, triggers: tuple = ()):
+        self.category = category
+        self.pattern = pattern
+        self.flags = flags
+        self.regex = regex
+        self.source = source    # tên file rule
+        self.line = line        # số dòng trong file (bắt đầu từ 1)
+        self.index = index      # thứ tự của rule trong category
+        self.triggers = triggers  # regex phải khớp ở đâu đó trong dòng thì rule mới có thể khớp
+        self.runs = 0
+        self.skips = 0
+        self.matches = 0
+
+    def __repr__(self) -> str:
+        return f"Rule({self.category!r}, {self.source}:{self.line}, {self.pattern!r})"
+
+
+class RuleSet:
+    """
+    Compiled regex rules of one module, grouped by category in load order:
+    - load: read a RegexRule file, compile every line once with `flags`;
+      lines that do not compile are reported (file:line) and skipped
+    - rules: compiled rules of one category, in file order
+    - categories: categories in the order they were loaded
+    - errors: (source, line, pattern, message) of every rejected line
+    - apply: run the rules of some categories in order, one sub() per rule
+    - apply_spans: same on a SpanText, searching only its unresolved spans
+    - scan: single-pass alternative to apply (see master)
+    - stats: how many rule evaluations the prefilter skipped
+    - match_counts: matches replaced per category
+    With `prefilter`, each rule keeps the literals / characters every match must
+    contain (ICUPrefilter.trigger_sources); a rule whose triggers are absent from
+    the line is skipped without running it.
+    """
+
+    def __init__(self, flags: int = 0, prefilter: bool = True):
+        self.flags = flags
+        self.prefilter = prefilter
+        self.by_category: Dict[int, List[Rule]] = {}
+        self.errors = []
+        # regex source của trigger → regex đã compile, dùng chung giữa các rule
+        self._triggers: Dict[str, "re.Pattern"] = {}
+        # categories → (master regex, group name → rule)
+        self._masters: Dict[Tuple[int, ...], Tuple[Optional["re.Pattern"], Dict[str, Rule]]] = {}
+
+    def __iter__(self) -> Iterator[Rule]:
+        for rules in self.by_category.values():
+            yield from rules
+
+    def __len__(self) -> int:
+        return sum(len(rules) for rules in self.by_category.values())
+
+    def categories(self) -> List[int]:
+        return list(self.by_category)
+
+    def rules(self, category: int) -> List[Rule]:
+        return self.by_category.get(category, [])
+
+    def load(self, category: int, path: str, skip_comments: bool = False) -> bool:
+        """Compile the rules of `path` into `category`; False if the file cannot be read."""
+        entries = read_rule_entries(path)
+        if entries is None:
+            print(f"[E] Error reading pattern file: {os.path.basename(path)}", file=sys.stderr)
+            return False
+        rules = self.by_category.setdefault(category, [])
+        source = os.path.basename(path)
+        for line_no, pattern in entries:
+            if skip_comments and pattern.startswith('#'):
+                continue
+            raw = _PY_RAW_STRING.match(pattern)
+            if raw:
+                pattern = raw.group(2)
+            self.add(category, pattern, source, line_no)
+        return True
+
+    def add(self, category: int, pattern: str, source: str = "<inline>", line: int = 0) -> Optional[Rule]:
+        """Compile one rule at the end of `category`; None (and reported) if it does not compile."""
+        rules = self.by_category.setdefault(category, [])
+        rule = self.compile(category, pattern, source, line, len(rules))
+        if rule is not None:
+            rules.append(rule)
+            self._masters.clear()
+        return rule
+
+    def compile(self, category: int, pattern: str, source: str = "<inline>",
+                line: int = 0, index: int = 0) -> Optional[Rule]:
+        try:
+            regex = re.compile(pattern, self.flags)
+        except re.error as e:
+            print(f"[E] Bad regex in {source}:{line}: {pattern} ({e})", file=sys.stderr)
+            self.errors.append((source, line, pattern, str(e)))
+            return None
+        triggers = ()
+        if self.prefilter:
+            triggers = tuple(self._trigger(trigger) for trigger in trigger_sources(pattern, self.flags))
+        return Rule(category, pattern, self.flags, regex, source, line, index, triggers)
+
+    def _trigger(self, source: str) -> "re.Pattern":
+        regex = self._triggers.get(source)
+        if regex is None:
+            regex = self._triggers[source] = re.compile(source)
+        return regex
+
+    def may_match(self, rule: Rule, text: str, seen: Dict["re.Pattern", bool]) -> bool:
+        """
+        False when a trigger of `rule` is absent from `text`, so the rule cannot match.
+        `seen` memoizes trigger results for this exact text (shared by all rules).
+        """
+        if self._triggered(rule, text, seen):
+            rule.runs += 1
+            return True
+        rule.skips += 1
+        return False
+
+    @staticmethod
+    def _triggered(rule: Rule, text: str, seen: Dict["re.Pattern", bool]) -> bool:
+        for trigger in rule.triggers:
+            found = seen.get(trigger)
+            if found is None:
+                found = seen[trigger] = trigger.search(text) is not None
+            if not found:
+                return False
+        return True
+
+    def apply(self, text: str, replacers: Dict[int, Callable[["re.Match"], str]],
+              categories: Sequence[int]) -> str:
+        """Run the rules of `categories` in order, each with rule.regex.sub(replacers[category])."""
+        seen = {}
+        for category in categories:
+            replace = replacers[category]
+            for rule in self.by_category.get(category, ()):
+                # = may_match, viết gọn trong vòng lặp vì đây là đường nóng
+                for trigger in rule.triggers:
+                    found = seen.get(trigger)
+                    if found is None:
+                        found = seen[trigger] = trigger.search(text) is not None
+                    if not found:
+                        break
+                else:
+                    found = True
+                if not found:
+                    rule.skips += 1
+                    continue
+                rule.runs += 1
+                check_budget()
+                result, count = rule.regex.subn(replace, text)
+                rule.matches += count
+                if result is not text:
+                    # Dòng đã đổi → kết quả trigger cũ không còn đúng
+                    text = result
+                    seen = {}
+        return text
+
+    def apply_spans(self, spans: SpanText, replacers: Dict[int, Callable[["re.Match"], str]],
+                    categories: Sequence[int]) -> SpanText:
+        """
+        apply() on the unresolved spans of `spans`, in place: each replacement
+        becomes a resolved span that the following rules do not search again.
+        """
+        # text của span → {trigger: có khớp}; span không đổi thì giữ kết quả
+        seen: Dict[str, Dict["re.Pattern", bool]] = {}
+        for category in categories:
+            replace = replacers[category]
+            for rule in self.by_category.get(category, ()):
+                ran = False
+                changes = {}
+                for index, (text, resolved) in enumerate(spans.spans):
+                    if resolved:
+                        continue
+                    memo = seen.get(text)
+                    if memo is None:
+                        memo = seen[text] = {}
+                    # = _triggered, viết gọn trong vòng lặp như apply
+                    for trigger in rule.triggers:
+                        found = memo.get(trigger)
+                        if found is None:
+                            found = memo[trigger] = trigger.search(text) is not None
+                        if not found:
+                            break
+                    else:
+                        found = True
+                    if not found:
+                        continue
+                    if not ran:
+                        ran = True
+                        check_budget()
+                    split, count = split_matches(text, rule.regex, replace, spans.resolve)
+                    rule.matches += count
+                    if split is not None:
+                        changes[index] = split
+                if ran:
+                    rule.runs += 1
+                else:
+                    rule.skips += 1
+                if changes:
+                    spans.replace(changes)
+        return spans
+
+    def stats(self) -> Dict[str, object]:
+        """Prefilter counters: rule evaluations run / skipped, overall and per rule."""
+        runs = sum(rule.runs for rule in self)
+        skips = sum(rule.skips for rule in self)
+        total = runs + skips
+        return {
+            "rules": len(self),
+            "evaluations": total,
+            "runs": runs,
+            "skipped": skips,
+            "skip_rate": skips / total if total else 0.0,
+            "per_rule": {f"{rule.source}:{rule.line}": {"runs": rule.runs, "skipped": rule.skips,
+                                                        "matches": rule.matches}
+                         for rule in self},
+        }
+
+    def match_counts(self) -> Dict[str, int]:
+        """Matches replaced so far per category, named after its rule file (or the category itself)."""
+        counts: Dict[str, int] = {}
+        for category, rules in self.by_category.items():
+            if isinstance(category, str) or not rules:
+                name = str(category)
+            else:
+                name = os.path.splitext(rules[0].source)[0]
+            counts[name] = counts.get(name, 0) + sum(rule.matches for rule in rules)
+        return counts
+
+    def master(self, categories: Sequence[int], limit: Optional[int] = None
+               ) -> Tuple[Optional["re.Pattern"], Dict[str, Rule]]:
+        """
+        One alternation "(?P<_r0>rule0)|(?P<_r1>rule1)|..." over the rules of
+        `categories` in that order (only the first `limit` rules when given).
+        The group name "_r<k>" of a rule is its priority rank k.
+        Returns (None, {}) when the rules cannot be merged.
+        """
+        key = (tuple(categories), limit)
+        if key in self._masters:
+            return self._masters[key]
+        parts = []
+        names: Dict[str, Rule] = {}
+        groups = 0
+        try:
+            for category in key[0]:
+                for rule in self.rules(category):
+                    if limit is not None and len(names) >= limit:
+                        break
+                    name = f"_r{len(names)}"
+                    parts.append(f"(?P<{name}>{scope_pattern(rule.pattern, groups + 1, name + '_')})")
+                    names[name] = rule
+                    groups += 1 + rule.regex.groups
+            regex = re.compile("|".join(parts), self.flags) if parts else None
+        except (ValueError, re.error) as e:
+            print(f"[E] Cannot merge rules into one pattern, keeping one pass per rule: {e}", file=sys.stderr)
+            regex, names = None, {}
+        self._masters[key] = (regex, names)
+        return regex, names
+
+    def scan(self, text: str, replacers: Dict[int, Callable[["re.Match"], str]],
+             categories: Sequence[int]) -> str:
+        """
+        Replace the matches of the rules of `categories` scanning the merged
+        regex left to right, instead of one sub() per rule.
+        The scan is kept only when it is sure to give what apply() gives: all
+        its matches come from one rule, no rule ranked before it matches
+        inside them, and no rule matches in the result (a later rule could
+        match across a replacement, e.g. "3-15/4123"). Otherwise the line
+        goes through apply().
+        replacers[category] receives the match of the rule's own regex, so
+        group numbers are the same as in the rule file.
+        """
+        pieces = self._scan_pieces(text, replacers, categories)
+        if pieces is None:
+            return self.apply(text, replacers, categories)
+        return "".join(piece for piece, _ in pieces)
+
+    def scan_spans(self, spans: SpanText, replacers: Dict[int, Callable[["re.Match"], str]],
+                   categories: Sequence[int]) -> SpanText:
+        """scan() on the unresolved spans of `spans`, in place (see apply_spans)."""
+        def rewrite(text):
+            pieces = self._scan_pieces(text, replacers, categories, spans.resolve)
+            if pieces is None:
+                return self.apply_spans(SpanText(text, spans.resolve), replacers, categories).spans
+            return spans_of(pieces, spans.resolve)
+        spans.rewrite(rewrite)
+        return spans
+
+    def _scan_pieces(self, text, replacers, categories, resolve=False
+                     ) -> Optional[List[Tuple[str, Optional["re.Match"]]]]:
+        """(text, match) pieces of scan(); None when apply() has to run instead."""
+        categories = tuple(categories)
+        seen = {}
+        if not [rule for category in categories for rule in self.rules(category)
+                if self.may_match(rule, text, seen)]:
+            return [(text, None)]
+        regex, names = self.master(categories)
+        if regex is None:
+            return None
+        out = []
+        rule = None
+        pos = 0
+        for m in regex.finditer(text):
+            check_budget()
+            found = names[m.lastgroup]
+            if (rule is not None and found is not rule) or m.end() == m.start():
+                return None
+            rule = found
+            rank = int(m.lastgroup[2:])
+            if rank > 0 and self._higher_match(text, m.start() + 1, m.end(), categories, rank):
+                return None
+            match = rule.regex.match(text, m.start())
+            out.append((text[pos:m.start()], None))
+            out.append((replacers[rule.category](match), match))
+            pos = m.end()
+        out.append((text[pos:], None))
+        if rule is None:
+            return out
+        # Rule sau chạy trên kết quả của rule trước: còn match nào thì scan sai
+        for piece, resolved in spans_of(out, resolve):
+            if not resolved and regex.search(piece):
+                return None
+        rule.matches += len(out) // 2
+        return out
+
+    def _higher_match(self, text, start, stop, categories, rank) -> bool:
+        """True if a rule ranked before `rank` matches starting in [start, stop)."""
+        higher, _ = self.master(categories, rank)
+        return any(higher.match(text, pos) is not None for pos in range(start, stop))
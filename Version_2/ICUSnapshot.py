@@ -0,0 +1,151 @@
+import atexit
+import hashlib
+import marshal
+import os
+import sys
+
+from ICUConstant import SNAPSHOT_FILE, MAPPING_FOLDER, DICT_FOLDER, REGEX_FOLDER
+
+# Tăng khi định dạng snapshot hoặc cách parse của các loader thay đổi
+SNAPSHOT_VERSION = 1
+
+
+def file_digest(path: str) -> str:
+    """SHA-1 of the file content."""
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def resource_fingerprint(folders=(MAPPING_FOLDER, DICT_FOLDER, REGEX_FOLDER)) -> str:
+    """SHA-1 over the names and contents of every file in the resource folders."""
+    h = hashlib.sha1()
+    for folder in folders:
+        try:
+            names = sorted(os.listdir(folder))
+        except OSError:
+            continue
+        for name in names:
+            path = os.path.join(folder, name)
+            if os.path.isfile(path):
+                h.update(f"{folder}/{name}:{file_digest(path)}\n".encode('utf-8'))
+    return h.hexdigest()
+
+
+class ICUSnapshot:
+    """
+    Single-file cache of parsed resource files (mappings, dictionaries, regex rule lists):
+    - lookup: parsed value of a file, or None if the file changed since it was stored
+    - store: remember the parsed value of a file, written to disk by save()
+    - save: atomically rewrite the snapshot file when something changed
+    Each entry is keyed by the source path and the kind of parse, and validated by
+    size + mtime, then by content hash when the mtime moved but the content did not.
+    The file is a marshal dump, so it is also keyed by the Python version.
+    Entries of `skip_kinds` are dropped when the file is read (and from the
+    file at the next save).
+    """
+
+    def __init__(self, path: str = SNAPSHOT_FILE, skip_kinds=()):
+        self.path = path
+        self.skip_kinds = tuple(kind + ":" for kind in skip_kinds)
+        self.entries = {}
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+        self._save_registered = False
+        self._load()
+
+    @staticmethod
+    def _header() -> tuple:
+        return (SNAPSHOT_VERSION, tuple(sys.version_info[:2]))
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, 'rb') as f:
+                header, entries = marshal.loads(f.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            return
+        if header == self._header() and isinstance(entries, dict):
+            if self.skip_kinds:
+                entries = {key: entry for key, entry in entries.items() if not key.startswith(self.skip_kinds)}
+            self.entries = entries
+
+    @staticmethod
+    def _key(path: str, kind: str) -> str:
+        return kind + ":" + os.path.normpath(path)
+
+    def lookup(self, path: str, kind: str):
+        key = self._key(path, kind)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        size, mtime_ns, digest, value = entry
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.misses += 1
+            return None
+        if st.st_size == size and st.st_mtime_ns == mtime_ns:
+            self.hits += 1
+            return value
+        if st.st_size == size and file_digest(path) == digest:
+            # Nội dung không đổi (vd. file được touch/checkout lại) → chỉ cập nhật mtime
+            self.entries[key] = (size, st.st_mtime_ns, digest, value)
+            self._mark_dirty()
+            self.hits += 1
+            return value
+        self.misses += 1
+        return None
+
+    def store(self, path: str, kind: str, value) -> None:
+        try:
+            st = os.stat(path)
+            digest = file_digest(path)
+        except OSError:
+            return
+        self.entries[self._key(path, kind)] = (st.st_size, st.st_mtime_ns, digest, value)
+        self._mark_dirty()
+
+    def _mark_dirty(self) -> None:
+        self.dirty = True
+        if not self._save_registered:
+            atexit.register(self.save)
+            self._save_registered = True
+
+    def save(self) -> bool:
+        """Write the snapshot if it changed; returns False if the folder is not writable."""
+        if not self.dirty:
+            return True
+        # Ghi ra file tạm riêng của process rồi rename → không process nào đọc file dở dang
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(marshal.dumps((self._header(), self.entries)))
+            os.replace(tmp, self.path)
+        except (OSError, ValueError) as e:
+            print(f"[E] Cannot write resource snapshot {self.path}: {e}", file=sys.stderr)
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            return False
+        self.dirty = False
+        return True
+
+
+_snapshot = None
+
+def get_snapshot():
+    """
+    Shared snapshot for this process, or None when disabled with VITEXT_NO_SNAPSHOT=1.
+    With VITEXT_MAPPED_TABLES=1 the dictionaries / mappings are read from their
+    mmap tables (see ICUMappedTable), so their parsed copies are not kept.
+    """
+    global _snapshot
+    if os.environ.get("VITEXT_NO_SNAPSHOT") == "1":
+        return None
+    if _snapshot is None:
+        mapped = os.environ.get("VITEXT_MAPPED_TABLES") == "1"
+        _snapshot = ICUSnapshot(skip_kinds=("dict", "mapping") if mapped else ())
+    return _snapshot
@@ -0,0 +1,147 @@
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Đầu ra còn chữ số thì các stage sau (Math) vẫn phải đọc tiếp
+_DIGIT_RX = re.compile(r'\d')
+
+
+class Protected(str):
+    """
+    Replacement kept out of reach of the remaining rules of the same stage,
+    e.g. a product code Math must leave alone; SpanText.release() hands it
+    back to the next stages.
+    """
+
+
+class SpanText:
+    """
+    A line being normalized, as a list of (text, resolved) spans:
+    - unresolved spans still need work; rules only search inside them
+    - resolved spans are kept out of reach of the later rules and stages:
+      Protected replacements, and with `resolve` the final output of a rule
+      (see resolves())
+    A rule sees each unresolved span on its own, and the line is assembled
+    (text()) once, after the last stage.
+    Without `resolve` (the default) every stage reads the same text as when
+    the stages passed a plain string.
+    """
+
+    __slots__ = ("spans", "resolve")
+
+    def __init__(self, text: str = "", resolve: bool = False):
+        self.spans: List[Tuple[str, bool]] = [(text, False)] if text else []
+        self.resolve = resolve
+
+    def __iter__(self) -> Iterator[Tuple[str, bool]]:
+        return iter(self.spans)
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def text(self) -> str:
+        return "".join(text for text, _ in self.spans)
+
+    def rewrite(self, rewrite) -> None:
+        """Replace every unresolved span s with the spans of rewrite(s) (a list of (text, resolved))."""
+        self.replace({index: rewrite(text) for index, (text, resolved) in enumerate(self.spans)
+                      if not resolved})
+
+    def replace(self, changes: Dict[int, List[Tuple[str, bool]]]) -> None:
+        """Replace the span at each index of `changes` with the spans it maps to."""
+        spans = []
+        for index, span in enumerate(self.spans):
+            new = changes.get(index)
+            if new is None:
+                spans.append(span)
+            else:
+                spans.extend(new)
+        self.spans = _merged(spans)
+
+    def release(self) -> "SpanText":
+        """Make the Protected spans unresolved again."""
+        self.spans = _merged([(text, resolved and not isinstance(text, Protected))
+                              for text, resolved in self.spans])
+        return self
+
+    def strip(self) -> None:
+        """Strip whitespace at both ends of the line."""
+        while self.spans and not self.spans[0][0].strip():
+            self.spans.pop(0)
+        while self.spans and not self.spans[-1][0].strip():
+            self.spans.pop()
+        if self.spans:
+            text, resolved = self.spans[0]
+            self.spans[0] = (text.lstrip(), resolved)
+            text, resolved = self.spans[-1]
+            self.spans[-1] = (text.rstrip(), resolved)
+
+
+def split_matches(text: str, regex, replace, resolve: bool = False) -> Tuple[Optional[List[Tuple[str, bool]]], int]:
+    """
+    (spans of `text` after replacing the matches of `regex` with replace(match),
+    number of matches); spans is None when nothing matched. See resolves()
+    for `resolve`.
+    """
+    matches = []
+
+    def record(m):
+        out = replace(m)
+        matches.append((m, out))
+        return out
+
+    # sub() chạy vòng lặp trong C; chỉ tách span khi có thay thế được đánh dấu resolved
+    result = regex.sub(record, text)
+    if not matches:
+        return None, 0
+    if not any(resolves(out, m, resolve) for m, out in matches):
+        return [(result, False)], len(matches)
+    pieces = []
+    pos = 0
+    for m, out in matches:
+        pieces.append((text[pos:m.start()], None))
+        pieces.append((out, m))
+        pos = m.end()
+    pieces.append((text[pos:], None))
+    return spans_of(pieces, resolve), len(matches)
+
+
+def resolves(out: str, m: "re.Match", resolve: bool = False) -> bool:
+    """
+    True when the replacement `out` of `m` becomes a resolved span: a
+    Protected replacement always; with `resolve`, also a final one, that does
+    more than re-space the match and holds no digits for the next stages.
+    """
+    if isinstance(out, Protected):
+        return True
+    return resolve and out.strip() != m.group(0).strip() and not _DIGIT_RX.search(out)
+
+
+def spans_of(pieces: List[Tuple[str, Optional["re.Match"]]], resolve: bool = False) -> List[Tuple[str, bool]]:
+    """
+    Spans of a rewritten text given as (text, match) pieces, match being None
+    for text kept from the input; see resolves().
+    """
+    spans = []
+    pending = ""
+    for out, m in pieces:
+        if m is not None and resolves(out, m, resolve):
+            spans.append((pending, False))
+            spans.append((out, True))
+            pending = ""
+        else:
+            pending += out
+    spans.append((pending, False))
+    return spans
+
+
+def _merged(spans: List[Tuple[str, bool]]) -> List[Tuple[str, bool]]:
+    """Drop empty spans (nothing to protect) and join unresolved neighbours."""
+    out: List[Tuple[str, bool]] = []
+    for text, resolved in spans:
+        if not text:
+            continue
+        if out and out[-1][1] == resolved and not resolved:
+            out[-1] = (out[-1][0] + text, False)
+        else:
+            out.append((text, resolved))
+    return out
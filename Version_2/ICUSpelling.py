@@ -0,0 +1,109 @@
+import os
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from ICUConstant import MAPPING_FOLDER
+from ICUMapping import ICUMapping
+
+
+class CharTable(dict):
+    """
+    Translation table for str.translate: code point → text, filled with
+    word(character) the first time a character is seen, so that a whole
+    string is read in one translate() call.
+    """
+
+    def __init__(self, word: Callable[[str], str]):
+        super().__init__()
+        self.word = word
+
+    def __missing__(self, code: int) -> str:
+        text = self[code] = self.word(chr(code))
+        return text
+
+
+class Speller:
+    """
+    Letter-by-letter / digit-by-digit reader over an ICUMapping:
+    - word_of: word of one character, same as mapping.mapping_of ("" if unknown)
+    - has_word: same as mapping.has_mapping_of for one character
+    - spell: words of every character of a string, joined with single spaces
+    - spell_each: every word wrapped as before + word + after, concatenated
+    `overrides` (character → word) are read before the mapping; with `digits`,
+    digits are read with ConvertingNumber.convert_number.
+    Every character is looked up (strip, case folding) once; the keys of the
+    mapping and their upper-case forms are precomputed.
+    """
+
+    def __init__(self, mapping: ICUMapping, overrides: Optional[Dict[str, str]] = None, digits: bool = False):
+        self.mapping = mapping
+        self.overrides = dict(overrides or {})
+        self.converter = None
+        if digits:
+            from ICUNumberConverting import ConvertingNumber
+            self.converter = ConvertingNumber()
+        self.words = CharTable(self._word)
+        self.known = CharTable(mapping.has_mapping_of)
+        # (before, after) → bảng dịch "before + word + after"
+        self._tables: Dict[Tuple[str, str], CharTable] = {}
+        for key in mapping.mapping:
+            if len(key) == 1:
+                for c in {key, key.upper()}:
+                    self.words[ord(c)]
+                    self.known[ord(c)]
+
+    def _word(self, c: str) -> str:
+        word = self.overrides.get(c)
+        if word is not None:
+            return word
+        if self.converter is not None and c.isdigit():
+            return self.converter.convert_number(c)
+        return self.mapping.mapping_of(c)
+
+    def word_of(self, c: str) -> str:
+        # c.lower() có thể dài hơn một ký tự (vd. "İ")
+        return self.words[ord(c)] if len(c) == 1 else self._word(c)
+
+    def has_word(self, c: str) -> bool:
+        return self.known[ord(c)] if len(c) == 1 else self.mapping.has_mapping_of(c)
+
+    def _table(self, before: str, after: str) -> CharTable:
+        table = self._tables.get((before, after))
+        if table is None:
+            words = self.words
+            table = self._tables[(before, after)] = CharTable(lambda c: before + words[ord(c)] + after)
+        return table
+
+    def spell(self, text: str) -> str:
+        """' '.join(word_of(c) for c in text)"""
+        if not text:
+            return ""
+        return text.translate(self._table("", " "))[:-1]
+
+    def spell_each(self, text: str, before: str = "", after: str = " ") -> str:
+        """''.join(before + word_of(c) + after for c in text)"""
+        return text.translate(self._table(before, after))
+
+
+# (tên file, overrides, digits) → Speller dùng chung
+_SPELLERS: Dict[tuple, Speller] = {}
+_SPELLERS_LOCK = threading.Lock()
+
+
+def get_speller(*filenames: str, overrides: Optional[Dict[str, str]] = None, digits: bool = False) -> Speller:
+    """
+    Shared Speller over the mapping files `filenames` of MAPPING_FOLDER, loaded
+    in order into one ICUMapping (a later file wins on a key in both); built on
+    first use.
+    """
+    key = (filenames, tuple(sorted((overrides or {}).items())), digits)
+    speller = _SPELLERS.get(key)
+    if speller is None:
+        with _SPELLERS_LOCK:
+            speller = _SPELLERS.get(key)
+            if speller is None:
+                mapping = ICUMapping()
+                for filename in filenames:
+                    mapping.load_mapping_file(os.path.join(MAPPING_FOLDER, filename))
+                speller = _SPELLERS[key] = Speller(mapping, overrides, digits)
+    return speller
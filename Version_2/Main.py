@@ -1,188 +1,200 @@
 import argparse
-import re
+import contextlib
+import json
 import os
-
-from ICUConstant import (
-    DICT_FOLDER, F_ACRONYMS, F_INPUT, F_OUTPUT,
-    F_LETTER_SOUND_EN, F_LETTER_SOUND_VN, F_POPULAR,
-    F_SYMBOL, F_TEENCODE, MAPPING_FOLDER
-)
-from ICUHelper import remove_extra_whitespace, remove_noise_symbols
-from ICUMapping import ICUMapping
-from ICUDictionary import ICUDictionary
-from SpecialCase import SpecialCase
-from Address import Address
-from Math import Math
-from DateTime import DateTime
-from ICUNumberConverting import ConvertingNumber
-
-def tokenize_symbol(s: str) -> str:
-    s = re.sub(r'([^\w\s])', r' \1 ', s)
-    s = s.replace('-', ' ')
-    return s.strip()
-
-def read_letter_by_letter(word: str, mapper: ICUMapping) -> str:
-    return ' '.join(mapper.mapping_of(c) for c in word.lower())
-
-def is_uppercase_word(word: str) -> bool:
-    return word.isupper() and word.isalpha()
-
-def contains_only_letter(word: str, mapper: ICUMapping) -> bool:
-    return all(mapper.has_mapping_of(c) for c in word.lower())
-
-def contains_vowel(word: str) -> bool:
-    vowels = "aàảãáạăằẳẵâầẩẫấậeèẻẽéẹêềểễếệiìỉĩíịoòỏõóọôồổỗốộơỡớợuùủũúụưừửữứựyỳỷỹýỵ"
-    return any(c in vowels for c in word.lower())
-
-def split_token_punct(token: str, keep_punc: bool) -> tuple[str, str]:
-    m = re.match(r'^(.*?)([;:!\?,\.]?)$', token)
-    base, p = m.group(1), m.group(2)
-    if not keep_punc and p in '.!?:':
-        p = '.'
-    if not keep_punc and p in ',;':
-        p = ','
-    return base, p
-
-def main():
+import sys
+import time
+from typing import Iterable, TextIO
+
+from ICUConstant import DEFAULT_CACHE_BYTES, F_INPUT, F_OUTPUT
+
+# Dấu phân cách giữa các dòng kết quả
+SEPARATORS = {
+    "line": "#line#",
+    "newline": "\n",
+}
+
+# Số dòng kết quả gom lại trước mỗi lần ghi
+WRITE_BLOCK_LINES = 1000
+
+# Bộ đệm I/O cho file input/output (bytes)
+IO_BUFFER_SIZE = 1 << 20
+
+def open_input(path: str) -> TextIO:
+    """Open `path` for reading, '-' means stdin."""
+    if path == "-":
+        return open(sys.stdin.fileno(), 'r', encoding='utf-8', closefd=False,
+                    buffering=IO_BUFFER_SIZE)
+    return open(path, 'r', encoding='utf-8', buffering=IO_BUFFER_SIZE)
+
+def open_output(path: str) -> TextIO:
+    """Open `path` for writing, '-' means stdout."""
+    if path == "-":
+        return open(sys.stdout.fileno(), 'w', encoding='utf-8', closefd=False,
+                    buffering=IO_BUFFER_SIZE)
+    return open(path, 'w', encoding='utf-8', buffering=IO_BUFFER_SIZE)
+
+def write_results(results: Iterable[str], fout: TextIO, separator: str,
+                  block_lines: int = WRITE_BLOCK_LINES, echo: bool = False) -> int:
+    """
+    Write every result followed by `separator`, gathering `block_lines` results
+    into a single write call. Returns the number of lines written.
+    """
+    block = []
+    count = 0
+    for result in results:
+        block.append(result)
+        block.append(separator)
+        count += 1
+        if echo:
+            print(result, file=sys.stderr)
+        if len(block) >= 2 * block_lines:
+            fout.write("".join(block))
+            block.clear()
+    if block:
+        fout.write("".join(block))
+    return count
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser()
     parser.add_argument('-punc', action='store_true')
     parser.add_argument('-unknown', action='store_true')
     parser.add_argument('-lower', action='store_true')
     parser.add_argument('-rule', action='store_true')
-    args = parser.parse_args()
+    parser.add_argument('-input', default=F_INPUT,
+                        help="input file, '-' for stdin (default: %(default)s)")
+    parser.add_argument('-output', default=F_OUTPUT,
+                        help="output file, '-' for stdout (default: %(default)s)")
+    parser.add_argument('-sep', choices=sorted(SEPARATORS), default="line",
+                        help="separator written after each line: '#line#' or a newline (default: %(default)s)")
+    parser.add_argument('-block', type=int, default=WRITE_BLOCK_LINES,
+                        help="number of lines buffered per write (default: %(default)s)")
+    parser.add_argument('-echo', action='store_true',
+                        help="also print every result to stderr")
+    parser.add_argument('-jobs', '--jobs', type=int, default=1,
+                        help="number of worker processes, 0 = one per CPU (default: %(default)s)")
+    parser.add_argument('--daemon', action='store_true',
+                        help="run the normalization daemon on -socket instead of normalizing a file")
+    parser.add_argument('--client', action='store_true',
+                        help="normalize through a running daemon, in-process if none is running")
+    parser.add_argument('-socket', default=None, help="daemon socket path")
+    parser.add_argument('--startup-report', action='store_true',
+                        help="print import and load time of every resource to stderr")
+    parser.add_argument('-cache', type=int, default=0,
+                        help="whole-line result cache entries, 0 = disabled (default: %(default)s)")
+    parser.add_argument('-cache-bytes', type=int, default=DEFAULT_CACHE_BYTES,
+                        help="memory budget of the result cache in bytes (default: %(default)s)")
+    parser.add_argument('-disk-cache', default=None,
+                        help="SQLite file caching results across runs, keyed by input, options and resource files")
+    parser.add_argument('--cache-stats', action='store_true',
+                        help="print result cache counters to stderr at the end of an in-process run")
+    parser.add_argument('--rule-stats', action='store_true',
+                        help="print how many regex rule evaluations were skipped by the prefilter (stderr, JSON)")
+    parser.add_argument('--lexicon-conflicts', action='store_true',
+                        help="print the keys found in several token-loop word lists and which list wins (stderr, JSON)")
+    parser.add_argument('-line-budget', type=float, default=0,
+                        help="milliseconds of regex rules per line before a cheaper fallback, 0 = unlimited")
+    parser.add_argument('-resolve-spans', action='store_true',
+                        help="do not read a rule's final output (no digits left) again in later rules and stages")
+    parser.add_argument('-single-pass', action='store_true',
+                        help="match each rule module with one merged regex instead of one pass per rule")
+    parser.add_argument('-metrics', default=None,
+                        help="JSON file receiving per-stage time / latency / bytes / match counters at the end of the run")
+    parser.add_argument('-metrics-sample', type=int, default=1,
+                        help="measure one line in N for -metrics (default: %(default)s)")
+    parser.add_argument('--mapped-tables', action='store_true',
+                        help="read the word lists from mmap tables shared by every process (VITEXT_MAPPED_TABLES=1)")
+    parser.add_argument('--profile', action='store_true',
+                        help="run the batch under cProfile, regex time charged to each rule (in-process runs only)")
+    parser.add_argument('-profile-out', default="profile",
+                        help="path prefix of the .prof / .txt / .collapsed profile files (default: %(default)s)")
+    return parser
+
+def normalizer_config(args: argparse.Namespace) -> dict:
+    """Normalizer keyword arguments selected on the command line."""
+    return {"cache_entries": args.cache, "cache_bytes": args.cache_bytes, "disk_cache": args.disk_cache,
+            "single_pass": args.single_pass, "resolve_spans": args.resolve_spans, "line_budget": args.line_budget / 1000,
+            "metrics_sample": args.metrics_sample}
 
-    special_case = SpecialCase()
-    address = Address()
-    math_mod = Math()
-    date_time = DateTime()
-
-    acronym = ICUMapping()
-    acronym.load_mapping_file(os.path.join(MAPPING_FOLDER, F_ACRONYMS))
-    teen_code = ICUMapping()
-    teen_code.load_mapping_file(os.path.join(MAPPING_FOLDER, F_TEENCODE))
-    symbol = ICUMapping()
-    symbol.load_mapping_file(os.path.join(MAPPING_FOLDER, F_SYMBOL))
-    letterVN = ICUMapping()
-    letterVN.load_mapping_file(os.path.join(MAPPING_FOLDER, F_LETTER_SOUND_VN))
-    letterEN = ICUMapping()
-    letterEN.load_mapping_file(os.path.join(MAPPING_FOLDER, F_LETTER_SOUND_EN))
-    popular = ICUDictionary()
-    popular.load_dict_file(os.path.join(DICT_FOLDER, F_POPULAR))
-
-    with open(F_INPUT, 'r', encoding='utf-8') as fin, \
-         open(F_OUTPUT, 'w', encoding='utf-8') as fout:
-        for line in fin:
-            line = line.strip()
-            text = remove_extra_whitespace(line)
-            # print(f"After cleanup: {text}")
-            text = special_case.normalize_text(text)
-            # print(f"After special_case: {text}")
-            text = date_time.normalize_text(text)
-            # print(f"After date_time: {text}") 
-            text = math_mod.normalize_text(text)
-            # text = re.sub(r'(\d+)\s+(\d+)', r'\1\2', text)
-            # print(f"After merge numbers: {text}")
-            # text = re.sub(r'\b([A-Za-z]+)(\d+)\b', r'\1 \2', text)
-            # print(f"Math_mod: {text}")  
-            text = address.normalize_text(text)
-            # print(f"Address: {text}")
-            text = tokenize_symbol(text)
-            # print(f"tokenize_symbol: {text}")
-            text = remove_noise_symbols(text, space_replace=False)
-            # print(f"remove_noise_symbols: {text}")
-            text = remove_extra_whitespace(text)
-            # print(f"remove_extra_whitespace: {text}")
-
-            if args.rule:
-                fout.write(text + "#line#")
-                continue
-
-            tokens = re.findall(r'\S+', text)
-            result = ""
-            for tok in tokens:
-                base_tok, tm_punc = split_token_punct(tok, args.punc)
-                word = base_tok.strip()
-
-                out_tok = None
-                if not word:
-                    # Xử lý trường hợp token chỉ là dấu câu
-                    if tm_punc:
-                        out_tok = " . " if tm_punc in '.!?:' else " , "
-                    else:
-                        out_tok = ""
-                elif popular.has_word(word):
-                    out_tok = word
-                elif acronym.has_mapping_of(word):
-                    out_tok = acronym.mapping_of(word)
-                elif teen_code.has_mapping_of(word):
-                    out_tok = teen_code.mapping_of(word)
-                else:
-                    tmp = remove_noise_symbols(base_tok, space_replace=True)
-                    tmp = tokenize_symbol(tmp)
-                    subtoks = re.findall(r'\S+', tmp)
-                    assemble = ""
-                    for st in subtoks:
-                        if popular.has_word(st):
-                            assemble += f" {st} "
-                        elif acronym.has_mapping_of(st):
-                            assemble += f" {acronym.mapping_of(st)} "
-                        elif teen_code.has_mapping_of(st):
-                            assemble += f" {teen_code.mapping_of(st)} "
-                        elif st in '.!?:,;/':
-                            if not args.punc:
-                                assemble += " . " if st in '.!?:' else " , "
-                            else:
-                                assemble += f" {st} "
-                        elif symbol.has_mapping_of(st):
-                            assemble += f" {symbol.mapping_of(st)} "
-                        elif contains_only_letter(st, letterVN):
-                            if is_uppercase_word(st):
-                                if re.fullmatch(r'[IVXLCDM]+', st) and len(st) <= 7:
-                                    roman = ConvertingNumber().roman_to_decimal(st)
-                                    if roman != st and roman.isdigit():
-                                        assemble += f" {roman} "
-                                    elif args.unknown:
-                                        assemble += f" {st} "
-                                    else:
-                                        assemble += f" {read_letter_by_letter(st, letterEN)} "
-                                elif args.unknown:
-                                    assemble += f" {st} "
-                                else:
-                                    assemble += f" {read_letter_by_letter(st, letterEN)} "
-                            else:
-                                if not args.unknown:
-                                    if not contains_vowel(st):
-                                        assemble += f" {read_letter_by_letter(st, letterVN)} "
-                                    else:
-                                        assemble += f" {st} "
-                                else:
-                                    assemble += f" {st} "
-                        else:
-                            assemble += f" {st} "
-                    out_tok = assemble.strip()
-                    if not out_tok:
-                        out_tok = word
-
-                if tm_punc and out_tok != " . " and out_tok != " , ":
-                    if args.punc:
-                        out_tok += f" {tm_punc} "
-                    else:
-                        out_tok += " . " if tm_punc in '.!?:' else " , "
-
-                result += " " + out_tok + " "
-            if args.lower:
-                result = result.lower()
-                
-            # print(f"Before noise sysbols {result}")
-            result = remove_noise_symbols(result, space_replace=False)
-            # print(f"A noise sysbols {result}")
-            result = remove_extra_whitespace(result)
-            result = result.rstrip()
-            if not result.endswith('.'):
-                result += '.'
-            result = remove_extra_whitespace(result)
-            fout.write(result + "#line#")
-            print(result)
+def main():
+    args = build_parser().parse_args()
+    if args.mapped_tables:
+        # Biến môi trường: worker process (--jobs) và daemon đọc cùng thiết lập
+        os.environ["VITEXT_MAPPED_TABLES"] = "1"
+
+    if args.daemon or args.client:
+        import Daemon
+        socket_path = args.socket or Daemon.DEFAULT_SOCKET
+        if args.daemon:
+            Daemon.serve(socket_path, normalizer_config(args))
+            return
+
+    # Chỉ import pipeline khi thật sự cần (client mode không cần load gì)
+    client = Daemon.connect(socket_path) if args.client else None
+    normalizer = None
+    profiler = contextlib.nullcontext()
+
+    with open_input(args.input) as fin, open_output(args.output) as fout:
+        if client is not None:
+            results = client.iter_normalize(fin, punc=args.punc, unknown=args.unknown,
+                                            lower=args.lower, rule=args.rule)
+        elif args.jobs == 1:
+            start = time.perf_counter()
+            from Normalizer import Normalizer
+            import_time = time.perf_counter() - start
+            normalizer = Normalizer(**normalizer_config(args))
+            if args.profile:
+                from ICUProfile import Profiler, label_rules
+                # Load trước để profile chỉ gồm phần xử lý từng dòng
+                normalizer.preload()
+                for module in (normalizer.special_case, normalizer.date_time,
+                               normalizer.math_mod, normalizer.address):
+                    label_rules(module)
+                profiler = Profiler(args.profile_out)
+            results = normalizer.iter_normalize(fin, punc=args.punc, unknown=args.unknown,
+                                                lower=args.lower, rule=args.rule)
+        else:
+            from Parallel import iter_normalize_parallel
+            results = iter_normalize_parallel(fin, args.jobs, punc=args.punc, unknown=args.unknown,
+                                              lower=args.lower, rule=args.rule,
+                                              config=normalizer_config(args))
+        if args.profile and normalizer is None:
+            print("[INFO] --profile is only available for in-process runs (no --client/--jobs)", file=sys.stderr)
+        try:
+            with profiler:
+                write_results(results, fout, SEPARATORS[args.sep], max(1, args.block), args.echo)
+        finally:
+            if client is not None:
+                client.close()
+            if normalizer is not None:
+                normalizer.close()
+
+    if args.startup_report:
+        if normalizer is None:
+            print("[INFO] Startup report is only available for in-process runs (no --client/--jobs)",
+                  file=sys.stderr)
+        else:
+            print(f"Normalizer module import: {import_time * 1000:.2f} ms", file=sys.stderr)
+            print(normalizer.startup_report(), file=sys.stderr)
+    if args.cache_stats and normalizer is not None:
+        print(json.dumps({"cache": normalizer.cache_stats(), "disk_cache": normalizer.disk_cache_stats(),
+                          "token_cache": normalizer.token_cache_stats()}), file=sys.stderr)
+    if args.rule_stats and normalizer is not None:
+        print(json.dumps(normalizer.rule_stats(), ensure_ascii=False), file=sys.stderr)
+    if args.lexicon_conflicts:
+        if normalizer is None:
+            print("[INFO] --lexicon-conflicts is only available for in-process runs (no --client/--jobs)",
+                  file=sys.stderr)
+        else:
+            conflicts = [{"key": key, "used": used, "shadowed": shadowed}
+                         for key, used, shadowed in normalizer.lexicon.conflicts]
+            print(json.dumps(conflicts, ensure_ascii=False), file=sys.stderr)
+    if args.metrics:
+        if normalizer is None:
+            print("[INFO] -metrics is only available for in-process runs (no --client/--jobs)", file=sys.stderr)
+        else:
+            with open(args.metrics, 'w', encoding='utf-8') as f:
+                json.dump(normalizer.stats(), f, ensure_ascii=False, indent=2)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
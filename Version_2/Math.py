@@ -1,12 +1,13 @@
 import re
 import os
 import sys
-from typing import Callable
-from ICUReadFile import ICUReadFile
+from typing import Callable, List, Tuple
+from ICURuleSet import RuleSet
+from ICUSpans import Protected, SpanText
 from ICUMapping import ICUMapping
 from ICUNumberConverting import ConvertingNumber
 from ICUHelper import read_number
-from ICUConstant import REGEX_FOLDER, MAPPING_FOLDER, F_UNIT_MAPPING_BASE, F_UNIT_MAPPING_CURRENCY
+from ICUConstant import MAPPING_FOLDER, F_UNIT_MAPPING_BASE, F_UNIT_MAPPING_CURRENCY
 
 class Math:
     """
@@ -25,8 +26,49 @@ class Math:
     F_MEASUREMENT_1 = "Measurement_1.txt"
     F_NORMAL_NUMBER = "NormalNumber.txt"
 
+    # Các regex của normalize_text theo thứ tự áp dụng: (tên bước, pattern)
+    STEPS = (
+        # Bảo vệ các mã như BCH-02273, ACV-083983, TAF-085743-YXN, ORD-090624-XYZ
+        ("code",               r'\b[A-Za-z]+-\d+(?:-[A-Za-z]+)?\b'),
+        ("currency_grouped",   r'\b(\d{1,3}(?:[.,]\d{3})+)\s*([$€£₫¥₽₩đ])(?=\s|$|[^\w])'),
+        ("currency_plain",     r'\b(\d+)(?:[,.](\d+))?\s*([$€£₫¥₽₩đ])(?=\s|$|[^\w])'),
+        ("range_both",         r'(?i)\b(\d+)\s*([A-Za-zÀ-ỹ]+[23]?)\s*-\s*(\d+)\s*\2\b'),
+        ("range_single",       r'(?i)\b(?:từ\s*)?(\d+)\s*-\s*(\d+)\s*([A-Za-zÀ-ỹ]+[23]?)\b'),
+        ("decimal_measure",    r'(?i)\b(\d+)\.(\d+)\s*([A-Za-zÀ-ỹ]+[23]?)\b'),
+        ("single_measure",     r'(?i)\b(\d+)\s*([A-Za-zÀ-ỹ]+[23]?)\b'),
+        ("roman",              r'\b([IVXLCDM]{1,7})\b'),
+        ("grouped_plain",      r'\b(\d{1,3}(?:,\d{3})+)\b'),
+        ("plain_number",       r'\b(\d+)\b'),
+    )
+    STEP_ORDER = tuple(step for step, _ in STEPS)
+
+    # Mọi match của STEPS chứa một chữ số hoặc một token La Mã
+    # (lookahead đầu pattern cho phép re nhảy nhanh qua các ký tự khác)
+    _ENTITY_RX = re.compile(r'(?=[\dIVXLCDM])(?:\d+|\b[IVXLCDM]{1,7}\b)')
+    _SPACES_RX = re.compile(r'\s+')
+    # Số token trước / sau token chứa số mà một match có thể trải tới:
+    # "từ 3 - 5 cm" (1 trước), "3 km - 5 km" (4 sau)
+    REACH_BEFORE = 1
+    REACH_AFTER  = 4
+
     def __init__(self):
-        self.patterns = {}
+        # regex của normalize_text, compile một lần; bước nào thiếu trigger (vd. chữ số) thì bỏ qua
+        self.steps = RuleSet()
+        for index, (step, pattern) in enumerate(Math.STEPS):
+            self.steps.add(step, pattern, "Math.STEPS", index + 1)
+        self.conv = ConvertingNumber()
+        self._replacers = {
+            "code":             self._rep_code,
+            "currency_grouped": self._rep_grouped,
+            "currency_plain":   self._rep_plain,
+            "range_both":       self._rep_range_both,
+            "range_single":     self._rep_range_single,
+            "decimal_measure":  self._rep_decimal_measure,
+            "single_measure":   self._rep_single,
+            "roman":            self._rep_roman,
+            "grouped_plain":    self._rep_grouped_plain,
+            "plain_number":     self._rep_plain_number,
+        }
         # mapping cho đơn vị đo cơ bản
         self.unit_base_mapping     = ICUMapping()
         self.unit_base_file        = os.path.join(MAPPING_FOLDER, F_UNIT_MAPPING_BASE)
@@ -37,27 +79,6 @@ class Math:
         # Load mapping files ngay từ đầu
         self.unit_base_mapping.load_mapping_file(self.unit_base_file)
         self.unit_currency_mapping.load_mapping_file(self.unit_currency_file)
-
-        # nạp regex từ file
-        self._load_patterns(Math.ROMAN_NUMBER,   Math.F_ROMAN_NUMBER)
-        self._load_patterns(Math.MEASUREMENT,    Math.F_MEASUREMENT)
-        self._load_patterns(Math.MEASUREMENT_1,  Math.F_MEASUREMENT_1)
-        self._load_patterns(Math.NORMAL_NUMBER,  Math.F_NORMAL_NUMBER)
-
-    def _load_patterns(self, category: int, filename: str):
-        path = os.path.join(REGEX_FOLDER, filename)
-        reader = ICUReadFile(path)
-        if not reader.read_file():
-            print(f"[E] Error reading pattern file: {filename}", file=sys.stderr)
-            return
-        self.patterns.setdefault(category, [])
-        pos = 0
-        while pos < reader.get_file_length():
-            reader.next_line(pos)
-            line = reader.get_content_uchar()[reader.get_line_start():reader.get_line_end()].strip()
-            if line:
-                self.patterns[category].append(line)
-            pos = reader.get_line_end()
     
     def _pattern_repl(self, category: str) -> Callable[[re.Match], str]:
         """
@@ -88,149 +109,146 @@ class Math:
         4) Plain numbers (số thuần túy không có đơn vị)
         5) Dọn khoảng trắng
         """
-        
-        # Bảo vệ các chuỗi mã dạng LETTERS-NUMBERS hoặc LETTERS-NUMBERS-LETTERS
-        protected = {}
-        def protect_code(match: re.Match) -> str:
-            code = match.group(0)
-            placeholder = f"__PROTECTED_{len(protected)}__"
-            protected[placeholder] = code
-            return placeholder
-        
-        # Regex bảo vệ các mã như BCH-02273, ACV-083983, TAF-085743-YXN, ORD-090624-XYZ
-        code_rx = re.compile(r'\b[A-Za-z]+-\d+(?:-[A-Za-z]+)?\b')
-        text = code_rx.sub(protect_code, text)
-        
-        conv = ConvertingNumber()
-        result = text
+        return Math._SPACES_RX.sub(' ', self.normalize_spans(SpanText(text)).text()).strip()
 
-        # --- 0a) Money: nhóm hàng nghìn bằng , + symbol --- 
-        currency_rx = re.compile(
-            r'\b(\d{1,3}(?:[.,]\d{3})+)\s*([$€£₫¥₽₩đ])(?=\s|$|[^\w])'
-        )
-        def _rep_grouped(m: re.Match) -> str:
-            raw, sym = m.group(1), m.group(2)
-            num = raw.replace(',', '').replace('.', '')
-            num_txt = conv.convert_number(num)
-            unit_txt = self.unit_currency_mapping.mapping_of(sym)
-            if not unit_txt:
-                unit_txt = sym
-            return f"{num_txt} {unit_txt}"
-        result = currency_rx.sub(_rep_grouped, result)
+    def normalize_spans(self, spans: SpanText) -> SpanText:
+        """
+        normalize_text on the unresolved spans of a line; replacements become
+        resolved spans. Each span is scanned once for the tokens holding a digit
+        or a Roman numeral; the steps only run on the tokens around them.
+        """
+        spans.rewrite(lambda text: self._normalize_unresolved(text, spans.resolve))
+        return spans
 
-        plain_currency_rx = re.compile(r'\b(\d+)(?:[,.](\d+))?\s*([$€£₫¥₽₩đ])(?=\s|$|[^\w])')
-        def _rep_plain(m: re.Match) -> str:
-            integer_part, decimal_part, sym = m.group(1), m.group(2), m.group(3)
-            num_txt = conv.convert_number(integer_part)
-            if decimal_part:
-                dec_txt = " phẩy " + " ".join(conv.convert_number(d) for d in decimal_part)
-                num_txt += dec_txt
-            unit_txt = self.unit_currency_mapping.mapping_of(sym)
-            if not unit_txt:
-                unit_txt = sym
-            return f"{num_txt} {unit_txt}"
-        result = plain_currency_rx.sub(_rep_plain, result)
+    def _normalize_unresolved(self, text: str, resolve: bool = False) -> List[Tuple[str, bool]]:
+        # str.split() và \s của re dùng cùng định nghĩa khoảng trắng
+        line = " ".join(text.split())
+        # Giữ một khoảng trắng ở hai đầu để không dính vào span bên cạnh
+        lead = " " if text[:1].isspace() else ""
+        trail = " " if text[-1:].isspace() and line else ""
+        found = self._entity_spans(line)
+        if not found:
+            return [(lead + line + trail, False)]
+        tokens = line.split(" ")
+        out = [(lead, False)]
+        pos = 0
+        for first, last in found:
+            if first > pos:
+                out.append((" ".join(tokens[pos:first]) + " ", False))
+            span = SpanText(" ".join(tokens[first:last]), resolve)
+            out.extend(self.steps.apply_spans(span, self._replacers, Math.STEP_ORDER).release())
+            out.append((" " if last < len(tokens) else "", False))
+            pos = last
+        out.append((" ".join(tokens[pos:]) + trail, False))
+        return out
+
+    @staticmethod
+    def _entity_spans(line: str) -> List[Tuple[int, int]]:
+        """
+        [first, last) token ranges of a single-spaced line to normalize: every
+        token holding a digit or a Roman numeral, widened by the tokens a step
+        can reach from it, merged.
+        """
+        spans: List[Tuple[int, int]] = []
+        count = line.count(" ") + 1
+        previous = -1
+        for m in Math._ENTITY_RX.finditer(line):
+            i = line.count(" ", 0, m.start())
+            if i == previous:
+                continue
+            previous = i
+            first = max(0, i - Math.REACH_BEFORE)
+            last = min(count, i + Math.REACH_AFTER + 1)
+            if spans and first <= spans[-1][1]:
+                spans[-1] = (spans[-1][0], last)
+            else:
+                spans.append((first, last))
+        return spans
 
-        # # Số thập phân (1.5, 2.75, etc.)
-        # rx_decimal = re.compile(r'\b(\d+)[\.,](\d+)\b')
-        # def _rep_decimal(m: re.Match) -> str:
-        #     integer_part = m.group(1)
-        #     decimal_part = m.group(2)
-        #     int_txt = conv.convert_number(integer_part)
-        #     dec_txt = conv.convert_number(decimal_part)
-        #     return f"{int_txt} phẩy {dec_txt}"
-        # result = rx_decimal.sub(_rep_decimal, result)
+    # Bảo vệ các chuỗi mã dạng LETTERS-NUMBERS hoặc LETTERS-NUMBERS-LETTERS:
+    # giữ nguyên, các bước sau của Math bỏ qua (Address vẫn đọc được)
+    @staticmethod
+    def _rep_code(m: re.Match) -> str:
+        return Protected(m.group(0))
 
-        # --- 1a) Range cả hai cùng unit: "3km2-6km2" ---
-        rx_range_both = re.compile(
-            r'\b(\d+)\s*([A-Za-zÀ-ỹ]+[23]?)\s*-\s*(\d+)\s*\2\b',
-            re.IGNORECASE
-        )
-        def _rep_range_both(m: re.Match) -> str:
-            a, unit, b = m.group(1), m.group(2).lower(), m.group(3)
-            txt_a = conv.convert_number(a)
-            txt_b = conv.convert_number(b)
-            u_txt = self.unit_base_mapping.mapping_of(unit)
-            return f"{txt_a} {u_txt} đến {txt_b} {u_txt}"
-        result = rx_range_both.sub(_rep_range_both, result)
+    # --- 0a) Money: nhóm hàng nghìn bằng , + symbol ---
+    def _rep_grouped(self, m: re.Match) -> str:
+        raw, sym = m.group(1), m.group(2)
+        num = raw.replace(',', '').replace('.', '')
+        num_txt = self.conv.convert_number(num)
+        unit_txt = self.unit_currency_mapping.mapping_of(sym)
+        if not unit_txt:
+            unit_txt = sym
+        return f"{num_txt} {unit_txt}"
 
-        # --- 1b) Range chỉ unit sau: "[từ ]A-Bunit" ---
-        rx_range_single = re.compile(
-            r'\b(?:từ\s*)?(\d+)\s*-\s*(\d+)\s*([A-Za-zÀ-ỹ]+[23]?)\b',
-            re.IGNORECASE
-        )
-        def _rep_range_single(m: re.Match) -> str:
-            a, b, unit = m.group(1), m.group(2), m.group(3).lower()
-            txt_a = conv.convert_number(a)
-            txt_b = conv.convert_number(b)
-            u_txt = self.unit_base_mapping.mapping_of(unit)
-            return f"{txt_a} {txt_b} {u_txt}"
-        result = rx_range_single.sub(_rep_range_single, result)
-        
-        # --- 1.5) Decimal measurement: "2.5kg", "3.7cm" ---
-        rx_decimal_measure = re.compile(r'\b(\d+)\.(\d+)\s*([A-Za-zÀ-ỹ]+[23]?)\b', re.IGNORECASE)
-        def _rep_decimal_measure(m: re.Match) -> str:
-            integer_part = m.group(1)
-            decimal_part = m.group(2)
-            unit = m.group(3).lower()
-            
-            int_txt = conv.convert_number(integer_part)
-            dec_txt = conv.convert_number(decimal_part)
-            u_txt = self.unit_base_mapping.mapping_of(unit)
-            
-            if u_txt:
-                return f"{int_txt} phẩy {dec_txt} {u_txt}"
-            return m.group(0)
-        result = rx_decimal_measure.sub(_rep_decimal_measure, result)
-        
-        # --- 2) Single measurement: "2dm", "3km2", "5km3" ---
-        rx_single = re.compile(r'\b(\d+)\s*([A-Za-zÀ-ỹ]+[23]?)\b', re.IGNORECASE)
-        def _rep_single(m: re.Match) -> str:
-            num, unit = m.group(1), m.group(2).lower()
-            u_txt = self.unit_base_mapping.mapping_of(unit)
-            if u_txt:
-                return f"{conv.convert_number(num)} {u_txt}"
-            return m.group(0)
-        result = rx_single.sub(_rep_single, result)
+    def _rep_plain(self, m: re.Match) -> str:
+        integer_part, decimal_part, sym = m.group(1), m.group(2), m.group(3)
+        num_txt = self.conv.convert_number(integer_part)
+        if decimal_part:
+            dec_txt = " phẩy " + " ".join(self.conv.convert_number(d) for d in decimal_part)
+            num_txt += dec_txt
+        unit_txt = self.unit_currency_mapping.mapping_of(sym)
+        if not unit_txt:
+            unit_txt = sym
+        return f"{num_txt} {unit_txt}"
+
+    # --- 1a) Range cả hai cùng unit: "3km2-6km2" ---
+    def _rep_range_both(self, m: re.Match) -> str:
+        a, unit, b = m.group(1), m.group(2).lower(), m.group(3)
+        txt_a = self.conv.convert_number(a)
+        txt_b = self.conv.convert_number(b)
+        u_txt = self.unit_base_mapping.mapping_of(unit)
+        return f"{txt_a} {u_txt} đến {txt_b} {u_txt}"
+
+    # --- 1b) Range chỉ unit sau: "[từ ]A-Bunit" ---
+    def _rep_range_single(self, m: re.Match) -> str:
+        a, b, unit = m.group(1), m.group(2), m.group(3).lower()
+        txt_a = self.conv.convert_number(a)
+        txt_b = self.conv.convert_number(b)
+        u_txt = self.unit_base_mapping.mapping_of(unit)
+        return f"{txt_a} {txt_b} {u_txt}"
+
+    # --- 1.5) Decimal measurement: "2.5kg", "3.7cm" ---
+    def _rep_decimal_measure(self, m: re.Match) -> str:
+        integer_part = m.group(1)
+        decimal_part = m.group(2)
+        unit = m.group(3).lower()
+
+        int_txt = self.conv.convert_number(integer_part)
+        dec_txt = self.conv.convert_number(decimal_part)
+        u_txt = self.unit_base_mapping.mapping_of(unit)
+
+        if u_txt:
+            return f"{int_txt} phẩy {dec_txt} {u_txt}"
+        return m.group(0)
+
+    # --- 2) Single measurement: "2dm", "3km2", "5km3" ---
+    def _rep_single(self, m: re.Match) -> str:
+        num, unit = m.group(1), m.group(2).lower()
+        u_txt = self.unit_base_mapping.mapping_of(unit)
+        if u_txt:
+            return f"{self.conv.convert_number(num)} {u_txt}"
+        return m.group(0)
 
-        # --- 3) Roman numerals riêng lẻ (ALL-UPPER, không phải unit) ---
-        rx_roman = re.compile(r'\b([IVXLCDM]{1,7})\b')
-        def _rep_roman(m: re.Match) -> str:
-            tok = m.group(1)
-            if tok == tok.upper() and not self.unit_base_mapping.has_mapping_of(tok.lower()):
-                dec = conv.roman_to_decimal(tok)
-                if dec.isdigit():
-                    return conv.convert_number(dec)
-            return tok
-        result = rx_roman.sub(_rep_roman, result)
+    # --- 3) Roman numerals riêng lẻ (ALL-UPPER, không phải unit) ---
+    def _rep_roman(self, m: re.Match) -> str:
+        tok = m.group(1)
+        if tok == tok.upper() and not self.unit_base_mapping.has_mapping_of(tok.lower()):
+            reading = self.conv.read_roman(tok)
+            if reading is not None:
+                return reading[1]
+        return tok
 
-        # --- 4) Plain numbers với dấu phẩy phân cách hàng nghìn ---
-        rx_grouped_plain = re.compile(r'\b(\d{1,3}(?:,\d{3})+)\b')
-        def _rep_grouped_plain(m: re.Match) -> str:
-            raw = m.group(1)
-            # Chỉ loại bỏ dấu phẩy (không phải dấu chấm)
-            num = raw.replace(',', '')
-            return conv.convert_number(num)
-        result = rx_grouped_plain.sub(_rep_grouped_plain, result)
-        
-        # --- 5) Plain numbers (số thuần túy không có đơn vị, không có dấu phẩy) ---
-        rx_plain = re.compile(r'\b(\d+)\b')
-        def _rep_plain_number(m: re.Match) -> str:
-            num = m.group(1)
-            return conv.convert_number(num)
-        result = rx_plain.sub(_rep_plain_number, result)
-        
-        # --- 6) Khôi phục các chuỗi mã đã bảo vệ ---
-        def restore_code(match: re.Match) -> str:
-            placeholder = match.group(0)
-            return protected.get(placeholder, placeholder)
-        
-        result = re.sub(r'__PROTECTED_\d+__', restore_code, result)
-        
-        # --- 7) Dọn khoảng trắng thừa ---
-        result = re.sub(r'\s+', ' ', result).strip()
+    # --- 4) Plain numbers với dấu phẩy phân cách hàng nghìn ---
+    def _rep_grouped_plain(self, m: re.Match) -> str:
+        raw = m.group(1)
+        # Chỉ loại bỏ dấu phẩy (không phải dấu chấm)
+        num = raw.replace(',', '')
+        return self.conv.convert_number(num)
 
-        return result
+    # --- 5) Plain numbers (số thuần túy không có đơn vị, không có dấu phẩy) ---
+    def _rep_plain_number(self, m: re.Match) -> str:
+        return self.conv.convert_number(m.group(1))
 
     def _string_for_replace(self, category: int, m: re.Match, pattern_idx: int) -> str:
         if category == Math.ROMAN_NUMBER:
@@ -249,7 +267,7 @@ class Math:
         nhưng chỉ khi toàn bộ token là La Mã hợp lệ.
         Ví dụ: “IV” → 4 → “bốn”; “LG” sẽ không match và giữ nguyên.
         """
-        conv = ConvertingNumber()
+        conv = self.conv
         # Regex chỉ match những token nguyên khối hoàn toàn là La Mã, 1–7 ký tự
         roman_prog = re.compile(r'\b(?P<R>[IVXLCDM]{1,7})\b', re.IGNORECASE)
         def _to_word(m: re.Match) -> str:
@@ -286,7 +304,7 @@ class Math:
         2bis) Plain number "12345" → đọc nguyên (một hai ba bốn năm)
         """
         text = m.group(0).strip()
-        conv = ConvertingNumber()
+        conv = self.conv
 
         # 1) Range: "3-5 cm" hoặc "3-5cm"
         rng = re.match(r"^(\d+)-(\d+)\s*([A-Za-z]+)$", text)
@@ -0,0 +1,518 @@
+import atexit
+import importlib
+import os
+import re
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from ICUConstant import (
+    DICT_FOLDER, F_ACRONYMS, F_LETTER_SOUND_EN, F_LETTER_SOUND_VN,
+    F_POPULAR, F_SYMBOL, F_TEENCODE, MAPPING_FOLDER
+)
+from ICUHelper import remove_extra_whitespace, remove_noise_symbols
+from ICUMapping import ICUMapping
+from ICUSpelling import Speller
+from ICULexicon import Lexicon
+from ICUDictionary import ICUDictionary
+from ICUCache import LRUCache, DiskCache, DEFAULT_CACHE_BYTES
+from ICUBudget import BudgetExceeded, LineBudget
+from ICUSpans import SpanText
+from ICUMetrics import DEFAULT_SAMPLE_EVERY, PipelineMetrics
+from ICUSnapshot import get_snapshot, resource_fingerprint
+
+
+_TOKEN_RX = re.compile(r'\S+')
+_SYMBOL_RX = re.compile(r'([^\w\s])')
+_TOKEN_PUNCT_RX = re.compile(r'^(.*?)([;:!\?,\.]?)$')
+_ROMAN_RX = re.compile(r'[IVXLCDM]+')
+
+# Số token (token, punc, unknown) được ghi nhớ kết quả đọc
+TOKEN_CACHE_ENTRIES = 1 << 16
+
+# Khi vượt ngân sách thời gian: token dài hơn ngưỡng này không đi qua các rule regex
+LONG_TOKEN_CHARS = 64
+_LONG_TOKEN_RX = re.compile(r'(\S{%d,})' % LONG_TOKEN_CHARS)
+
+def tokenize_symbol(s: str) -> str:
+    s = _SYMBOL_RX.sub(r' \1 ', s)
+    s = s.replace('-', ' ')
+    return s.strip()
+
+def read_letter_by_letter(word: str, speller: Speller) -> str:
+    return speller.spell(word.lower())
+
+def is_uppercase_word(word: str) -> bool:
+    return word.isupper() and word.isalpha()
+
+def contains_only_letter(word: str, speller: Speller) -> bool:
+    return all(map(speller.has_word, word.lower()))
+
+def contains_vowel(word: str) -> bool:
+    vowels = "aàảãáạăằẳẵâầẩẫấậeèẻẽéẹêềểễếệiìỉĩíịoòỏõóọôồổỗốộơỡớợuùủũúụưừửữứựyỳỷỹýỵ"
+    return any(c in vowels for c in word.lower())
+
+def split_token_punct(token: str, keep_punc: bool) -> tuple[str, str]:
+    m = _TOKEN_PUNCT_RX.match(token)
+    base, p = m.group(1), m.group(2)
+    if not keep_punc and p in '.!?:':
+        p = '.'
+    if not keep_punc and p in ',;':
+        p = ','
+    return base, p
+
+
+def _load_mapping(filename: str) -> ICUMapping:
+    mapper = ICUMapping()
+    mapper.load_mapping_file(os.path.join(MAPPING_FOLDER, filename))
+    return mapper
+
+
+class lazy_resource:
+    """
+    Decorator for a Normalizer resource built on first access:
+    - the loader runs once, its result replaces the descriptor in the instance __dict__
+    - import and load times are recorded in the instance's `startup` dict
+    """
+
+    def __init__(self, loader):
+        self.loader = loader
+        self.name = loader.__name__
+        self.__doc__ = loader.__doc__
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        owner.RESOURCES = getattr(owner, "RESOURCES", ()) + (name,)
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        obj._importing = 0.0
+        start = time.perf_counter()
+        value = self.loader(obj)
+        total = time.perf_counter() - start
+        obj.startup[self.name] = {"import": obj._importing, "load": total - obj._importing}
+        obj.__dict__[self.name] = value
+        return value
+
+
+class Normalizer:
+    """
+    Long-lived normalization engine, the object form of Main.main:
+    - SpecialCase, DateTime, Math, Address, the five mappings and the Popular.txt
+      dictionary are imported and built once, on first use (see lazy_resource)
+    - normalize: normalizes one line, same output as Main.main for that line
+    - normalize_many: normalizes every line of an iterable with the same options
+    - iter_normalize: lazy generator version of normalize_many for streaming input
+    - preload: builds every resource now (daemons, pool workers)
+    - startup_report: import/load time of each resource
+    - cache_stats / disk_cache_stats: counters of the optional result caches
+    - rule_stats: how many regex rule evaluations the trigger prefilter skipped
+      and how many lines ran over line_budget
+    - stats: time, latency histogram, bytes in / out of every pipeline stage
+      and matches per rule category (one line in metrics_sample is measured)
+    - flush / close: write pending disk cache entries
+    With cache_entries > 0, results are kept in an LRU cache keyed by the
+    whitespace-collapsed line and the options; a hit skips the whole pipeline.
+    With disk_cache set to a path, results are also kept in a SQLite file that
+    survives restarts (see ICUCache.DiskCache).
+    The reading of each distinct (token, punc, unknown) is memoized in a bounded
+    LRU token cache (token_cache_entries, 0 disables it).
+    With single_pass, SpecialCase, DateTime and Address each match their rules
+    with one merged regex instead of one sub() per rule (see RuleSet.scan).
+    With line_budget (seconds), a line whose regex rules run longer than that
+    falls back to a cheaper path (see apply_rules_within_budget).
+    With resolve_spans, a rule output that is final (no digits left) is not
+    read again by the later rules and stages (see ICUSpans.resolves); this
+    changes the reading of some codes, e.g. "A-01-23", so it is off by default.
+    """
+
+    def __init__(self, cache_entries: int = 0, cache_bytes: int = DEFAULT_CACHE_BYTES,
+                 disk_cache: Optional[str] = None, token_cache_entries: int = TOKEN_CACHE_ENTRIES,
+                 single_pass: bool = False, line_budget: Optional[float] = None,
+                 metrics_sample: int = DEFAULT_SAMPLE_EVERY, resolve_spans: bool = False):
+        # name → {"import": giây, "load": giây}, chỉ có các tài nguyên đã load
+        self.startup: Dict[str, Dict[str, float]] = {}
+        self._importing = 0.0
+        self.single_pass = single_pass
+        self.resolve_spans = resolve_spans
+        # Ngân sách thời gian (giây) cho các rule regex của một dòng, None = không giới hạn
+        self.line_budget = line_budget if line_budget and line_budget > 0 else None
+        self.budget_fallbacks = 0
+        self.budget_give_ups = 0
+        self.metrics = PipelineMetrics(metrics_sample)
+        self.result_cache = LRUCache(cache_entries, cache_bytes) if cache_entries > 0 else None
+        self.token_cache = LRUCache(token_cache_entries) if token_cache_entries > 0 else None
+        self.disk_cache = None
+        if disk_cache:
+            self.disk_cache = DiskCache(disk_cache, resource_fingerprint())
+            atexit.register(self.close)
+
+    def _import(self, module_name: str):
+        start = time.perf_counter()
+        module = importlib.import_module(module_name)
+        self._importing += time.perf_counter() - start
+        return module
+
+    @lazy_resource
+    def special_case(self):
+        return self._import("SpecialCase").SpecialCase(single_pass=self.single_pass)
+
+    @lazy_resource
+    def date_time(self):
+        return self._import("DateTime").DateTime(single_pass=self.single_pass)
+
+    @lazy_resource
+    def math_mod(self):
+        return self._import("Math").Math()
+
+    @lazy_resource
+    def address(self):
+        return self._import("Address").Address(single_pass=self.single_pass)
+
+    @lazy_resource
+    def acronym(self):
+        return _load_mapping(F_ACRONYMS)
+
+    @lazy_resource
+    def teen_code(self):
+        return _load_mapping(F_TEENCODE)
+
+    @lazy_resource
+    def symbol(self):
+        return _load_mapping(F_SYMBOL)
+
+    @lazy_resource
+    def letterVN(self):
+        return _load_mapping(F_LETTER_SOUND_VN)
+
+    @lazy_resource
+    def letterEN(self):
+        return _load_mapping(F_LETTER_SOUND_EN)
+
+    @lazy_resource
+    def lexicon(self):
+        return Lexicon(self.popular, [(Lexicon.ACRONYM, self.acronym), (Lexicon.TEENCODE, self.teen_code),
+                                      (Lexicon.SYMBOL, self.symbol)])
+
+    @lazy_resource
+    def spellerVN(self):
+        return Speller(self.letterVN)
+
+    @lazy_resource
+    def spellerEN(self):
+        return Speller(self.letterEN)
+
+    @lazy_resource
+    def popular(self):
+        popular = ICUDictionary()
+        popular.load_dict_file(os.path.join(DICT_FOLDER, F_POPULAR))
+        return popular
+
+    @lazy_resource
+    def converter(self):
+        return self._import("ICUNumberConverting").ConvertingNumber()
+
+    def preload(self) -> "Normalizer":
+        """Build every resource now and persist the resource snapshot."""
+        for name in self.RESOURCES:
+            getattr(self, name)
+        snapshot = get_snapshot()
+        if snapshot is not None:
+            snapshot.save()
+        return self
+
+    def startup_report(self) -> str:
+        """Table of import and load time (ms) per resource, unused ones marked as not loaded."""
+        rows = [f"{'resource':<14}{'import ms':>11}{'load ms':>11}"]
+        total = 0.0
+        for name in self.RESOURCES:
+            times = self.startup.get(name)
+            if times is None:
+                rows.append(f"{name:<14}{'-':>11}{'-':>11}  (not loaded)")
+                continue
+            total += times["import"] + times["load"]
+            rows.append(f"{name:<14}{times['import'] * 1000:>11.2f}{times['load'] * 1000:>11.2f}")
+        rows.append(f"{'total':<14}{total * 1000:>22.2f}")
+        return "\n".join(rows)
+
+    def normalize(self, text: str, punc: bool = False, unknown: bool = False,
+                  lower: bool = False, rule: bool = False) -> str:
+        """Normalize a single line of text."""
+        cache = self.result_cache
+        disk = self.disk_cache
+        if cache is not None or disk is not None:
+            text = remove_extra_whitespace(text)
+            options = (punc, unknown, lower, rule)
+            if self.resolve_spans:
+                # Kết quả khác chế độ mặc định → khóa cache riêng
+                options += ("resolve_spans",)
+            if cache is not None:
+                key = (text,) + options
+                result = cache.get(key)
+                if result is not None:
+                    return result
+            if disk is not None:
+                disk_key = disk.make_key(text, options)
+                result = disk.get(disk_key)
+                if result is not None:
+                    if cache is not None:
+                        cache.put(key, result)
+                    return result
+        degraded = False
+        metrics = self.metrics if self.metrics.sample() else None
+        if self.line_budget is None:
+            result = self.apply_rules(text, metrics)
+        else:
+            result, degraded = self.apply_rules_within_budget(text, metrics)
+        if not rule:
+            if metrics is None:
+                result = self.render_tokens(result, punc, unknown, lower)
+            else:
+                start = time.perf_counter()
+                rendered = self.render_tokens(result, punc, unknown, lower)
+                metrics.record("tokens", time.perf_counter() - start, result, rendered)
+                result = rendered
+        # Kết quả dự phòng (vượt ngân sách) không được cache
+        if cache is not None and not degraded:
+            cache.put(key, result)
+        if disk is not None and not degraded:
+            disk.put(disk_key, result)
+        return result
+
+    def cache_stats(self) -> Optional[Dict[str, float]]:
+        """Result cache counters, None when the cache is disabled."""
+        return self.result_cache.stats() if self.result_cache is not None else None
+
+    def token_cache_stats(self) -> Optional[Dict[str, float]]:
+        """Token cache counters, None when token memoization is disabled."""
+        return self.token_cache.stats() if self.token_cache is not None else None
+
+    def rule_stats(self) -> Dict[str, dict]:
+        """Prefilter counters of every rule module built so far (see RuleSet.stats)."""
+        stats = {"budget": {"line_budget": self.line_budget, "fallbacks": self.budget_fallbacks,
+                            "give_ups": self.budget_give_ups}}
+        for name in ("special_case", "date_time", "math_mod", "address"):
+            module = self.__dict__.get(name)
+            if module is None:
+                continue
+            # Math chỉ dùng bảng STEPS
+            stats[name] = (module.steps if name == "math_mod" else module.rules).stats()
+        return stats
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Per-stage metrics (see ICUMetrics.PipelineMetrics). The rule stages also
+        get "matches": matches replaced per rule category, counted on every line.
+        """
+        stats = self.metrics.stats()
+        stages = stats["stages"]
+        for stage, name in (("special_case", "special_case"), ("date_time", "date_time"),
+                            ("math", "math_mod"), ("address", "address")):
+            module = self.__dict__.get(name)
+            if module is not None:
+                # Math chỉ dùng bảng STEPS, các rule trong file của nó không chạy
+                rules = module.steps if name == "math_mod" else module.rules
+                stages[stage]["matches"] = rules.match_counts()
+        return stats
+
+    def disk_cache_stats(self) -> Optional[Dict[str, float]]:
+        """Disk cache counters, None when the disk cache is disabled."""
+        return self.disk_cache.stats() if self.disk_cache is not None else None
+
+    def flush(self) -> None:
+        """Write pending disk cache entries."""
+        if self.disk_cache is not None:
+            self.disk_cache.flush()
+
+    def close(self) -> None:
+        if self.disk_cache is not None:
+            self.disk_cache.close()
+
+    def normalize_many(self, lines: Iterable[str], punc: bool = False, unknown: bool = False,
+                       lower: bool = False, rule: bool = False) -> List[str]:
+        """Normalize every line of `lines`, keeping the input order."""
+        return list(self.iter_normalize(lines, punc, unknown, lower, rule))
+
+    def iter_normalize(self, lines: Iterable[str], punc: bool = False, unknown: bool = False,
+                       lower: bool = False, rule: bool = False) -> Iterator[str]:
+        """
+        Yield the normalized form of each line as it is consumed, so memory stays
+        constant however large the input is. Each line is stripped first, like Main.main.
+        """
+        for line in lines:
+            yield self.normalize(line.strip(), punc, unknown, lower, rule)
+
+    def apply_rules(self, line: str, metrics: Optional[PipelineMetrics] = None) -> str:
+        """
+        Cleanup + SpecialCase → DateTime → Math → Address, then symbol/noise cleanup.
+        The stages share one SpanText: a region one of them has normalized is not
+        searched by the next ones, and the line is assembled once at the end.
+        With `metrics`, every stage is timed and recorded there.
+        """
+        if metrics is not None:
+            return self._apply_rules_measured(line, metrics)
+        spans = SpanText(remove_extra_whitespace(line), self.resolve_spans)
+        self.special_case.normalize_spans(spans)
+        self.date_time.normalize_spans(spans)
+        self.math_mod.normalize_spans(spans)
+        self.address.normalize_spans(spans)
+        return self.cleanup_symbols(spans.text())
+
+    def _apply_rules_measured(self, line: str, metrics: PipelineMetrics) -> str:
+        """apply_rules, recording each stage in `metrics` (keep both in sync)."""
+        clock = time.perf_counter
+        start = clock()
+        text = remove_extra_whitespace(line)
+        metrics.record("cleanup", clock() - start, line, text)
+        spans = SpanText(text, self.resolve_spans)
+        for stage, module in (("special_case", self.special_case), ("date_time", self.date_time),
+                              ("math", self.math_mod), ("address", self.address)):
+            start = clock()
+            module.normalize_spans(spans)
+            elapsed = clock() - start
+            # text() ghép lại dòng chỉ để đếm bytes, ngoài phần thời gian đo
+            out = spans.text()
+            metrics.record(stage, elapsed, text, out)
+            text = out
+        start = clock()
+        result = self.cleanup_symbols(text)
+        metrics.record("symbols", clock() - start, text, result)
+        return result
+
+    @staticmethod
+    def cleanup_symbols(text: str) -> str:
+        """Symbol/noise cleanup that ends apply_rules (linear time, no regex rules)."""
+        text = tokenize_symbol(text)
+        text = remove_noise_symbols(text, space_replace=False)
+        return remove_extra_whitespace(text)
+
+    def apply_rules_within_budget(self, line: str, metrics: Optional[PipelineMetrics] = None):
+        """
+        apply_rules bounded by line_budget seconds; returns (text, degraded).
+        Over budget, the line is redone with the rules applied only between
+        tokens of LONG_TOKEN_CHARS or more (where pathological backtracking
+        happens), the long tokens only get cleanup_symbols. If that is over
+        budget too, the rules are skipped altogether.
+        """
+        # Load các module rule (lần đầu) ngoài ngân sách: thời gian load không tính cho dòng
+        for name in ("special_case", "date_time", "math_mod", "address"):
+            getattr(self, name)
+        try:
+            with LineBudget(self.line_budget):
+                return self.apply_rules(line, metrics), False
+        except BudgetExceeded:
+            self.budget_fallbacks += 1
+        try:
+            with LineBudget(self.line_budget):
+                pieces = []
+                # split giữ các token dài ở vị trí lẻ
+                for i, part in enumerate(_LONG_TOKEN_RX.split(remove_extra_whitespace(line))):
+                    if i % 2:
+                        pieces.append(self.cleanup_symbols(part))
+                    elif part.strip():
+                        pieces.append(self.apply_rules(part))
+                return remove_extra_whitespace(" ".join(pieces)), True
+        except BudgetExceeded:
+            self.budget_give_ups += 1
+        return self.cleanup_symbols(remove_extra_whitespace(line)), True
+
+    def render_tokens(self, text: str, punc: bool, unknown: bool, lower: bool) -> str:
+        """Final token classification loop: dictionary, acronym, teencode, symbols, spelling."""
+        cache = self.token_cache
+        result = ""
+        for tok in _TOKEN_RX.findall(text):
+            if cache is None:
+                out_tok = self._render_token(tok, punc, unknown)
+            else:
+                key = (tok, punc, unknown)
+                out_tok = cache.get(key)
+                if out_tok is None:
+                    out_tok = self._render_token(tok, punc, unknown)
+                    cache.put(key, out_tok)
+            result += " " + out_tok + " "
+        if lower:
+            result = result.lower()
+
+        result = remove_noise_symbols(result, space_replace=False)
+        result = remove_extra_whitespace(result)
+        result = result.rstrip()
+        if not result.endswith('.'):
+            result += '.'
+        return remove_extra_whitespace(result)
+
+    def _render_token(self, tok: str, punc: bool, unknown: bool) -> str:
+        """Read one token (with its trailing punctuation), without the `lower` option."""
+        base_tok, tm_punc = split_token_punct(tok, punc)
+        word = base_tok.strip()
+
+        out_tok = None
+        if not word:
+            # Xử lý trường hợp token chỉ là dấu câu
+            if tm_punc:
+                out_tok = " . " if tm_punc in '.!?:' else " , "
+            else:
+                out_tok = ""
+        else:
+            # Popular → Acronyms → Teencode; Symbol chỉ dùng cho từng phần của token
+            entry = self.lexicon.lookup(word)
+            if entry is not None and entry[0] != Lexicon.SYMBOL:
+                out_tok = word if entry[0] == Lexicon.KEEP else entry[1]
+            else:
+                out_tok = self._render_subtokens(base_tok, punc, unknown)
+                if not out_tok:
+                    out_tok = word
+
+        if tm_punc and out_tok != " . " and out_tok != " , ":
+            if punc:
+                out_tok += f" {tm_punc} "
+            else:
+                out_tok += " . " if tm_punc in '.!?:' else " , "
+        return out_tok
+
+    def _render_subtokens(self, base_tok: str, punc: bool, unknown: bool) -> str:
+        """Split an unknown token on symbols and read each piece."""
+        lexicon = self.lexicon
+
+        tmp = remove_noise_symbols(base_tok, space_replace=True)
+        tmp = tokenize_symbol(tmp)
+        subtoks = _TOKEN_RX.findall(tmp)
+        assemble = ""
+        for st in subtoks:
+            entry = lexicon.lookup(st)
+            action = entry[0] if entry is not None else None
+            if action == Lexicon.KEEP:
+                assemble += f" {st} "
+            elif action == Lexicon.ACRONYM or action == Lexicon.TEENCODE:
+                assemble += f" {entry[1]} "
+            elif st in '.!?:,;/':
+                if not punc:
+                    assemble += " . " if st in '.!?:' else " , "
+                else:
+                    assemble += f" {st} "
+            elif action == Lexicon.SYMBOL:
+                assemble += f" {entry[1]} "
+            elif contains_only_letter(st, self.spellerVN):
+                if is_uppercase_word(st):
+                    if _ROMAN_RX.fullmatch(st) and len(st) <= 7:
+                        roman = self.converter.read_roman(st)
+                        if roman is not None:
+                            assemble += f" {roman[0]} "
+                        elif unknown:
+                            assemble += f" {st} "
+                        else:
+                            assemble += f" {read_letter_by_letter(st, self.spellerEN)} "
+                    elif unknown:
+                        assemble += f" {st} "
+                    else:
+                        assemble += f" {read_letter_by_letter(st, self.spellerEN)} "
+                else:
+                    if not unknown:
+                        if not contains_vowel(st):
+                            assemble += f" {read_letter_by_letter(st, self.spellerVN)} "
+                        else:
+                            assemble += f" {st} "
+                    else:
+                        assemble += f" {st} "
+            else:
+                assemble += f" {st} "
+        return assemble.strip()
@@ -0,0 +1,80 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from ICUMappedTable import mapped_tables_enabled
+from Normalizer import Normalizer
+
+# Kích thước mỗi chunk tính theo số ký tự, để dòng dài → chunk ít dòng, dòng ngắn → chunk nhiều dòng
+CHUNK_CHARS = 64 * 1024
+CHUNK_MAX_LINES = 4096
+
+# Số chunk được gửi trước cho mỗi worker (giới hạn bộ nhớ, vẫn giữ worker luôn bận)
+CHUNKS_IN_FLIGHT_PER_JOB = 4
+
+# Normalizer của từng worker process, tạo một lần trong initializer
+_worker_normalizer: Optional[Normalizer] = None
+
+def _init_worker(config: Optional[dict] = None) -> None:
+    """Process pool initializer: build the whole pipeline once per worker."""
+    global _worker_normalizer
+    _worker_normalizer = Normalizer(**(config or {})).preload()
+
+def prepare_mapped_tables() -> None:
+    """
+    With VITEXT_MAPPED_TABLES=1, write the mmap tables of every resource now,
+    before the pool starts, so that all workers map the same files (and share
+    their pages) instead of each writing its own copy on a first run.
+    """
+    if mapped_tables_enabled():
+        Normalizer().preload()
+
+def _normalize_chunk(chunk: List[str], options: Tuple[bool, bool, bool, bool]) -> List[str]:
+    """Normalize one chunk of lines inside a worker, in input order."""
+    punc, unknown, lower, rule = options
+    results = _worker_normalizer.normalize_many(chunk, punc, unknown, lower, rule)
+    # Worker bị dừng bằng os._exit (không chạy atexit) → ghi cache đĩa sau mỗi chunk
+    _worker_normalizer.flush()
+    return results
+
+def chunk_lines(lines: Iterable[str], target_chars: int = CHUNK_CHARS,
+                max_lines: int = CHUNK_MAX_LINES) -> Iterator[List[str]]:
+    """
+    Group `lines` into chunks of about `target_chars` characters (at most
+    `max_lines` lines), so the per-chunk work stays similar whatever the line length.
+    """
+    chunk = []
+    size = 0
+    for line in lines:
+        chunk.append(line)
+        size += len(line)
+        if size >= target_chars or len(chunk) >= max_lines:
+            yield chunk
+            chunk = []
+            size = 0
+    if chunk:
+        yield chunk
+
+def iter_normalize_parallel(lines: Iterable[str], jobs: int = 0, punc: bool = False,
+                            unknown: bool = False, lower: bool = False, rule: bool = False,
+                            target_chars: int = CHUNK_CHARS, config: Optional[dict] = None) -> Iterator[str]:
+    """
+    Normalize `lines` on a pool of `jobs` worker processes (0 → os.cpu_count()),
+    each holding a Normalizer(**config).
+    Results are yielded in exactly the input order; only a bounded number of
+    chunks is in flight at a time, so memory stays constant on large inputs.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    options = (punc, unknown, lower, rule)
+    prepare_mapped_tables()
+    max_in_flight = jobs * CHUNKS_IN_FLIGHT_PER_JOB
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(config,)) as pool:
+        pending = deque()
+        for chunk in chunk_lines(lines, target_chars):
+            pending.append(pool.submit(_normalize_chunk, chunk, options))
+            if len(pending) >= max_in_flight:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
@@ -0,0 +1,272 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from Parallel import _init_worker, _normalize_chunk, prepare_mapped_tables
+
+# Cửa sổ gom request thành một batch (giây)
+BATCH_WINDOW = 0.005
+# Số dòng tối đa trong một batch gửi cho worker
+MAX_BATCH_LINES = 256
+# Số request tối đa đang chờ trong hàng đợi; vượt quá → 503
+QUEUE_SIZE = 1024
+# Kích thước body tối đa (bytes)
+MAX_BODY_BYTES = 1 << 20
+
+OPTION_NAMES = ("punc", "unknown", "lower", "rule")
+
+HTTP_REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class MicroBatcher:
+    """
+    Coalesce requests that arrive within `window` seconds into one batch per
+    option set and run it on a process pool where every worker keeps a warm
+    Normalizer (see Parallel._init_worker):
+    - submit: queue texts, wait for their results; raises HTTPError(503) when the queue is full
+    - start/stop: run or cancel the batching loop
+    """
+
+    def __init__(self, workers: int = 1, window: float = BATCH_WINDOW,
+                 max_batch_lines: int = MAX_BATCH_LINES, queue_size: int = QUEUE_SIZE,
+                 config: Optional[dict] = None):
+        self.workers = max(1, workers)
+        self.config = config
+        self.window = window
+        self.max_batch_lines = max_batch_lines
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.slots = asyncio.Semaphore(self.workers)
+        self.task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.lines = 0
+
+    async def start(self) -> None:
+        prepare_mapped_tables()
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                        initargs=(self.config,))
+        loop = asyncio.get_running_loop()
+        # Làm nóng: mỗi worker build pipeline trước khi nhận request đầu tiên
+        warmups = [loop.run_in_executor(self.pool, _normalize_chunk, [""], (False,) * 4)
+                   for _ in range(self.workers)]
+        await asyncio.gather(*warmups)
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        if self.pool:
+            self.pool.shutdown(cancel_futures=True)
+
+    async def submit(self, texts: List[str], options: Tuple[bool, ...]) -> List[str]:
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((texts, options, future))
+        except asyncio.QueueFull:
+            raise HTTPError(503, "normalization queue is full, retry later")
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            size = len(items[0][0])
+            deadline = loop.time() + self.window
+            while size < self.max_batch_lines:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                items.append(item)
+                size += len(item[0])
+
+            groups: Dict[Tuple[bool, ...], list] = {}
+            for item in items:
+                groups.setdefault(item[1], []).append(item)
+            for options, group in groups.items():
+                await self.slots.acquire()
+                asyncio.create_task(self._dispatch(options, group))
+
+    async def _dispatch(self, options: Tuple[bool, ...], group: list) -> None:
+        try:
+            lines = [text for texts, _, _ in group for text in texts]
+            try:
+                results = await asyncio.get_running_loop().run_in_executor(
+                    self.pool, _normalize_chunk, lines, options)
+            except Exception as e:
+                for _, _, future in group:
+                    if not future.done():
+                        future.set_exception(HTTPError(500, f"normalization failed: {e}"))
+                return
+            self.batches += 1
+            self.lines += len(lines)
+            pos = 0
+            for texts, _, future in group:
+                if not future.done():
+                    future.set_result(results[pos:pos + len(texts)])
+                pos += len(texts)
+        finally:
+            self.slots.release()
+
+
+class NormalizeServer:
+    """
+    Minimal HTTP/1.1 server (asyncio, stdlib only):
+    - POST /normalize {"text": "..."} → {"result": "..."}
+    - POST /normalize {"texts": [...]} → {"results": [...]}
+      optional boolean fields: punc, unknown, lower, rule
+    - GET /health → batcher counters
+    """
+
+    def __init__(self, batcher: MicroBatcher):
+        self.batcher = batcher
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                keep_alive = True
+                try:
+                    method, path, headers = self._parse_head(head)
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                    length = headers.get("content-length", "0") or "0"
+                    if not (length.isascii() and length.isdigit()):
+                        # Không biết body dài bao nhiêu → không đọc được request tiếp theo
+                        keep_alive = False
+                        raise HTTPError(400, "Content-Length must be a non-negative integer")
+                    length = int(length)
+                    if length > MAX_BODY_BYTES:
+                        keep_alive = False
+                        raise HTTPError(413, "request body too large")
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = 200, await self._route(method, path, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": e.message}
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except Exception as e:
+                    status, payload = 500, {"error": str(e)}
+                self._respond(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _parse_head(head: bytes) -> Tuple[str, str, Dict[str, str]]:
+        lines = head.decode('latin-1').split("\r\n")
+        parts = lines[0].split()
+        if len(parts) != 3:
+            raise HTTPError(400, "malformed request line")
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                key, value = line.split(':', 1)
+                headers[key.strip().lower()] = value.strip()
+        return parts[0].upper(), parts[1].split('?', 1)[0], headers
+
+    async def _route(self, method: str, path: str, body: bytes) -> dict:
+        if path == "/health":
+            return {"status": "ok", "batches": self.batcher.batches, "lines": self.batcher.lines,
+                    "queued": self.batcher.queue.qsize()}
+        if path != "/normalize":
+            raise HTTPError(404, f"unknown path {path}")
+        if method != "POST":
+            raise HTTPError(405, "use POST")
+        try:
+            data = json.loads(body.decode('utf-8'))
+        except (UnicodeDecodeError, ValueError):
+            raise HTTPError(400, "body must be UTF-8 JSON")
+        if not isinstance(data, dict):
+            raise HTTPError(400, "body must be a JSON object")
+        options = tuple(bool(data.get(name, False)) for name in OPTION_NAMES)
+        if "texts" in data:
+            texts = data["texts"]
+            if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                raise HTTPError(400, "'texts' must be a list of strings")
+            return {"results": await self.batcher.submit(texts, options) if texts else []}
+        if isinstance(data.get("text"), str):
+            return {"result": (await self.batcher.submit([data["text"]], options))[0]}
+        raise HTTPError(400, "expected 'text' or 'texts'")
+
+    @staticmethod
+    def _respond(writer: asyncio.StreamWriter, status: int, payload: dict, keep_alive: bool) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+
+
+async def serve(host: str, port: int, batcher: MicroBatcher) -> None:
+    await batcher.start()
+    server = await asyncio.start_server(NormalizeServer(batcher).handle, host, port)
+    print(f"[INFO] Listening on http://{host}:{port} with {batcher.workers} worker(s)", file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await batcher.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HTTP normalization service")
+    parser.add_argument('-host', default="127.0.0.1")
+    parser.add_argument('-port', type=int, default=8080)
+    parser.add_argument('-workers', type=int, default=1,
+                        help="worker processes, each with one warm pipeline (default: %(default)s)")
+    parser.add_argument('-window', type=float, default=BATCH_WINDOW * 1000,
+                        help="batching window in milliseconds (default: %(default)s)")
+    parser.add_argument('-batch', type=int, default=MAX_BATCH_LINES,
+                        help="maximum lines per batch (default: %(default)s)")
+    parser.add_argument('-queue', type=int, default=QUEUE_SIZE,
+                        help="maximum queued requests before answering 503 (default: %(default)s)")
+    parser.add_argument('-cache', type=int, default=0,
+                        help="result cache entries per worker, 0 = disabled (default: %(default)s)")
+    parser.add_argument('-disk-cache', default=None, help="SQLite result cache file shared by the workers")
+    parser.add_argument('-line-budget', type=float, default=0,
+                        help="milliseconds of regex rules per line before a cheaper fallback, 0 = unlimited")
+    parser.add_argument('--mapped-tables', action='store_true',
+                        help="read the word lists from mmap tables shared by the workers (VITEXT_MAPPED_TABLES=1)")
+    args = parser.parse_args()
+    if args.mapped_tables:
+        os.environ["VITEXT_MAPPED_TABLES"] = "1"
+
+    async def run():
+        batcher = MicroBatcher(args.workers, args.window / 1000, args.batch, args.queue,
+                               {"cache_entries": args.cache, "disk_cache": args.disk_cache,
+                                "line_budget": args.line_budget / 1000})
+        await serve(args.host, args.port, batcher)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,12 @@
 import re
 import os
 import sys
-from ICUReadFile import ICUReadFile
-from ICUMapping import ICUMapping
+from ICURuleSet import RuleSet
+from ICUSpans import SpanText
+from ICUSpelling import CharTable, get_speller
 from ICUNumberConverting import ConvertingNumber
 from ICUConstant import (
-    REGEX_FOLDER, MAPPING_FOLDER,
+    REGEX_FOLDER,
     F_LETTER_SOUND_EN, F_LETTER_SOUND_VN,
     F_SYMBOL, F_NUMBER_SOUND,
     DIGIT_ZERO, PLUS_SIGN,
@@ -15,6 +16,15 @@ from ICUConstant import (
     VERTICAL_LINE
 )
 
+# Khoảng trắng giữa hai chữ số (vd. "0912 345 678" → "0912345678")
+_DIGIT_GAP_RX = re.compile(r'(?<=\d)\s+(?=\d)')
+
+# Cách đọc "." và "/" trong tên miền
+_URL_SYMBOLS = {".": "chấm", "/": "xuyệt"}
+
+# Ký tự bỏ qua khi đọc số điện thoại
+_PHONE_SEPARATORS = (FULL_STOP, COLON, HYPHEN_MINUS, LEFT_PARENTHESIS, RIGHT_PARENTHESIS)
+
 class SpecialCase:
 
     PHONE_NUMBER     = 0
@@ -29,49 +39,40 @@ class SpecialCase:
     F_WEBSITE        = "Website.txt"
     F_EMAIL          = "Email.txt"
 
-    def __init__(self):
-        self.patterns = {}
+    # Thứ tự áp dụng: email trước website để không bị nhận nhầm
+    RULE_ORDER = (EMAIL, PHONE_NUMBER, FOOTBALL_UNDER, FOOTBALL_OTHER, WEBSITE)
+
+    def __init__(self, single_pass: bool = False):
+        # single_pass: gộp mọi rule thành một regex, quét một lần (RuleSet.scan)
+        self.single_pass = single_pass
+        self.rules = RuleSet()
         self._load_patterns(SpecialCase.PHONE_NUMBER,     SpecialCase.F_PHONE_NUMBER)
         self._load_patterns(SpecialCase.FOOTBALL_UNDER,   SpecialCase.F_FOOTBALL_UNDER)
         self._load_patterns(SpecialCase.FOOTBALL_OTHER,   SpecialCase.F_FOOTBALL_OTHER)
         self._load_patterns(SpecialCase.WEBSITE,          SpecialCase.F_WEBSITE)
         self._load_patterns(SpecialCase.EMAIL,            SpecialCase.F_EMAIL)
+        self._replacers = {category: self._make_replacer(category) for category in SpecialCase.RULE_ORDER}
+        self._number_speller = get_speller(F_NUMBER_SOUND)
+        self._phone_table = CharTable(self._phone_char)
 
     def _load_patterns(self, category: int, filename: str):
-        """Load regex patterns from file into self.patterns[category]."""
-        path = os.path.join(REGEX_FOLDER, filename)
-        reader = ICUReadFile(path)
-        if not reader.read_file():
-            print(f"[E] Error reading pattern file: {filename}", file=sys.stderr)
-            return
-        pos = 0
-        self.patterns.setdefault(category, [])
-        while pos < reader.get_file_length():
-            reader.next_line(pos)
-            line = reader.get_content_uchar()[reader.get_line_start():reader.get_line_end()].strip()
-            if line:
-                self.patterns[category].append(line)
-            pos = reader.get_line_end()
+        """Compile the regex rules of a file into self.rules[category]."""
+        self.rules.load(category, os.path.join(REGEX_FOLDER, filename))
 
     def normalize_text(self, text: str) -> str:
         """Apply all special regex replacements to the input text."""
-        text = re.sub(r'(?<=\d)\s+(?=\d)', '', text)
-        result = text
-        # 1) Handle emails first to avoid conflicts with websites
-        for pattern in self.patterns.get(SpecialCase.EMAIL, []):
-            prog = re.compile(pattern)
-            result = prog.sub(lambda m: f" {self._replace(SpecialCase.EMAIL, m.group(0))} ", result)
-        # 2) Handle other categories in fixed order
-        for category in (
-            SpecialCase.PHONE_NUMBER,
-            SpecialCase.FOOTBALL_UNDER,
-            SpecialCase.FOOTBALL_OTHER,
-            SpecialCase.WEBSITE
-        ):
-            for pattern in self.patterns.get(category, []):
-                prog = re.compile(pattern)
-                result = prog.sub(lambda m: f" {self._replace(category, m.group(0))} ", result)
-        return result
+        return self.normalize_spans(SpanText(text)).text()
+
+    def normalize_spans(self, spans: SpanText) -> SpanText:
+        """normalize_text on the unresolved spans of a line; replacements become resolved spans."""
+        spans.rewrite(lambda text: [(_DIGIT_GAP_RX.sub('', text), False)])
+        if self.single_pass:
+            return self.rules.scan_spans(spans, self._replacers, SpecialCase.RULE_ORDER)
+        # Emails first to avoid conflicts with websites, then the other categories in fixed order
+        return self.rules.apply_spans(spans, self._replacers, SpecialCase.RULE_ORDER)
+
+    def _make_replacer(self, category: int):
+        return lambda m: f" {self._replace(category, m.group(0))} "
 
     def _replace(self, category: int, match_text: str) -> str:
         """Dispatch to the correct handler based on category."""
@@ -138,32 +139,16 @@ class SpecialCase:
         Spell out website URLs, keeping 'com' intact,
         and say 'chấm' for '.', 'xuyệt' for '/'.
         """
-        mapper = ICUMapping()
-        mapper.load_mapping_file(os.path.join(MAPPING_FOLDER, F_LETTER_SOUND_VN))
-        mapper.load_mapping_file(os.path.join(MAPPING_FOLDER, F_SYMBOL))
-
+        speller = get_speller(F_LETTER_SOUND_VN, F_SYMBOL, overrides=_URL_SYMBOLS, digits=True)
         lowered = text.lower()
-        conv = ConvertingNumber()
 
         idx = lowered.find(".com")
-        if idx != -1:
-            skip_start, skip_end = idx + 1, idx + 1 + len("com")
-        else:
-            skip_start, skip_end = -1, -1
-
-        result = ""
-        for i, c in enumerate(lowered):
-            if skip_start <= i < skip_end:
-                result += c
-            elif c.isdigit():
-                result += f" {conv.convert_number(c)} "
-            elif c == ".":
-                result += " chấm "
-            elif c == "/":
-                result += " xuyệt "
-            else:
-                result += f" {mapper.mapping_of(c)} "
-        return result.strip()
+        if idx == -1:
+            return speller.spell_each(lowered, " ", " ").strip()
+        # "com" giữ nguyên, phần còn lại đọc từng ký tự
+        skip_start, skip_end = idx + 1, idx + 1 + len("com")
+        return (speller.spell_each(lowered[:skip_start], " ", " ") + lowered[skip_start:skip_end]
+                + speller.spell_each(lowered[skip_end:], " ", " ")).strip()
 
     def _regex_email(self, text: str) -> str:
         """
@@ -173,33 +158,18 @@ class SpecialCase:
         - 'gmail.com' -> 'giy meo chấm com'
         - others: same as website
         """
-        mapper = ICUMapping()
-        mapper.load_mapping_file(os.path.join(MAPPING_FOLDER, F_LETTER_SOUND_EN))
-        mapper.load_mapping_file(os.path.join(MAPPING_FOLDER, F_SYMBOL))
-        conv = ConvertingNumber()
-
         lowered = text.lower()
         local, domain = (lowered.split("@", 1) + [""])[:2]
 
         parts = []
-        for c in local:
-            if c.isdigit():
-                parts.append(conv.convert_number(c))
-            else:
-                parts.append(mapper.mapping_of(c))
-        parts.extend(["a", "còng"]);
+        if local:
+            parts.append(get_speller(F_LETTER_SOUND_EN, F_SYMBOL, digits=True).spell(local))
+        parts.extend(["a", "còng"])
         if domain.startswith("gmail.com"):
             parts.extend(["giy", "meo", "chấm", "com"])
-        else:
-            for c in domain:
-                if c.isdigit():
-                    parts.append(conv.convert_number(c))
-                elif c == ".":
-                    parts.append("chấm")
-                elif c == "/":
-                    parts.append("xuyệt")
-                else:
-                    parts.append(mapper.mapping_of(c))
+        elif domain:
+            speller = get_speller(F_LETTER_SOUND_EN, F_SYMBOL, overrides=_URL_SYMBOLS, digits=True)
+            parts.append(speller.spell(domain))
         return " ".join(parts).strip()
 
     def _regex_phone_number(self, text: str) -> str:
@@ -207,18 +177,13 @@ class SpecialCase:
         Spell out phone numbers: '+' -> 'cộng', digits via F_NUMBER_SOUND mapping,
         ignore punctuation.
         """
-        mapper = ICUMapping()
-        mapper.load_mapping_file(os.path.join(MAPPING_FOLDER, F_NUMBER_SOUND))
-        result = ""
-        for c in text:
-            if c.isspace():
-                continue
-            if c == PLUS_SIGN:
-                result += "cộng "
-            elif c in (FULL_STOP, COLON, HYPHEN_MINUS, LEFT_PARENTHESIS, RIGHT_PARENTHESIS):
-                continue
-            elif c.isdigit():
-                result += mapper.mapping_of(c) + " "
-            else:
-                result += c
-        return result
\ No newline at end of file
+        return text.translate(self._phone_table)
+
+    def _phone_char(self, c: str) -> str:
+        if c.isspace() or c in _PHONE_SEPARATORS:
+            return ""
+        if c == PLUS_SIGN:
+            return "cộng "
+        if c.isdigit():
+            return self._number_speller.word_of(c) + " "
+        return c
@@ -0,0 +1,105 @@
+import argparse
+import random
+import time
+from typing import Iterator, List, Tuple
+
+from ICUProfile import module_rules
+from Normalizer import Normalizer
+from load_test import SAMPLE_TEXTS, percentile
+
+# Các mẫu lặp lại gây backtrack nặng cho RegexRule:
+#   Website.txt   ((\w+)\.)+ ... ([\.\/][^\s]*)*  → "a.a.a.a…", "www.a.a.a…w"
+#   Codenumber.txt [^\s]*\d[^\s]*\b              → token dài không có chữ số, nhiều ranh giới từ
+ADVERSARIAL_UNITS = [
+    ("dotted_words",   "", "a.", ""),
+    ("www_dotted",     "www.", "a.", "w"),
+    ("url_slashes",    "http://a.com", "./", "!"),
+    ("punct_word",     "", "a!", ""),
+    ("dash_word",      "", "a.-", ""),
+    ("digit_punct",    "", "1!", ""),
+    ("long_number",    "", "1", ""),
+    ("digit_spaces",   "", "1 ", ""),
+    ("email_like",     "", "a.", "@"),
+    ("time_like",      "", "1h", ""),
+]
+
+
+def adversarial_lines(sizes: List[int], seed: int = 0) -> Iterator[Tuple[str, str]]:
+    """
+    (name, line) pairs: every adversarial unit repeated up to each size in
+    characters, alone and embedded in an ordinary sentence, plus a few random
+    scraped-looking mixes of the units.
+    """
+    rng = random.Random(seed)
+    for size in sizes:
+        for name, prefix, unit, suffix in ADVERSARIAL_UNITS:
+            token = prefix + unit * max(1, (size - len(prefix) - len(suffix)) // len(unit)) + suffix
+            yield f"{name}/{size}", token
+            yield f"{name}/{size}/in_text", f"{rng.choice(SAMPLE_TEXTS)} {token} {rng.choice(SAMPLE_TEXTS)}"
+        for i in range(3):
+            units = []
+            while sum(map(len, units)) < size:
+                _, _, unit, _ = rng.choice(ADVERSARIAL_UNITS)
+                units.append(unit * rng.randint(1, 20))
+            yield f"mixed{i}/{size}", "".join(units)
+
+
+def rule_worst_cases(normalizer: Normalizer, lines: List[Tuple[str, str]]) -> List[Tuple[float, str, str]]:
+    """Slowest input of every RegexRule rule: (seconds, rule, input name), slowest rule first."""
+    modules = {"SpecialCase": normalizer.special_case, "DateTime": normalizer.date_time,
+               "Math": normalizer.math_mod, "Address": normalizer.address}
+    worst = []
+    for module_name, module in modules.items():
+        for rule in module_rules(module):
+            slowest = (0.0, "")
+            for name, line in lines:
+                start = time.perf_counter()
+                rule.regex.sub("", line)
+                elapsed = time.perf_counter() - start
+                if elapsed > slowest[0]:
+                    slowest = (elapsed, name)
+            worst.append((slowest[0], f"{module_name} {rule.source}:{rule.line}", slowest[1]))
+    worst.sort(reverse=True)
+    return worst
+
+
+def line_latencies(normalizer: Normalizer, lines: List[Tuple[str, str]]) -> List[Tuple[float, str]]:
+    """Seconds spent in Normalizer.normalize for each line: (seconds, input name)."""
+    latencies = []
+    for name, line in lines:
+        start = time.perf_counter()
+        normalizer.normalize(line)
+        latencies.append((time.perf_counter() - start, name))
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worst-case latency of the regex rules on adversarial input")
+    parser.add_argument('-sizes', default="256,1024,4096",
+                        help="comma-separated line sizes in characters (default: %(default)s)")
+    parser.add_argument('-seed', type=int, default=0)
+    parser.add_argument('-budget', type=float, default=50,
+                        help="per-line budget in milliseconds for the second pipeline run (default: %(default)s)")
+    parser.add_argument('-top', type=int, default=10, help="rules / lines to list (default: %(default)s)")
+    args = parser.parse_args()
+
+    lines = list(adversarial_lines([int(s) for s in args.sizes.split(',')], args.seed))
+    print(f"{len(lines)} adversarial lines, sizes {args.sizes}")
+
+    print("\nSlowest rules (one sub() on their worst input):")
+    for seconds, rule, name in rule_worst_cases(Normalizer(), lines)[:args.top]:
+        print(f"  {seconds * 1000:10.2f} ms  {rule:<32} {name}")
+
+    for budget in (None, args.budget / 1000):
+        normalizer = Normalizer(line_budget=budget, token_cache_entries=0).preload()
+        latencies = line_latencies(normalizer, lines)
+        values = [seconds for seconds, _ in latencies]
+        label = "no budget" if budget is None else f"budget {args.budget:g} ms"
+        print(f"\nPipeline, {label}: fallbacks {normalizer.budget_fallbacks}, give-ups {normalizer.budget_give_ups}")
+        for p in (50, 99, 99.9):
+            print(f"  p{p:<5} {percentile(values, p) * 1000:10.2f} ms")
+        slowest_seconds, slowest_name = max(latencies)
+        print(f"  max    {slowest_seconds * 1000:10.2f} ms  ({slowest_name})")
+
+if __name__ == "__main__":
+    main()
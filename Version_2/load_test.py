@@ -0,0 +1,85 @@
+import argparse
+import asyncio
+import json
+import time
+from typing import List
+
+# Câu mẫu gửi lên server; latency_test cũng dùng để bọc các token bất thường
+SAMPLE_TEXTS = [
+    "Giá khuyến mãi chỉ 4.599.000đ.",
+    "Liên hệ: 1800 6868.",
+    "từ 7:30AM - 5:30PM",
+    "Khối lượng 2.5kg.",
+    "Truy cập website: www.dienmayabc.com",
+    "Mã đơn hàng: ORD-090624-XYZ.",
+    "Thế kỉ XX",
+    "ngày 5/7/2025",
+]
+
+async def _request(reader, writer, host: str, payload: bytes) -> int:
+    writer.write((f"POST /normalize HTTP/1.1\r\nHost: {host}\r\n"
+                  f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n").encode('latin-1')
+                 + payload)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode('latin-1').split("\r\n")
+    status = int(lines[0].split()[1])
+    length = 0
+    for line in lines[1:]:
+        if line.lower().startswith("content-length:"):
+            length = int(line.split(':', 1)[1])
+    await reader.readexactly(length)
+    return status
+
+async def _client(host: str, port: int, payloads: List[bytes], latencies: List[float], statuses: dict) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for payload in payloads:
+            start = time.perf_counter()
+            status = await _request(reader, writer, host, payload)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+def percentile(values: List[float], p: float) -> float:
+    """Nearest-rank p-th percentile of `values` (0.0 when empty); also used by latency_test."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+async def run(host: str, port: int, requests: int, concurrency: int, batch: int) -> None:
+    payloads = []
+    for i in range(requests):
+        if batch > 1:
+            texts = [SAMPLE_TEXTS[(i + j) % len(SAMPLE_TEXTS)] for j in range(batch)]
+            payloads.append(json.dumps({"texts": texts}).encode('utf-8'))
+        else:
+            payloads.append(json.dumps({"text": SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)]}).encode('utf-8'))
+
+    latencies: List[float] = []
+    statuses: dict = {}
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, payloads[c::concurrency], latencies, statuses)
+                           for c in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    print(f"requests     : {requests} ({batch} text(s) each), concurrency {concurrency}")
+    print(f"status codes : {statuses}")
+    print(f"elapsed      : {elapsed:.3f}s, {requests / elapsed:.1f} req/s, {requests * batch / elapsed:.1f} texts/s")
+    for p in (50, 90, 99, 99.9):
+        print(f"p{p:<5}       : {percentile(latencies, p) * 1000:.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for Server.py on localhost")
+    parser.add_argument('-host', default="127.0.0.1")
+    parser.add_argument('-port', type=int, default=8080)
+    parser.add_argument('-requests', type=int, default=2000)
+    parser.add_argument('-concurrency', type=int, default=32)
+    parser.add_argument('-batch', type=int, default=1, help="texts per request (default: %(default)s)")
+    args = parser.parse_args()
+    asyncio.run(run(args.host, args.port, args.requests, args.concurrency, args.batch))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import argparse
+import itertools
+import random
+import sys
+import time
+from typing import Iterator, List, Optional, Tuple
+
+from ICUNumberConverting import ConvertingNumber
+
+
+def number_inputs(limit: int, samples: int, max_digits: int, seed: int = 0) -> Iterator[str]:
+    """
+    Inputs of the equivalence check: every integer in [0, limit), the values
+    around each power of ten up to max_digits digits, and `samples` random
+    digit strings of 1..max_digits digits, some with leading zeros.
+    """
+    for n in range(limit):
+        yield str(n)
+    for digits in range(1, max_digits + 1):
+        power = 10 ** digits
+        for n in (power - 1, power, power + 1):
+            yield str(n)
+    rng = random.Random(seed)
+    for _ in range(samples):
+        text = "".join(rng.choice("0123456789") for _ in range(rng.randint(1, max_digits)))
+        yield text
+        if rng.random() < 0.1:
+            yield "0" * rng.randint(1, 3) + text
+
+
+def mismatches(inputs: Iterator[str],
+               converter: Optional[ConvertingNumber] = None) -> Iterator[Tuple[str, str, str]]:
+    """(input, convert_number, convert_number_reference) for every input where the two differ."""
+    converter = converter or ConvertingNumber()
+    for num in inputs:
+        fast = converter.convert_number(num)
+        reference = converter.convert_number_reference(num)
+        if fast != reference:
+            yield num, fast, reference
+
+
+def roman_inputs(max_length: int) -> Iterator[str]:
+    """Every string of IVXLCDM up to max_length characters, plus lower / mixed case variants."""
+    for length in range(1, max_length + 1):
+        for letters in itertools.product("IVXLCDM", repeat=length):
+            yield "".join(letters)
+    for numeral in ("iv", "mcmxc", "Xii", "ıv", "MMMMCM", "MMMMMMMMIX", "MMMMIM", "IIII"):
+        yield numeral
+
+
+def roman_mismatches(inputs: Iterator[str],
+                     converter: Optional[ConvertingNumber] = None) -> Iterator[Tuple[str, str, str]]:
+    """(input, roman_to_decimal, roman_to_decimal_reference) for every input where the two differ."""
+    converter = converter or ConvertingNumber()
+    for roman in inputs:
+        fast = converter.roman_to_decimal(roman)
+        reference = converter.roman_to_decimal_reference(roman)
+        reading = converter.read_roman(roman)
+        if reading is not None:
+            # La Mã hợp lệ: cách đọc phải khớp với convert_number của giá trị
+            fast += " / " + reading[1]
+            reference += " / " + converter.convert_number(reference)
+        if fast != reference:
+            yield roman, fast, reference
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check convert_number and roman_to_decimal against the reference engines")
+    parser.add_argument('-limit', type=int, default=10 ** 7,
+                        help="check every integer below this (default: %(default)s)")
+    parser.add_argument('-samples', type=int, default=200000,
+                        help="random digit strings to check (default: %(default)s)")
+    parser.add_argument('-max-digits', type=int, default=40,
+                        help="longest random digit string (default: %(default)s)")
+    parser.add_argument('-roman-length', type=int, default=7,
+                        help="check every IVXLCDM string up to this length (default: %(default)s)")
+    parser.add_argument('-seed', type=int, default=0)
+    parser.add_argument('-show', type=int, default=10, help="mismatches to print (default: %(default)s)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    found: List[Tuple[str, str, str]] = []
+    count = 0
+    for mismatch in itertools.chain(
+            mismatches(number_inputs(args.limit, args.samples, args.max_digits, args.seed)),
+            roman_mismatches(roman_inputs(args.roman_length))):
+        count += 1
+        if len(found) < args.show:
+            found.append(mismatch)
+    print(f"{count} mismatches, {time.perf_counter() - start:.1f} s")
+    for num, fast, reference in found:
+        print(f"  {num}\n    fast:      {fast}\n    reference: {reference}")
+    sys.exit(1 if count else 0)
+
+if __name__ == "__main__":
+    main()
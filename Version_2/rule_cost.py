@@ -0,0 +1,100 @@
+import argparse
+import time
+from typing import Dict, Iterable, List
+
+from ICUProfile import TimedRegex, module_rules, time_rules
+from Main import open_input
+from Normalizer import Normalizer
+
+# Cột dùng để xếp hạng → khóa trong từng dòng của bảng
+SORT_KEYS = {"time": "seconds", "callback": "callback_seconds", "regex": "regex_seconds",
+             "scanned": "scanned", "matches": "matches"}
+
+# Độ dài tối đa của pattern in trong bảng
+PATTERN_WIDTH = 60
+
+
+def rule_modules(normalizer: Normalizer) -> Dict[str, object]:
+    return {"SpecialCase": normalizer.special_case, "DateTime": normalizer.date_time,
+            "Math": normalizer.math_mod, "Address": normalizer.address}
+
+
+def rule_costs(normalizer: Normalizer, lines: Iterable[str], **options) -> List[Dict[str, object]]:
+    """
+    Normalize `lines` (options as for Normalizer.normalize) with every rule
+    regex timed, and return one row per rule (RegexRule line or Math.STEPS
+    entry), most expensive first:
+    - seconds: time in the rule's regex calls, replacement callbacks included
+    - callback_seconds / regex_seconds: split of `seconds`
+    - scanned: lines the rule searched, not skipped by the prefilter (for
+      Math.STEPS: number-bearing stretches of a line, see Math._entity_spans)
+    - matches: matches replaced
+    The normalizer should be fresh and without line cache: the run / match
+    counters of its rules are read as they are.
+    """
+    normalizer.preload()
+    modules = rule_modules(normalizer)
+    for module in modules.values():
+        time_rules(module)
+    for _ in normalizer.iter_normalize(lines, **options):
+        pass
+
+    rows = []
+    for owner, module in modules.items():
+        for rule in module_rules(module):
+            timer: TimedRegex = rule.regex
+            rows.append({
+                "rule": f"{owner} {rule.source}:{rule.line}",
+                "step": rule.category if isinstance(rule.category, str) else "",
+                "pattern": rule.pattern,
+                "seconds": timer.seconds,
+                "callback_seconds": timer.callback_seconds,
+                "regex_seconds": timer.seconds - timer.callback_seconds,
+                "scanned": rule.runs,
+                "skipped": rule.skips,
+                "matches": rule.matches,
+            })
+    rows.sort(key=lambda row: row["seconds"], reverse=True)
+    return rows
+
+
+def format_table(rows: List[Dict[str, object]]) -> str:
+    header = (f"{'#':>4}  {'rule':<36} {'total ms':>9} {'regex ms':>9} {'callback':>9} "
+              f"{'scanned':>8} {'skipped':>8} {'matches':>8} {'us/match':>9}  pattern")
+    out = [header, "-" * len(header)]
+    for rank, row in enumerate(rows, 1):
+        per_match = f"{row['seconds'] / row['matches'] * 1e6:9.1f}" if row["matches"] else f"{'-':>9}"
+        label = row["rule"] + (f" ({row['step']})" if row["step"] else "")
+        pattern = row["pattern"] if len(row["pattern"]) <= PATTERN_WIDTH else row["pattern"][:PATTERN_WIDTH - 3] + "..."
+        out.append(f"{rank:>4}  {label:<36} {row['seconds'] * 1000:9.2f} {row['regex_seconds'] * 1000:9.2f} "
+                   f"{row['callback_seconds'] * 1000:9.2f} {row['scanned']:>8} {row['skipped']:>8} "
+                   f"{row['matches']:>8} {per_match}  {pattern}")
+    return "\n".join(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time, lines scanned and matches of every regex rule on a corpus")
+    parser.add_argument('-input', default="input.txt", help="corpus, one line per text; '-' reads stdin")
+    parser.add_argument('-top', type=int, default=30, help="rules to list, 0 for all (default: %(default)s)")
+    parser.add_argument('-sort', choices=sorted(SORT_KEYS), default="time",
+                        help="ranking column (default: %(default)s)")
+    parser.add_argument('-repeat', type=int, default=1, help="passes over the corpus (default: %(default)s)")
+    args = parser.parse_args()
+
+    with open_input(args.input) as fin:
+        lines = fin.read().splitlines()
+
+    # Không cache dòng: mọi lần lặp lại đều phải chạy qua các rule
+    normalizer = Normalizer(cache_entries=0)
+    start = time.perf_counter()
+    rows = rule_costs(normalizer, (line for _ in range(max(1, args.repeat)) for line in lines))
+    elapsed = time.perf_counter() - start
+
+    rows.sort(key=lambda row: row[SORT_KEYS[args.sort]], reverse=True)
+    total = sum(row["seconds"] for row in rows)
+    print(f"{len(lines)} lines x {max(1, args.repeat)}, {elapsed:.2f} s in the pipeline, "
+          f"{total:.2f} s in {len(rows)} rules")
+    print(format_table(rows[:args.top] if args.top > 0 else rows))
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 import pytest
-from test_normalize import normalize_line
+from test_normalize import normalize_line, get_normalizer
 
-@pytest.mark.parametrize("inp, expected", [
+CASES = [
     ("123 cm", 
      "một trăm hai mươi ba xen ti mét."),
     
@@ -265,7 +265,500 @@ from test_normalize import normalize_line
     # Mã hàng hóa toàn số
     ("Mã hàng: 456789123.", 
      "Mã hàng bốn trăm năm mươi sáu triệu bảy trăm tám mươi chín nghìn một trăm hai mươi ba."),
-])
+]
+
+@pytest.mark.parametrize("inp, expected", CASES)
 def test_normalize_line(inp, expected):
     options = {"punc": False, "unknown": False, "lower": False, "rule": False}
     assert normalize_line(inp, options) == expected
+
+def test_normalize_many_keeps_order():
+    normalizer = get_normalizer()
+    lines = ["2km", "ngày 5/7/2025", "100$"]
+    assert normalizer.normalize_many(lines) == [normalizer.normalize(line) for line in lines]
+
+def test_write_results_streams_with_separator():
+    import io
+    from Main import write_results
+    normalizer = get_normalizer()
+    fout = io.StringIO()
+    count = write_results(normalizer.iter_normalize(["2km\n", "15kg\n", "100$\n"]), fout, "\n", block_lines=2)
+    assert count == 3
+    assert fout.getvalue() == "hai kí lô mét.\nmười lăm kí lô gam.\nmột trăm đô la.\n"
+
+def test_chunk_lines_adapts_to_line_length():
+    from Parallel import chunk_lines
+    assert [len(c) for c in chunk_lines(["x" * 10] * 10, target_chars=30)] == [3, 3, 3, 1]
+    assert [len(c) for c in chunk_lines(["x" * 100] * 3, target_chars=30)] == [1, 1, 1]
+
+def test_parallel_output_keeps_input_order():
+    from Parallel import iter_normalize_parallel
+    lines = ["2km", "ngày 5/7/2025", "100$", "q.1", "15kg"] * 4
+    results = list(iter_normalize_parallel(lines, jobs=2, target_chars=8))
+    assert results == get_normalizer().normalize_many(lines)
+
+def test_server_batches_concurrent_requests():
+    import asyncio
+    from Server import MicroBatcher
+
+    async def run():
+        batcher = MicroBatcher(workers=1, window=0.05)
+        await batcher.start()
+        try:
+            return await asyncio.gather(batcher.submit(["2km"], (False,) * 4),
+                                        batcher.submit(["100$", "q.1"], (False,) * 4)), batcher.batches
+        finally:
+            await batcher.stop()
+
+    results, batches = asyncio.run(run())
+    assert results == [["hai kí lô mét."], ["một trăm đô la.", "quận một."]]
+    assert batches == 1
+
+def test_server_rejects_bad_content_length():
+    import asyncio
+    from Server import MicroBatcher, NormalizeServer
+
+    async def request(port, length):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"POST /normalize HTTP/1.1\r\nContent-Length: {length}\r\n\r\n{{}}".encode("latin-1"))
+        status = (await reader.readline()).split()[1]
+        writer.close()
+        return int(status)
+
+    async def run():
+        server = await asyncio.start_server(NormalizeServer(MicroBatcher()).handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return [await request(port, length) for length in ("-5", "abc", "1e3", "²", str(1 << 30), "2")]
+
+    assert asyncio.run(run()) == [400, 400, 400, 400, 413, 400]
+
+def test_daemon_round_trip_and_fallback(tmp_path):
+    import threading
+    import Daemon
+    path = str(tmp_path / "vitext.sock")
+    assert Daemon.connect(path) is None
+
+    daemon = Daemon.NormalizeDaemon(path)
+    thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+    thread.start()
+    try:
+        client = Daemon.connect(path)
+        assert client is not None
+        lines = ["2km\n", "100$\n", "q.1\n"]
+        assert list(client.iter_normalize(lines, chunk_lines=2)) == get_normalizer().normalize_many(lines)
+        for request in ([1, 2], "ping", None):
+            Daemon.send_message(client.sock, request)
+            assert "error" in Daemon.recv_message(client.sock)
+        assert client.ping()
+        client.close()
+    finally:
+        daemon.shutdown()
+        daemon.server_close()
+
+def test_daemon_normalizes_on_the_thread_running_jobs(tmp_path):
+    import threading
+    import Daemon
+    path = str(tmp_path / "vitext.sock")
+    daemon = Daemon.NormalizeDaemon(path, {"line_budget": 0.5}, main_thread=True)
+    normalize_many = daemon.normalizer.normalize_many
+    threads = []
+
+    def record(*args):
+        threads.append(threading.current_thread())
+        return normalize_many(*args)
+
+    daemon.normalizer.normalize_many = record
+    server = threading.Thread(target=daemon.serve_forever, daemon=True)
+    server.start()
+    results = []
+
+    def call():
+        client = Daemon.connect(path)
+        results.append(client.normalize_many(["2km"]))
+        client.close()
+        daemon.stop_jobs()
+
+    client = threading.Thread(target=call)
+    client.start()
+    try:
+        daemon.run_jobs()
+        client.join()
+        assert results == [["hai kí lô mét."]]
+        assert threads == [threading.main_thread()]
+    finally:
+        daemon.shutdown()
+        daemon.server_close()
+
+def test_snapshot_invalidates_changed_source(tmp_path):
+    from ICUSnapshot import ICUSnapshot
+    source = tmp_path / "Mapping.txt"
+    source.write_text("a#b\n", encoding="utf-8")
+    snapshot = ICUSnapshot(str(tmp_path / "resources.snapshot"))
+    snapshot.store(str(source), "mapping", {"a": "b"})
+    assert snapshot.save()
+
+    reloaded = ICUSnapshot(str(tmp_path / "resources.snapshot"))
+    assert reloaded.lookup(str(source), "mapping") == {"a": "b"}
+    source.write_text("a#c\n", encoding="utf-8")
+    assert reloaded.lookup(str(source), "mapping") is None
+
+def test_resources_load_on_first_use():
+    from Normalizer import Normalizer
+    normalizer = Normalizer()
+    assert normalizer.startup == {}
+    normalizer.normalize("2km", rule=True)
+    assert "special_case" in normalizer.startup
+    assert "letterEN" not in normalizer.startup
+    assert "not loaded" in normalizer.startup_report()
+
+def test_lru_cache_evicts_by_entries_and_bytes():
+    from ICUCache import LRUCache
+    cache = LRUCache(max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+
+    small = LRUCache(max_entries=100, max_bytes=200)
+    for i in range(10):
+        small.put(str(i), "x" * 20)
+    assert small.bytes <= 200 and len(small) < 10
+
+def test_result_cache_hit_skips_pipeline():
+    from Normalizer import Normalizer
+    normalizer = Normalizer(cache_entries=10)
+    first = normalizer.normalize("Giá  100$ ")
+    assert normalizer.normalize("Giá 100$") == first == "Giá một trăm đô la."
+    assert normalizer.cache_stats()["hits"] == 1
+    assert normalizer.normalize("Giá 100$", lower=True) == "giá một trăm đô la."
+
+def test_disk_cache_survives_restart_and_fingerprint_change(tmp_path):
+    from ICUCache import DiskCache
+    path = str(tmp_path / "cache.sqlite")
+    cache = DiskCache(path, "fp-1")
+    key = cache.make_key("2km", (False, False, False, False))
+    cache.put(key, "hai kí lô mét.")
+    cache.close()
+
+    assert DiskCache(path, "fp-1").get(key) == "hai kí lô mét."
+    changed = DiskCache(path, "fp-2")
+    assert changed.get(changed.make_key("2km", (False, False, False, False))) is None
+    assert changed.get(key) is None
+
+def test_disk_cache_version_bump_prunes_old_rows(tmp_path, monkeypatch):
+    import sqlite3
+    import ICUCache
+    path = str(tmp_path / "cache.sqlite")
+    cache = ICUCache.DiskCache(path, "fp-1")
+    cache.put(cache.make_key("2km", (False,) * 4), "hai kí lô mét.")
+    cache.close()
+    monkeypatch.setattr(ICUCache, "DISK_CACHE_VERSION", ICUCache.DISK_CACHE_VERSION + 1)
+    bumped = ICUCache.DiskCache(path, "fp-1")
+    assert bumped.get(bumped.make_key("2km", (False,) * 4)) is None
+    bumped.close()
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM results").fetchone() == (0,)
+
+def test_disk_cache_errors_become_misses(tmp_path, capsys):
+    from ICUCache import DiskCache
+    corrupt = tmp_path / "corrupt.sqlite"
+    corrupt.write_bytes(b"not a database" * 100)
+    for path in (str(tmp_path / "missing" / "cache.sqlite"), str(corrupt)):
+        cache = DiskCache(path, "fp-1")
+        key = cache.make_key("2km", (False, False, False, False))
+        assert cache.get(key) is None and cache.get(key) is None
+        cache.put(key, "hai kí lô mét.")
+        cache.close()
+        assert cache.stats()["misses"] == 2 and cache.stats()["disabled"]
+        assert capsys.readouterr().err.count("[E] Disk cache") == 1
+
+def test_token_cache_matches_uncached_rendering():
+    from Normalizer import Normalizer
+    cached = Normalizer(token_cache_entries=4)
+    uncached = Normalizer(token_cache_entries=0)
+    text = "Thế kỉ XX , LG LG LG ko đc , SKU-12 ."
+    for punc in (False, True):
+        for unknown in (False, True):
+            assert cached.render_tokens(text, punc, unknown, False) == uncached.render_tokens(text, punc, unknown, False)
+    assert cached.token_cache_stats()["hits"] > 0
+
+def test_ruleset_compiles_once_and_reports_bad_lines(tmp_path, capsys, monkeypatch):
+    from ICURuleSet import RuleSet
+    monkeypatch.setenv("VITEXT_NO_SNAPSHOT", "1")
+    rule_file = tmp_path / "Rules.txt"
+    rule_file.write_text("\\d+\n\n(unclosed\nr'(?i)ab+'\n", encoding="utf-8")
+    rules = RuleSet()
+    assert rules.load(7, str(rule_file))
+    assert [(r.line, r.pattern) for r in rules.rules(7)] == [(1, r"\d+"), (4, "(?i)ab+")]
+    assert rules.rules(7)[1].regex.fullmatch("ABB")
+    assert [(source, line) for source, line, _, _ in rules.errors] == [("Rules.txt", 3)]
+    assert "Rules.txt:3" in capsys.readouterr().err
+
+def test_single_pass_rules_give_the_same_output():
+    from Normalizer import Normalizer
+    normalizer = Normalizer(single_pass=True)
+    for inp, expected in CASES:
+        assert normalizer.normalize(inp) == expected, inp
+
+@pytest.mark.parametrize("resolve_spans", [False, True])
+def test_single_pass_matches_rule_by_rule_on_generated_lines(resolve_spans):
+    import random
+    from Normalizer import Normalizer
+    default = Normalizer(resolve_spans=resolve_spans)
+    single = Normalizer(single_pass=True, resolve_spans=resolve_spans)
+    pieces = ["Từ", "đến", "ngày", "tháng", "năm", "lúc", "quý", "số", "P.", "Q.", "km", "kg", "%", "$", "h",
+              "3", "15", "4", "123", "2024", "12:30", "3-15/4", "15/4", "1/2/2020", "IV", "A-01", "v1.2",
+              "www.x.vn", "a@b.com", "-", "/", ":", ",", "."]
+    rng = random.Random(0)
+    lines = ["Từ 3-15/4 123"]
+    for _ in range(500):
+        lines.append("".join(rng.choice(pieces) + rng.choice(["", " ", " "]) for _ in range(rng.randint(1, 8))))
+    for line in lines:
+        assert single.normalize(line) == default.normalize(line), line
+
+def test_prefilter_skips_rules_without_their_triggers():
+    from ICUPrefilter import trigger_sources
+    from ICURuleSet import RuleSet
+    assert trigger_sources(r"(?i)(phòng|lớp)\s\d+") == [r"\d", "(?i:phòng)|(?i:lớp)"]
+    rules = RuleSet()
+    rules.add(0, r"[\w.]+@\w+\.com")
+    rules.add(0, r"(?i)tháng \d{1,2}")
+    replacers = {0: lambda m: "<" + m.group(0) + ">"}
+    assert rules.apply("không có gì", replacers, (0,)) == "không có gì"
+    assert rules.apply("Tháng 12 gửi a@b.com", replacers, (0,)) == "<Tháng 12> gửi <a@b.com>"
+    stats = rules.stats()
+    assert (stats["evaluations"], stats["skipped"]) == (4, 2)
+
+def test_line_budget_falls_back_on_pathological_lines():
+    from Normalizer import Normalizer
+    from latency_test import adversarial_lines
+    normalizer = Normalizer(line_budget=0.02).preload()
+    line = dict(adversarial_lines([4096]))["www_dotted/4096/in_text"]
+    assert normalizer.normalize(line)
+    assert normalizer.budget_fallbacks == 1
+    text, degraded = normalizer.apply_rules_within_budget(line)
+    assert degraded and text and normalizer.budget_fallbacks == 2
+    assert normalizer.normalize("ngày 5/7/2025") == "ngày năm tháng bảy năm hai nghìn không trăm hai mươi lăm."
+
+def test_line_budget_excludes_resource_loading(monkeypatch):
+    from Normalizer import Normalizer
+    from latency_test import adversarial_lines
+    monkeypatch.setenv("VITEXT_NO_SNAPSHOT", "1")
+    # Normalizer chưa load gì: thời gian load không được tính vào ngân sách của dòng đầu
+    normalizer = Normalizer(line_budget=0.005, cache_entries=16)
+    assert normalizer.normalize("ngày 5/7/2025") == "ngày năm tháng bảy năm hai nghìn không trăm hai mươi lăm."
+    assert normalizer.budget_fallbacks == 0
+    # Kết quả dự phòng không vào cache
+    line = dict(adversarial_lines([4096]))["www_dotted/4096/in_text"]
+    normalizer.normalize(line)
+    assert normalizer.budget_fallbacks == 1
+    normalizer.normalize(line)
+    assert normalizer.budget_fallbacks == 2
+
+def test_math_spans_match_whole_line_steps():
+    import random
+    import re
+    from Math import Math
+    from ICUSpans import SpanText
+    math_mod = Math()
+    pieces = ["3", "25", "1,000", "1.500", "2.5", "-", "từ", "kg", "km2", "cm", "$", "đ",
+              "XIV", "V", "ABC-123", "giá", " ", "\t", "5kg", "3-5", "10$", "LG"]
+    rng = random.Random(0)
+    for _ in range(500):
+        line = "".join(rng.choice(pieces) + rng.choice(["", " "]) for _ in range(rng.randint(1, 10)))
+        spans = math_mod.steps.apply_spans(SpanText(line), math_mod._replacers, Math.STEP_ORDER)
+        whole = re.sub(r"\s+", " ", spans.release().text()).strip()
+        assert math_mod.normalize_text(line) == whole, line
+
+def test_span_text_hides_resolved_regions_from_later_rules():
+    from ICURuleSet import RuleSet
+    from ICUSpans import SpanText
+    rules = RuleSet()
+    rules.add(0, r"\d+/\d+")
+    rules.add(1, r"\d+")
+    rules.add(2, r"\w+")
+    replacers = {0: lambda m: m.group(0).replace("/", " tháng "),  # còn chữ số → chưa xong
+                 1: lambda m: {"5": "năm", "7": "bảy"}[m.group(0)],
+                 2: lambda m: m.group(0).upper()}
+    spans = rules.apply_spans(SpanText("ngày 5/7", resolve=True), replacers, (0, 1, 2))
+    assert spans.text() == "NGÀY năm THÁNG bảy"
+    assert ("năm", True) in spans.spans and ("bảy", True) in spans.spans
+    # Mặc định mọi rule vẫn đọc lại kết quả của rule trước, như khi truyền chuỗi
+    assert rules.apply_spans(SpanText("ngày 5/7"), replacers, (0, 1, 2)).text() == "NGÀY NĂM THÁNG BẢY"
+
+@pytest.mark.parametrize("line, default, resolved", [
+    ("Mã A-01-23", "Mã ây không một hát a i mươi ba.", "Mã A một hai mươi ba."),
+    ("BH2025-06", "bi ếch hai nghìn không trăm hai mươi lăm ét u.", "bi ếch hai không hai năm sáu."),
+    ("Bytmm3-5", "bi quai ti em em ba nờ á mờ.", "Bytmm ba năm."),
+    ("v1.2.3", "vi một chấm hai chấm bê a.", "vê một hai ba."),
+])
+def test_resolve_spans_is_opt_in(line, default, resolved):
+    from Normalizer import Normalizer
+    assert Normalizer().normalize(line) == default
+    assert Normalizer(resolve_spans=True).normalize(line) == resolved
+
+def test_stage_metrics_sample_one_line_in_n():
+    from Normalizer import Normalizer
+    normalizer = Normalizer(metrics_sample=2)
+    for line in ["ngày 5/7/2025", "15kg", "3-5 cm", "ngày 8/3"]:
+        normalizer.normalize(line)
+    stats = normalizer.stats()
+    assert (stats["lines"], stats["sampled"]) == (4, 2)
+    stages = stats["stages"]
+    assert list(stages) == ["cleanup", "special_case", "date_time", "math", "address", "symbols", "tokens"]
+    assert all(stage["calls"] == 2 and sum(stage["histogram"].values()) == 2 for stage in stages.values())
+    assert stages["tokens"]["bytes_out"] > 0
+    # Số match đếm trên mọi dòng, không chỉ các dòng được đo
+    assert stages["date_time"]["matches"]["Date_1"] == 1 and stages["math"]["matches"]["range_single"] == 1
+
+def test_profile_charges_regex_time_to_rule_files(tmp_path):
+    from Normalizer import Normalizer
+    from ICUProfile import Profiler, label_rules
+    # Như Main --profile: load trước để profile chỉ gồm phần xử lý dòng
+    normalizer = Normalizer().preload()
+    for module in (normalizer.special_case, normalizer.date_time, normalizer.math_mod, normalizer.address):
+        label_rules(module)
+    prefix = str(tmp_path / "profile")
+    with Profiler(prefix):
+        result = normalizer.normalize("ngày 5/7/2025")
+    assert result == "ngày năm tháng bảy năm hai nghìn không trăm hai mươi lăm."
+    report = (tmp_path / "profile.txt").read_text(encoding="utf-8")
+    assert "Date_1.txt:1(DateTime.Date_1)" in report and "(Math.plain_number)" in report
+    assert (tmp_path / "profile.prof").exists()
+
+def test_rule_cost_reports_every_rule_with_time_and_matches():
+    from Normalizer import Normalizer
+    from rule_cost import rule_costs
+    normalizer = Normalizer()
+    rows = rule_costs(normalizer, ["ngày 5/7/2025", "Giá 4.599.000đ", "xin chào"])
+    assert normalizer.normalize("ngày 5/7/2025") == "ngày năm tháng bảy năm hai nghìn không trăm hai mươi lăm."
+    by_rule = {row["rule"]: row for row in rows}
+    modules = (normalizer.special_case, normalizer.date_time, normalizer.address)
+    assert len(rows) == sum(len(module.rules) for module in modules) + len(normalizer.math_mod.steps)
+    date = by_rule["DateTime Date_1.txt:1"]
+    assert date["matches"] == 1 and date["scanned"] == 2 and date["skipped"] == 1
+    assert date["seconds"] >= date["callback_seconds"] > 0
+    assert [row["seconds"] for row in rows] == sorted((row["seconds"] for row in rows), reverse=True)
+
+def test_table_driven_convert_number_matches_reference():
+    from ICUNumberConverting import ConvertingNumber
+    from number_equivalence import mismatches, number_inputs
+    assert list(mismatches(number_inputs(20000, 2000, 40))) == []
+    conv = ConvertingNumber()
+    for num in ("", "0", "00", "0007", "12a", "١٢"):
+        assert conv.convert_number(num) == conv.convert_number_reference(num)
+
+def test_roman_tables_match_reference():
+    from ICUNumberConverting import ConvertingNumber
+    from number_equivalence import roman_inputs, roman_mismatches
+    conv = ConvertingNumber()
+    assert list(roman_mismatches(roman_inputs(4), conv)) == []
+    assert all(conv.decimal_to_roman(n) == conv.decimal_to_roman_reference(n) for n in range(-1, 5000))
+    assert conv.read_roman("mcmxc") == (1990, "một nghìn chín trăm chín mươi")
+    assert conv.read_roman("IIII") is None
+
+def test_speller_reads_like_mapping_of_each_character():
+    from ICUConstant import F_LETTER_SOUND_EN, F_SYMBOL
+    from ICUSpelling import get_speller
+    speller = get_speller(F_LETTER_SOUND_EN, F_SYMBOL)
+    assert get_speller(F_LETTER_SOUND_EN, F_SYMBOL) is speller
+    text = "Ab-9 x@İ?"
+    assert speller.spell(text) == " ".join(speller.mapping.mapping_of(c) for c in text)
+    assert speller.spell_each(text, " ", " ") == "".join(f" {speller.mapping.mapping_of(c)} " for c in text)
+    assert [speller.has_word(c) for c in text] == [speller.mapping.has_mapping_of(c) for c in text]
+    assert speller.word_of("İ".lower()) == speller.mapping.mapping_of("İ".lower())
+
+@pytest.mark.parametrize("with_numpy", [True, False])
+def test_convert_many_matches_convert_number(with_numpy, monkeypatch):
+    import random
+    import ICUNumberConverting
+    if with_numpy:
+        np = pytest.importorskip("numpy")
+        make = lambda values: np.array(values, dtype=np.int64)
+    else:
+        monkeypatch.setattr(ICUNumberConverting, "np", None)
+        make = list
+    rng = random.Random(0)
+    values = list(range(2000)) + [rng.randrange(10 ** rng.randint(4, 18)) for _ in range(3000)]
+    values += [10 ** k + d for k in range(1, 18) for d in (-1, 0, 1)] + [-7]
+    conv = ICUNumberConverting.ConvertingNumber()
+    assert conv.convert_many(make(values)) == [conv.convert_number_reference(str(v)) for v in values]
+
+def test_lexicon_matches_word_list_lookups():
+    import random
+    from Normalizer import Normalizer
+    from ICULexicon import Lexicon
+    normalizer = Normalizer()
+    mappings = [(Lexicon.ACRONYM, normalizer.acronym), (Lexicon.TEENCODE, normalizer.teen_code),
+                (Lexicon.SYMBOL, normalizer.symbol)]
+
+    def reference(token):
+        if normalizer.popular.has_word(token):
+            return (Lexicon.KEEP, None)
+        for action, mapping in mappings:
+            if mapping.has_mapping_of(token):
+                return (action, mapping.mapping_of(token))
+        return None
+
+    rng = random.Random(0)
+    keys = sorted(normalizer.teen_code.mapping) + sorted(normalizer.symbol.mapping)
+    keys += rng.sample(sorted(normalizer.popular.words), 500) + rng.sample(sorted(normalizer.acronym.mapping), 500)
+    tokens = ["xyz", "ǅ", "ß"]
+    for key in keys:
+        tokens += [key, key.upper(), key.title(), "".join(rng.choice((c, c.upper())) for c in key), key + "q"]
+    lexicon = normalizer.lexicon
+    assert [lexicon.lookup(token) for token in tokens] == [reference(token) for token in tokens]
+    assert ("byt", "Acronyms_shorten.txt", ["Teencode.txt"]) in lexicon.conflicts
+
+def test_mapped_tables_match_dict_and_set(tmp_path, monkeypatch):
+    import ICUMappedTable
+    from Normalizer import Normalizer
+    monkeypatch.setattr(ICUMappedTable, "MAPPED_FOLDER", str(tmp_path))
+    reference = Normalizer()
+    reference.lexicon
+    monkeypatch.setenv("VITEXT_MAPPED_TABLES", "1")
+
+    # Lần đầu ghi các bảng, lần hai đọc lại từ file đã ghi
+    for _ in range(2):
+        normalizer = Normalizer()
+        assert isinstance(normalizer.popular.words, ICUMappedTable.MappedWords)
+        assert normalizer.popular.words == reference.popular.words
+        for attr in ("acronym", "teen_code", "symbol"):
+            mapped, expected = getattr(normalizer, attr), getattr(reference, attr)
+            assert isinstance(mapped.mapping, ICUMappedTable.MappedTable)
+            assert list(mapped.mapping.items()) == list(expected.mapping.items())
+            for key in list(expected.mapping)[:300] + ["", "zzz", "ǅ"]:
+                for token in (key, key.upper(), key.title() + "q"):
+                    assert mapped.mapping_of(token) == expected.mapping_of(token)
+                    assert mapped.has_mapping_of(token) == expected.has_mapping_of(token)
+        lexicon = normalizer.lexicon
+        assert isinstance(lexicon.entries, ICUMappedTable.MappedTable)
+        assert lexicon.conflicts == reference.lexicon.conflicts
+        for token in list(reference.lexicon.entries)[::50] + ["Xyz", "hÀ", "BYT", "byT"]:
+            assert lexicon.lookup(token) == reference.lexicon.lookup(token)
+
+def test_mapped_table_rebuilt_when_source_changes(tmp_path, monkeypatch):
+    import os
+    import ICUMappedTable
+    from ICUMapping import ICUMapping
+    monkeypatch.setattr(ICUMappedTable, "MAPPED_FOLDER", str(tmp_path / "mapped"))
+    monkeypatch.setenv("VITEXT_MAPPED_TABLES", "1")
+    monkeypatch.setenv("VITEXT_NO_SNAPSHOT", "1")
+    source = tmp_path / "Mapping.txt"
+    source.write_text("a#b\nc#d\n", encoding="utf-8")
+    mapper = ICUMapping()
+    assert mapper.load_mapping_file(str(source)) and dict(mapper.mapping) == {"a": "b", "c": "d"}
+
+    source.write_text("a#x\n", encoding="utf-8")
+    os.utime(source, ns=(1, 1))
+    mapper = ICUMapping()
+    mapper.load_mapping_file(str(source))
+    assert isinstance(mapper.mapping, ICUMappedTable.MappedTable) and dict(mapper.mapping) == {"a": "x"}
+    # File thứ hai → chép sang dict riêng của process, file sau thắng
+    second = tmp_path / "Second.txt"
+    second.write_text("a#y\ne#f\n", encoding="utf-8")
+    mapper.load_mapping_file(str(second))
+    assert mapper.mapping == {"a": "y", "e": "f"}